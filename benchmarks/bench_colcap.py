@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark de búsqueda de valores COLCAP por fecha.
+
+Compara la búsqueda anterior (pd.Timestamp + `in df.index` + `.loc` por
+artículo) con COLCAPCorrelator.get_value (lista por ordinal de día) y con
+la variante de día hábil anterior (searchsorted), sobre fechas de días
+hábiles y de fines de semana. También reporta la memoria del DataFrame
+indexado frente a las estructuras planas.
+
+    python benchmarks/bench_colcap.py
+    python benchmarks/bench_colcap.py --lookups 200000
+"""
+import argparse
+import datetime
+import os
+import random
+import sys
+import time
+
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from src.common.config import Config
+from src.worker.correlation import COLCAPCorrelator
+
+
+class LegacyLookup:
+    """get_value anterior sobre el DataFrame indexado por fecha"""
+
+    def __init__(self, data_path):
+        self.df = pd.read_csv(data_path)
+        self.df['Fecha'] = pd.to_datetime(self.df['Fecha'])
+        self.df.set_index('Fecha', inplace=True)
+
+    def get_value(self, date):
+        try:
+            fecha_lookup = pd.Timestamp(date)
+            if fecha_lookup in self.df.index:
+                return float(self.df.loc[fecha_lookup]['Ultimo'])
+            return None
+        except:
+            return None
+
+
+def per_lookup_ns(fn, dates):
+    start = time.perf_counter()
+    for d in dates:
+        fn(d)
+    return (time.perf_counter() - start) / len(dates) * 1e9
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--lookups', type=int, default=50000)
+    parser.add_argument('--data', default=os.path.join(ROOT, Config.COLCAP_DATA_PATH))
+    args = parser.parse_args()
+
+    legacy = LegacyLookup(args.data)
+    correlator = COLCAPCorrelator(data_path=args.data)
+
+    first = datetime.date.fromordinal(correlator.first_ordinal)
+    span = len(correlator.values)
+    rng = random.Random(7)
+    dates = [first + datetime.timedelta(days=rng.randrange(span)) for _ in range(args.lookups)]
+    legacy_dates = dates[:max(1, args.lookups // 10)]  # La versión anterior es mucho más lenta
+
+    # Mismos resultados en días con sesión y sin sesión
+    for d in legacy_dates[:2000]:
+        assert legacy.get_value(d) == correlator.get_value(d), d
+
+    rows = [
+        ('anterior (.loc)', per_lookup_ns(legacy.get_value, legacy_dates)),
+        ('get_value', per_lookup_ns(correlator.get_value, dates)),
+        ('get_value previous', per_lookup_ns(lambda d: correlator.get_value(d, previous=True), dates)),
+        ('get_previous', per_lookup_ns(correlator.get_previous, dates)),
+    ]
+
+    print(f"{len(correlator.trading_ordinals)} días hábiles en {span} días | {args.lookups} búsquedas")
+    print(f"{'búsqueda':<20} {'ns/búsqueda':>12} {'vs anterior':>12}")
+    for name, ns in rows:
+        print(f"{name:<20} {ns:>12.0f} {rows[0][1] / ns:>11.1f}x")
+
+    frame_bytes = int(legacy.df.memory_usage(index=True, deep=True).sum())
+    flat_bytes = (sys.getsizeof(correlator.values) + correlator.trading_ordinals.nbytes
+                  + correlator.trading_values.nbytes)
+    print(f"memoria: DataFrame {frame_bytes / 1024:.1f} KB | estructuras planas {flat_bytes / 1024:.1f} KB")
+
+
+if __name__ == '__main__':
+    main()
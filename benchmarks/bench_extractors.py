@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Benchmark de extractores de HTML (bs4 vs lxml).
+
+Sobre un corpus de páginas HTML guardadas compara, por grupo de páginas,
+ms por página y la salida de ambos extractores (título idéntico y
+similitud del cuerpo ya limpio, que es lo que llega al modelo).
+
+El corpus es un directorio con un subdirectorio por grupo, p. ej. por portal:
+
+    corpus/eltiempo.com/*.html
+    corpus/larepublica.co/*.html
+
+Sin --corpus se genera un corpus sintético (scripts en <head>, menús,
+relacionados) con un grupo por marcado del cuerpo: <article>, clases e
+itemprop de GENERIC_SELECTORS y un cuerpo sin contenedor conocido, que cae
+al respaldo de todos los párrafos. Solo sirve para medir velocidad: la
+concordancia con portales reales se mide con --corpus.
+
+    python benchmarks/bench_extractors.py
+    python benchmarks/bench_extractors.py --corpus /data/html --repeat 5
+"""
+import argparse
+import difflib
+import os
+import random
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from src.worker.extractors import LxmlExtractor, SoupExtractor
+from src.worker.processor import WARCProcessor
+
+CORPUS_PATH = os.path.join(ROOT, 'benchmarks', 'data', 'noticias_es.txt')
+
+# Contenedor del cuerpo por grupo del corpus sintético
+BODY_LAYOUTS = {
+    'article': '<article>{}</article>',
+    'entry-content': '<div class="entry-content">{}</div>',
+    'itemprop': '<div itemprop="articleBody">{}</div>',
+    'sin contenedor': '<div class="cuerpo">{}</div>',
+}
+
+
+def synthetic_corpus(pages_per_group):
+    """Páginas con cada marcado de BODY_LAYOUTS y ~150KB de ruido alrededor"""
+    with open(CORPUS_PATH, encoding='utf-8') as f:
+        sentences = [line.strip() for line in f if line.strip()]
+
+    rng = random.Random(7)
+    corpus = {}
+    for layout, body in BODY_LAYOUTS.items():
+        pages = []
+        for i in range(pages_per_group):
+            title = rng.choice(sentences)[:90]
+            paragraphs = ''.join(f'<p>{rng.choice(sentences)}</p>' for _ in range(rng.randint(8, 25)))
+            menu = ''.join(f'<li><a href="/seccion/{j}">Sección {j}</a></li>' for j in range(120))
+            related = ''.join(f'<div class="card"><p>{rng.choice(sentences)}</p></div>' for _ in range(30))
+            scripts = ''.join(f'<script>window.__d{j} = {{"k": "{"x" * 800}"}};</script>' for j in range(60))
+            pages.append(
+                f'<!DOCTYPE html><html lang="es"><head><title>{title} | Noticias</title>'
+                f'<meta property="og:title" content="{title}">{scripts}<style>.a{{color:red}}</style></head>'
+                f'<body><header><nav><ul>{menu}</ul></nav></header>'
+                f'<main><h1>{title}</h1>{body.format(paragraphs)}'
+                f'<section class="relacionados">{related}</section></main>'
+                f'<footer><p>Todos los derechos reservados</p></footer></body></html>'
+            )
+        corpus[layout] = pages
+    return corpus
+
+
+def load_corpus(path):
+    corpus = {}
+    for group in sorted(os.listdir(path)):
+        folder = os.path.join(path, group)
+        if not os.path.isdir(folder):
+            continue
+        pages = []
+        for name in sorted(os.listdir(folder)):
+            if name.endswith('.html'):
+                with open(os.path.join(folder, name), 'rb') as f:
+                    pages.append(f.read().decode('utf-8', errors='ignore'))
+        if pages:
+            corpus[group] = pages
+    return corpus
+
+
+def run(extractor, pages, repeat):
+    outputs = [extractor.extract(page) for page in pages]
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for page in pages:
+            extractor.extract(page)
+    ms = (time.perf_counter() - start) / (repeat * len(pages)) * 1000
+    return ms, outputs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--corpus', help='Directorio con un subdirectorio de páginas .html por grupo')
+    parser.add_argument('--pages', type=int, default=20, help='Páginas por grupo del corpus sintético')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus) if args.corpus else synthetic_corpus(args.pages)
+    clean = WARCProcessor()  # _clean_text: mismo texto que llega al modelo
+
+    soup, lxml_extractor = SoupExtractor(), LxmlExtractor()
+    print(f"{'grupo':>18} {'págs':>5} {'bs4(ms)':>8} {'lxml(ms)':>9} {'speedup':>8} {'título =':>9} {'cuerpo ~':>9}")
+    speedups = []
+    for group, pages in corpus.items():
+        soup_ms, soup_out = run(soup, pages, args.repeat)
+        lxml_ms, lxml_out = run(lxml_extractor, pages, args.repeat)
+
+        same_title = sum(a[0] == b[0] for a, b in zip(soup_out, lxml_out)) / len(pages)
+        similarity = statistics.mean(
+            difflib.SequenceMatcher(None, clean._clean_text(a[1]), clean._clean_text(b[1])).ratio()
+            for a, b in zip(soup_out, lxml_out)
+        )
+        speedups.append(soup_ms / lxml_ms)
+        print(f"{group:>18} {len(pages):>5} {soup_ms:>8.2f} {lxml_ms:>9.2f} {soup_ms / lxml_ms:>7.1f}x "
+              f"{same_title:>9.0%} {similarity:>9.1%}")
+
+    print(f"\nSpeedup medio: {statistics.mean(speedups):.1f}x")
+
+
+if __name__ == '__main__':
+    main()
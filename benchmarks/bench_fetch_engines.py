@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Benchmark de motores de descarga contra un servidor HTTP local.
+
+Levanta warc_http_server con latencia artificial sobre un archivo de bytes
+aleatorios y descarga los mismos rangos con:
+
+  threads  WARCProcessor.download_range en un ThreadPool (motor actual)
+  async    AsyncFetcher (asyncio + aiohttp) con N peticiones en vuelo
+
+Sin limitador de tasa: mide la capacidad del motor, no el presupuesto de
+Common Crawl.
+
+    python benchmarks/bench_fetch_engines.py
+    python benchmarks/bench_fetch_engines.py --requests 1000 --latency-ms 200 --inflight 200
+"""
+import argparse
+import os
+import queue
+import random
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# Sin pausa fija entre peticiones (el motor de hilos la aplica sin limitador)
+os.environ.setdefault('CC_REQUEST_DELAY', '0')
+
+from warc_http_server import serve
+from src.worker.async_fetcher import AsyncFetcher
+from src.worker.fetch_planner import FetchGroup
+from src.worker.processor import WARCProcessor
+
+FILENAME = 'segment.warc.gz'
+
+
+def make_groups(count, file_size, record_size):
+    rng = random.Random(42)
+    groups = []
+    for _ in range(count):
+        start = rng.randrange(0, file_size - record_size)
+        groups.append(FetchGroup(FILENAME, start, start + record_size - 1, []))
+    return groups
+
+
+def bench_threads(base_url, groups, threads):
+    processor = WARCProcessor(pool_size=threads)
+    processor.base_url = base_url
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        payloads = list(executor.map(lambda g: processor.download_range(g.filename, g.start, g.end), groups))
+    elapsed = time.perf_counter() - start
+    return elapsed, sum(len(p) for p in payloads)
+
+
+def bench_async(base_url, groups, inflight):
+    output = queue.Queue(maxsize=64)
+    fetcher = AsyncFetcher(output, base_url=base_url, max_inflight=inflight).start()
+    received = 0
+    errors = 0
+    done = 0
+
+    start = time.perf_counter()
+    submitted = 0
+    # Consumidor en el hilo principal intercalado con submit (como la etapa de extracción)
+    while done < len(groups):
+        while submitted < len(groups) and fetcher.inflight < inflight:
+            fetcher.submit(groups[submitted])
+            submitted += 1
+        try:
+            _, group, payload, _, error = output.get(timeout=0.05)
+        except queue.Empty:
+            continue
+        done += 1
+        if error or len(payload) != group.length:
+            errors += 1
+        else:
+            received += len(payload)
+    elapsed = time.perf_counter() - start
+
+    fetcher.stop()
+    return elapsed, received, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=400)
+    parser.add_argument('--latency-ms', type=float, default=150)
+    parser.add_argument('--record-kb', type=int, default=30, help='Tamaño de cada rango (registro WARC típico)')
+    parser.add_argument('--threads', type=int, default=4, help='Hilos del motor actual (MAX_THREADS)')
+    parser.add_argument('--inflight', type=int, default=200, help='FETCH_MAX_INFLIGHT del motor async')
+    args = parser.parse_args()
+
+    record_size = args.record_kb * 1024
+    file_size = 64 * 1024 * 1024
+
+    with tempfile.TemporaryDirectory() as tmp:
+        with open(os.path.join(tmp, FILENAME), 'wb') as f:
+            f.write(os.urandom(file_size))
+
+        server, base_url = serve(tmp, latency_ms=args.latency_ms)
+        groups = make_groups(args.requests, file_size, record_size)
+
+        print(f"{args.requests} peticiones Range de {args.record_kb}KB | latencia {args.latency_ms:.0f}ms\n")
+        print(f"{'motor':>22} {'tiempo(s)':>10} {'req/s':>8} {'MB/s':>7}")
+
+        elapsed, total = bench_threads(base_url, groups, args.threads)
+        print(f"{f'threads ({args.threads})':>22} {elapsed:>10.2f} {len(groups) / elapsed:>8.1f} "
+              f"{total / elapsed / 2**20:>7.1f}")
+
+        elapsed, total, errors = bench_async(base_url, groups, args.inflight)
+        print(f"{f'async ({args.inflight} en vuelo)':>22} {elapsed:>10.2f} {len(groups) / elapsed:>8.1f} "
+              f"{total / elapsed / 2**20:>7.1f}" + (f"  errores: {errors}" if errors else ''))
+
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark de detección de palabras clave.
+
+Compara la implementación anterior (`in` + `str.count` por palabra clave,
+2×K recorridos del texto) con KeywordMatcher (una sola pasada), con la
+lista actual de Config y con listas ampliadas de términos sectoriales.
+
+    python benchmarks/bench_keywords.py
+    python benchmarks/bench_keywords.py --sizes 34,300,1000 --repeat 200
+"""
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from src.common.config import Config
+from src.worker.keywords import KeywordMatcher
+
+CORPUS_PATH = os.path.join(ROOT, 'benchmarks', 'data', 'noticias_es.txt')
+
+
+def legacy_count(keywords, text):
+    """Implementación anterior de detect_economic_keywords"""
+    text_lower = text.lower()
+    found = {}
+    for keyword in keywords:
+        if keyword in text_lower:
+            found[keyword] = text_lower.count(keyword)
+    return found
+
+
+def expanded_keywords(size):
+    """Lista base + términos sectoriales sintéticos hasta `size`"""
+    keywords = list(Config.ECONOMIC_KEYWORDS)
+    sectors = ['energia', 'mineria', 'banca', 'seguros', 'retail', 'vivienda', 'agro', 'transporte']
+    suffixes = ['sector', 'indice', 'precio', 'demanda', 'oferta', 'credito', 'tarifa', 'regulacion']
+    i = 0
+    while len(keywords) < size:
+        keywords.append(f"{sectors[i % len(sectors)]} {suffixes[(i // len(sectors)) % len(suffixes)]} {i}")
+        i += 1
+    return keywords[:size]
+
+
+def timeit(fn, texts, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for text in texts:
+            fn(text)
+    return (time.perf_counter() - start) / (repeat * len(texts)) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default=f"{len(Config.ECONOMIC_KEYWORDS)},300,1000")
+    parser.add_argument('--repeat', type=int, default=100)
+    args = parser.parse_args()
+
+    with open(CORPUS_PATH, encoding='utf-8') as f:
+        lines = [line.strip() for line in f if line.strip()]
+    # Textos del tamaño que conserva el worker (~2000 caracteres)
+    joined = ' '.join(lines)
+    texts = [joined[i:i + 2000] for i in range(0, len(joined), 2000)]
+
+    print(f"Textos: {len(texts)} x ~2000 caracteres | repeticiones: {args.repeat}\n")
+    print(f"{'keywords':>9} {'anterior(us)':>13} {'matcher(us)':>12} {'speedup':>8}")
+    for size in [int(s) for s in args.sizes.split(',')]:
+        keywords = expanded_keywords(size)
+        matcher = KeywordMatcher(keywords)
+        legacy_us = timeit(lambda t: legacy_count(keywords, t), texts, args.repeat)
+        matcher_us = timeit(matcher.count, texts, args.repeat)
+        print(f"{size:>9} {legacy_us:>13.1f} {matcher_us:>12.1f} {legacy_us / matcher_us:>7.1f}x")
+
+    # Diferencias por límites de palabra sobre la lista real
+    matcher = KeywordMatcher(Config.ECONOMIC_KEYWORDS)
+    diff = sum(legacy_count(Config.ECONOMIC_KEYWORDS, t) != matcher.count(t) for t in texts)
+    print(f"\nTextos con conteos distintos (coincidencias parciales descartadas): {diff}/{len(texts)}")
+
+
+if __name__ == '__main__':
+    main()
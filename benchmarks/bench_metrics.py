@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Benchmark de escrituras de métricas a Redis por tarea procesada.
+
+Reproduce la secuencia de llamadas del loop del worker por cada tarea
+(contadores globales, heartbeat con profundidades de cola, latencias,
+resultado) con:
+
+- anterior: un comando por llamada (HSET x4 + HSET + EXPIRE + SET en cada
+  heartbeat, INCRBY, LPUSH/LTRIM, INCR...)
+  y el resultado serializado dos veces en JSON
+- buffer:   WorkerMetrics actual (acumula y envía un pipeline por flush)
+  y el resultado serializado una vez en msgpack
+
+y cuenta comandos, idas y vueltas y bytes de resultados guardados por tarea. Sin --redis-host usa
+fakeredis (solo conteos); con un Redis real también mide tareas/s.
+
+    python benchmarks/bench_metrics.py
+    python benchmarks/bench_metrics.py --redis-host localhost --tasks 5000
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from src.worker.metrics import WorkerMetrics
+
+
+class Counter:
+    def __init__(self):
+        self.round_trips = 0
+        self.commands = 0
+
+
+def counting(client, counter):
+    """Cuenta comandos e idas y vueltas (un pipeline = una ida y vuelta)"""
+    execute_command = client.execute_command
+
+    def counted_command(*args, **kwargs):
+        counter.round_trips += 1
+        counter.commands += 1
+        return execute_command(*args, **kwargs)
+
+    pipeline = client.pipeline
+
+    def counted_pipeline(*args, **kwargs):
+        pipe = pipeline(*args, **kwargs)
+        execute = pipe.execute
+
+        def counted_execute(*e_args, **e_kwargs):
+            counter.round_trips += 1
+            counter.commands += len(pipe.command_stack)
+            return execute(*e_args, **e_kwargs)
+
+        pipe.execute = counted_execute
+        return pipe
+
+    client.execute_command = counted_command
+    client.pipeline = counted_pipeline
+    return client
+
+
+class LegacyMetrics:
+    """Escritor anterior: cada llamada es uno o más comandos sueltos"""
+
+    def __init__(self, redis_client, worker_id):
+        self.redis_client = redis_client
+        self.worker_id = worker_id
+
+    def increment_global_counter(self, counter_name, amount=1):
+        self.redis_client.incrby(counter_name, amount)
+
+    def update_worker_stats(self, tasks_per_minute, errors=0, tasks_processed=0, stage_depths=None):
+        key = f'worker_stats:{self.worker_id}'
+        self.redis_client.hset(key, 'rate', round(tasks_per_minute, 2))
+        self.redis_client.hset(key, 'last_active', datetime.utcnow().isoformat())
+        self.redis_client.hset(key, 'errors', errors)
+        self.redis_client.hset(key, 'processed', tasks_processed)
+        if stage_depths:
+            self.redis_client.hset(key, mapping={f'queue_{stage}': depth for stage, depth in stage_depths.items()})
+        self.redis_client.expire(key, 15)
+        self.redis_client.set('last_processed_time', datetime.utcnow().isoformat())
+
+    def record_latencies(self, processing_times):
+        pass  # Ya se acumulaban en histogramas locales
+
+    def save_correlation(self, correlation_data):
+        self.redis_client.lpush('correlaciones_history', json.dumps(correlation_data))
+        self.redis_client.ltrim('correlaciones_history', 0, 999)
+
+    def save_to_dashboard(self, result_data):
+        self.redis_client.lpush('resultados_dashboard', json.dumps(result_data))
+        self.redis_client.incr(f'worker_history:{self.worker_id}')
+
+    def save_result(self, result_data):
+        """Dos copias JSON del mismo resultado"""
+        self.save_correlation(dict(result_data))
+        self.save_to_dashboard(dict(result_data))
+
+    def flush(self, force=False):
+        pass
+
+
+def run(metrics, tasks):
+    """Llamadas de métricas del loop del worker por tarea (record_outcomes + save_results)"""
+    result = {
+        'url': 'https://www.larepublica.co/economia/nota-123',
+        'sentiment': {'label': 'POS', 'confidence': 0.91},
+        'processing_times': {'download_ms': 420, 'extraction_ms': 12, 'nlp_ms': 35, 'total_ms': 480}
+    }
+    start = time.perf_counter()
+    for done in range(1, tasks + 1):
+        metrics.increment_global_counter('total_processed')
+        metrics.update_worker_stats(60.0, 0, done, stage_depths={'fetch': 3, 'inference': 2, 'results': 0})
+        metrics.record_latencies(result['processing_times'])
+        metrics.save_result(result)
+        metrics.flush()
+    metrics.flush(force=True)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tasks', type=int, default=2000)
+    parser.add_argument('--redis-host', default=None, help='Redis real (por defecto fakeredis)')
+    parser.add_argument('--redis-port', type=int, default=6379)
+    args = parser.parse_args()
+
+    def client():
+        if args.redis_host:
+            import redis
+            return redis.Redis(host=args.redis_host, port=args.redis_port, db=15)
+        import fakeredis
+        return fakeredis.FakeRedis()
+
+    print(f"{args.tasks} tareas | {'Redis ' + args.redis_host if args.redis_host else 'fakeredis'}")
+    print(f"{'escritor':<10} {'comandos/tarea':>15} {'idas y vueltas/tarea':>21} {'bytes/tarea':>12} {'tareas/s':>10}")
+    for name, factory in (('anterior', LegacyMetrics), ('buffer', WorkerMetrics)):
+        counter = Counter()
+        redis_client = counting(client(), counter)
+        redis_client.flushdb()
+        counter.round_trips = counter.commands = 0
+
+        elapsed = run(factory(redis_client, 'bench-worker'), args.tasks)
+        stored = sum(len(item) for key in ('resultados_dashboard', 'correlaciones_history')
+                     for item in redis_client.lrange(key, 0, -1))
+        print(f"{name:<10} {counter.commands / args.tasks:>15.2f} {counter.round_trips / args.tasks:>21.3f} "
+              f"{stored / args.tasks:>12.0f} {args.tasks / elapsed:>10.0f}")
+
+
+if __name__ == '__main__':
+    main()
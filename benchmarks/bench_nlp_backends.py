@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Benchmark de backends del modelo de sentimiento (torch, int8, onnx).
+
+Cada backend corre en un subproceso aislado para medir su RSS pico.
+Reporta latencia por lote, throughput, RSS y concordancia de etiquetas
+contra el baseline torch fp32 sobre un corpus fijo de noticias en español.
+
+    python benchmarks/bench_nlp_backends.py
+    python benchmarks/bench_nlp_backends.py --backends torch,int8 --batch 16 --rounds 5
+"""
+import argparse
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+CORPUS_PATH = os.path.join(ROOT, 'benchmarks', 'data', 'noticias_es.txt')
+
+
+def load_corpus():
+    with open(CORPUS_PATH, encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def run_child(backend, batch_size, rounds):
+    """Mide un backend dentro del proceso actual e imprime JSON"""
+    os.environ['NLP_CACHE_SIZE'] = '0'  # Sin caché: medir solo el modelo
+    os.environ['NLP_BACKEND'] = backend
+
+    load_start = time.perf_counter()
+    from src.worker.nlp import SentimentAnalyzer
+    analyzer = SentimentAnalyzer(batch_size=batch_size)
+    load_time = time.perf_counter() - load_start
+
+    corpus = load_corpus()
+
+    # Warm-up (no medido)
+    analyzer.analyze_batch(corpus[:batch_size])
+
+    latencies = []
+    results = []
+    total_start = time.perf_counter()
+    for _ in range(rounds):
+        results = []
+        for start in range(0, len(corpus), batch_size):
+            chunk = corpus[start:start + batch_size]
+            t0 = time.perf_counter()
+            results.extend(analyzer.analyze_batch(chunk))
+            latencies.append((time.perf_counter() - t0) * 1000)
+    total_time = time.perf_counter() - total_start
+
+    print(json.dumps({
+        'backend': analyzer.backend.name,
+        'load_s': round(load_time, 2),
+        'batch_p50_ms': round(statistics.median(latencies), 1),
+        'batch_max_ms': round(max(latencies), 1),
+        'texts_per_s': round(len(corpus) * rounds / total_time, 1),
+        'rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        'labels': [r['classification'] for r in results]
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--backends', default='torch,int8,onnx')
+    parser.add_argument('--batch', type=int, default=16)
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child, args.batch, args.rounds)
+        return
+
+    reports = []
+    for backend in args.backends.split(','):
+        out = subprocess.run(
+            [sys.executable, __file__, '--child', backend, '--batch', str(args.batch), '--rounds', str(args.rounds)],
+            capture_output=True, text=True, cwd=ROOT
+        )
+        if out.returncode != 0:
+            print(f"[BENCH] {backend}: error\n{out.stderr[-500:]}")
+            continue
+        reports.append(json.loads(out.stdout.strip().splitlines()[-1]))
+
+    baseline = next((r for r in reports if r['backend'] == 'torch'), None)
+
+    print(f"\nCorpus: {len(load_corpus())} textos | batch: {args.batch} | rondas: {args.rounds}\n")
+    print(f"{'backend':<8} {'carga(s)':>9} {'p50 lote(ms)':>13} {'max(ms)':>9} {'textos/s':>9} {'RSS(MB)':>8} {'concord.':>9}")
+    for r in reports:
+        if baseline:
+            same = sum(a == b for a, b in zip(r['labels'], baseline['labels']))
+            agreement = f"{same / len(baseline['labels']) * 100:.1f}%"
+        else:
+            agreement = '-'
+        print(f"{r['backend']:<8} {r['load_s']:>9} {r['batch_p50_ms']:>13} {r['batch_max_ms']:>9} "
+              f"{r['texts_per_s']:>9} {r['rss_mb']:>8} {agreement:>9}")
+
+
+if __name__ == '__main__':
+    main()
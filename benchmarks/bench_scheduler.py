@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Benchmark del planificador de I/O: barrera por lote vs ventana deslizante.
+
+Simula tareas con latencia de cola pesada (la mayoría ~100ms y una fracción
+de descargas lentas de varios segundos) sobre el mismo ThreadPool. Con la
+barrera, el lote entero espera a su tarea más lenta; con SlidingWindow cada
+slot se rellena en cuanto termina su tarea. Reporta tareas/s y ocupación
+media de los slots.
+
+    python benchmarks/bench_scheduler.py
+    python benchmarks/bench_scheduler.py --tasks 400 --slow-fraction 0.05 --slow-ms 3000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from src.worker.pipeline import SlidingWindow
+
+
+def make_latencies(tasks, fast_ms, slow_ms, slow_fraction, seed=7):
+    rng = random.Random(seed)
+    return [
+        (slow_ms if rng.random() < slow_fraction else rng.uniform(0.5, 1.5) * fast_ms) / 1000
+        for _ in range(tasks)
+    ]
+
+
+def fake_task(seconds):
+    time.sleep(seconds)
+    return [True]
+
+
+def run_barrier(latencies, threads):
+    busy = 0.0
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        for i in range(0, len(latencies), threads):
+            batch = latencies[i:i + threads]
+            futures = [executor.submit(fake_task, s) for s in batch]
+            for future in as_completed(futures):
+                future.result()
+            busy += sum(batch)
+    elapsed = time.perf_counter() - start
+    return elapsed, busy / (threads * elapsed)
+
+
+def run_window(latencies, threads):
+    busy = 0.0
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        window = SlidingWindow(executor, threads)
+        pending = iter(latencies)
+        while True:
+            while window.has_room():
+                seconds = next(pending, None)
+                if seconds is None:
+                    break
+                window.add(fake_task, seconds)
+                busy += seconds
+            if window.idle():
+                break
+            for future, _, _ in window.wait(timeout=2):
+                future.result()
+    elapsed = time.perf_counter() - start
+    return elapsed, busy / (threads * elapsed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tasks', type=int, default=200)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--fast-ms', type=float, default=100)
+    parser.add_argument('--slow-ms', type=float, default=2000)
+    parser.add_argument('--slow-fraction', type=float, default=0.03)
+    args = parser.parse_args()
+
+    latencies = make_latencies(args.tasks, args.fast_ms, args.slow_ms, args.slow_fraction)
+    print(f"{args.tasks} tareas | {args.threads} hilos | "
+          f"{sum(s * 1000 >= args.slow_ms for s in latencies)} lentas de {args.slow_ms:.0f}ms")
+    print(f"{'planificador':<12} {'segundos':>9} {'tareas/s':>9} {'ocupación':>10}")
+
+    for name, runner in (('barrera', run_barrier), ('ventana', run_window)):
+        elapsed, occupancy = runner(latencies, args.threads)
+        print(f"{name:<12} {elapsed:>9.2f} {args.tasks / elapsed:>9.1f} {occupancy:>9.0%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Memoria pico por tarea al decodificar registros WARC.
+
+Genera un registro WARC gzip con una página HTML del tamaño indicado, lo
+sirve con warc_http_server y procesa la misma tarea varias veces con:
+
+  legacy     response.content -> gzip.decompress -> BytesIO -> read() completo
+  streaming  camino del worker: FetchPlanner.plan -> extract_group (petición
+             Range en streaming, ArchiveIterator por miembro, payload
+             recortado a WARC_MAX_PAYLOAD_BYTES)
+
+Cada modo corre en un subproceso. Reporta el pico de memoria Python por
+tarea (tracemalloc) y el crecimiento del RSS del proceso.
+
+    python benchmarks/bench_warc_memory.py
+    python benchmarks/bench_warc_memory.py --page-kb 100,2000,8000 --tasks 20
+"""
+import argparse
+import gzip
+import io
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+FILENAME = 'segment.warc.gz'
+
+
+class FixedCorrelator:
+    """Correlación fija: el benchmark solo mide decodificación y extracción"""
+
+    def correlate(self, date):
+        return '2024-03-15', 1350.0
+
+
+def build_warc(path, page_kb):
+    """Registro 'response': <head> con ~50KB de scripts, el artículo y relleno (menús, enlaces, comentarios)"""
+    from warcio.statusandheaders import StatusAndHeaders
+    from warcio.warcwriter import WARCWriter
+
+    script = '<script>var data = "' + 'x' * 1000 + '";</script>\n'
+    article = '<article>' + '<p>La bolsa de Colombia cerró al alza impulsada por el sector financiero y el petróleo.</p>' * 40 + '</article>'
+    filler = '<div class="related"><a href="/nota">Otra noticia relacionada con la economía</a></div>\n'
+    head = '<html><head><title>Noticia</title>' + script * 50 + '</head><body>'
+    body = article + filler * max(0, (page_kb * 1024 - len(head)) // len(filler))
+    html = (head + body + '</body></html>').encode('utf-8')
+
+    with open(path, 'wb') as f:
+        writer = WARCWriter(f, gzip=True)
+        http_headers = StatusAndHeaders('200 OK', [('Content-Type', 'text/html; charset=utf-8')], protocol='HTTP/1.1')
+        record = writer.create_warc_record('https://www.portafolio.co/economia/nota', 'response',
+                                           payload=io.BytesIO(html), http_headers=http_headers,
+                                           warc_headers_dict={'WARC-Date': '2024-03-15T10:00:00Z'})
+        writer.write_record(record)
+    return os.path.getsize(path), len(html)
+
+
+def legacy_extract(processor, task, correlator):
+    """Camino anterior: varias copias completas del segmento y del payload"""
+    from warcio.archiveiterator import ArchiveIterator
+
+    warc_data = processor.download_segment(task['filename'], task['offset'], task['length'])
+    try:
+        stream = io.BytesIO(gzip.decompress(warc_data))
+    except gzip.BadGzipFile:
+        stream = io.BytesIO(warc_data)
+
+    for record in ArchiveIterator(stream):
+        if record.rec_type == 'response':
+            correlator.correlate(record.rec_headers.get_header('WARC-Date'))
+            content = record.content_stream().read().decode('utf-8', errors='ignore')
+            return processor._extract_text_from_html(content)
+    return None
+
+
+def run_child(mode, base_url, tasks, segment_size):
+    os.environ['CC_DATA_URL'] = base_url
+    os.environ['CC_REQUEST_DELAY'] = '0'
+    from src.worker.fetch_planner import FetchPlanner
+    from src.worker.processor import WARCProcessor
+
+    processor = WARCProcessor()
+    correlator = FixedCorrelator()
+    task = {'filename': FILENAME, 'offset': 0, 'length': segment_size, 'url': 'https://www.portafolio.co/economia/nota'}
+    # Toda tarea con rango termina en un FetchGroup (aunque sea de uno)
+    groups, singles = FetchPlanner().plan([json.dumps(task)])
+    assert len(groups) == 1 and not singles
+
+    rss_start = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peaks = []
+    durations = []
+    for _ in range(tasks):
+        tracemalloc.start()
+        t0 = time.perf_counter()
+        if mode == 'legacy':
+            result = legacy_extract(processor, task, correlator)
+        else:
+            result = processor.extract_group(groups[0], correlator, 'bench')[0]
+        durations.append((time.perf_counter() - t0) * 1000)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+        assert result, 'la extracción no produjo texto'
+
+    print(json.dumps({
+        'peak_mb': round(statistics.median(peaks) / 2**20, 2),
+        'rss_growth_mb': round((resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_start) / 1024, 1),
+        'task_ms': round(statistics.median(durations), 1)
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--page-kb', default='100,1000,5000', help='Tamaños de página HTML (KB)')
+    parser.add_argument('--tasks', type=int, default=10)
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    parser.add_argument('--base-url', help=argparse.SUPPRESS)
+    parser.add_argument('--segment-size', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child, args.base_url, args.tasks, args.segment_size)
+        return
+
+    from warc_http_server import serve
+
+    print(f"{'página':>9} {'gzip':>8} {'modo':>10} {'pico/tarea(MB)':>15} {'RSS +MB':>8} {'ms/tarea':>9}")
+    for page_kb in [int(s) for s in args.page_kb.split(',')]:
+        with tempfile.TemporaryDirectory() as tmp:
+            segment_size, html_size = build_warc(os.path.join(tmp, FILENAME), page_kb)
+            server, base_url = serve(tmp)
+            for mode in ('legacy', 'streaming'):
+                out = subprocess.run(
+                    [sys.executable, __file__, '--child', mode, '--base-url', base_url,
+                     '--tasks', str(args.tasks), '--segment-size', str(segment_size)],
+                    capture_output=True, text=True, check=True
+                ).stdout
+                r = json.loads(out.strip().splitlines()[-1])
+                print(f"{html_size // 1024:>7}KB {segment_size // 1024:>6}KB {mode:>10} "
+                      f"{r['peak_mb']:>15.2f} {r['rss_growth_mb']:>8.1f} {r['task_ms']:>9.1f}")
+            server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Servidor HTTP local que imita data.commoncrawl.org (peticiones Range).
+
+Sirve los archivos de un directorio respondiendo 206 a `Range: bytes=a-b`
+y, opcionalmente, agrega latencia artificial para simular la red. Sirve
+para probar los motores de descarga sin tocar Common Crawl:
+
+    python benchmarks/warc_http_server.py --dir /data/warc --port 8081 --latency-ms 150
+    CC_DATA_URL=http://localhost:8081/ FETCH_ENGINE=async python main.py worker
+"""
+import argparse
+import os
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+RANGE_RE = re.compile(r'bytes=(\d+)-(\d*)')
+
+
+class RangeRequestHandler(BaseHTTPRequestHandler):
+    directory = '.'
+    latency = 0.0
+
+    def do_GET(self):
+        path = os.path.realpath(os.path.join(self.directory, self.path.lstrip('/')))
+        if not path.startswith(os.path.realpath(self.directory)) or not os.path.isfile(path):
+            self.send_error(404)
+            return
+
+        if self.latency:
+            time.sleep(self.latency)
+
+        size = os.path.getsize(path)
+        start, end = 0, size - 1
+        match = RANGE_RE.match(self.headers.get('Range', ''))
+        if match:
+            start = int(match.group(1))
+            end = min(int(match.group(2) or end), size - 1)
+            if start > end:
+                self.send_error(416)
+                return
+
+        with open(path, 'rb') as f:
+            f.seek(start)
+            body = f.read(end - start + 1)
+
+        self.send_response(206 if match else 200)
+        self.send_header('Content-Type', 'application/octet-stream')
+        self.send_header('Content-Length', str(len(body)))
+        if match:
+            self.send_header('Content-Range', f"bytes {start}-{end}/{size}")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(directory, port=0, latency_ms=0):
+    """Inicia el servidor en un hilo. Retorna (server, base_url)"""
+    handler = type('Handler', (RangeRequestHandler,), {
+        'directory': directory,
+        'latency': latency_ms / 1000
+    })
+    server = ThreadingHTTPServer(('127.0.0.1', port), handler)
+    server.daemon_threads = True
+    # Cola de conexiones amplia: el motor asíncrono abre cientos a la vez
+    server.socket.listen(1024)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--dir', default='.')
+    parser.add_argument('--port', type=int, default=8081)
+    parser.add_argument('--latency-ms', type=float, default=0)
+    args = parser.parse_args()
+
+    server, base_url = serve(args.dir, args.port, args.latency_ms)
+    print(f"Sirviendo {os.path.abspath(args.dir)} en {base_url} (latencia {args.latency_ms:.0f}ms)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
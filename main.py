@@ -3,7 +3,11 @@
 Ejecucion principal
     python main.py producer   # Productor
     python main.py worker     # Worker
+    python main.py worker --procs N  # Worker con N procesos (modelo compartido)
     python main.py dashboard  # Dashboard (Dash)
+    python main.py model-cache DIR  # Descarga el modelo NLP a DIR (NLP_MODEL_DIR)
+    python main.py replay-tasks DIR [--limit N] [--repeat K]  # Tareas desde WARC locales (WARC_LOCAL_DIR)
+    python main.py rebuild-aggregates  # Recalcula los agregados por fecha/dominio desde los resultados
 """
 import sys
 import os
@@ -21,7 +25,10 @@ def run_producer():
 def run_worker():
     """Componente Worker"""
     from src.worker.main import main
-    main()
+    procs = None
+    if '--procs' in sys.argv:
+        procs = int(sys.argv[sys.argv.index('--procs') + 1])
+    main(procs=procs)
 
 
 def run_dashboard():
@@ -30,6 +37,40 @@ def run_dashboard():
     run()
 
 
+def run_model_cache():
+    """Descarga el modelo de sentimiento a un directorio local"""
+    from src.worker.nlp import save_model
+    target_dir = sys.argv[2] if len(sys.argv) > 2 else 'models/sentiment'
+    save_model(target_dir)
+
+
+def run_replay_tasks():
+    """Encola tareas de los .warc.gz de un directorio local (modo replay)"""
+    from src.common.connections import RedisConnection
+    from src.producer.replay import ReplayTaskGenerator
+
+    directory = sys.argv[2] if len(sys.argv) > 2 else 'data/warc'
+    limit = int(sys.argv[sys.argv.index('--limit') + 1]) if '--limit' in sys.argv else None
+    repeat = int(sys.argv[sys.argv.index('--repeat') + 1]) if '--repeat' in sys.argv else 1
+
+    redis_client = RedisConnection().connect()
+    if not redis_client:
+        sys.exit(1)
+    ReplayTaskGenerator(redis_client, directory).enqueue(limit=limit, repeat=repeat)
+
+
+def run_rebuild_aggregates():
+    """Recalcula los agregados del dashboard desde resultados_dashboard (workers detenidos)"""
+    from src.common.connections import RedisConnection
+    from src.common.results import rebuild_aggregates
+
+    redis_client = RedisConnection().connect()
+    if not redis_client:
+        sys.exit(1)
+    results, days, domains = rebuild_aggregates(redis_client)
+    print(f"[Agregados] {results} resultados -> {days} fechas, {domains} dominios")
+
+
 def main():
     if len(sys.argv) < 2:
         sys.exit(1)
@@ -40,6 +81,9 @@ def main():
         'producer': run_producer,
         'worker': run_worker,
         'dashboard': run_dashboard,
+        'model-cache': run_model_cache,
+        'replay-tasks': run_replay_tasks,
+        'rebuild-aggregates': run_rebuild_aggregates,
     }
 
     if component in components:
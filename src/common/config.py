@@ -10,9 +10,56 @@ class Config:
     # Worker
     WORKER_ID = os.getenv('HOSTNAME', 'worker-local')
     WORKER_TIMEOUT = int(os.getenv('WORKER_TIMEOUT', 5))
+    WORKER_PROCS = int(os.getenv('WORKER_PROCS', 1))  # Procesos por pod (ver --procs)
+    WORKER_BATCH_SIZE = int(os.getenv('WORKER_BATCH_SIZE', 4))  # Tareas leídas por ronda (mínimo)
+    WORKER_THREADS = int(os.getenv('WORKER_THREADS', 4))  # Hilos de I/O iniciales
+
+    # Métricas del worker: escrituras acumuladas y enviadas en un pipeline
+    METRICS_FLUSH_MS = int(os.getenv('METRICS_FLUSH_MS', 500))
+    METRICS_FLUSH_TASKS = int(os.getenv('METRICS_FLUSH_TASKS', 50))  # Resultados pendientes que fuerzan el envío
+
+    # Cola de tareas: list (LPUSH/LPOP) o stream (Redis Streams con grupo de consumidores)
+    QUEUE_BACKEND = os.getenv('QUEUE_BACKEND', 'list')
+    QUEUE_STREAM = os.getenv('QUEUE_STREAM', 'warc_stream')
+    QUEUE_GROUP = os.getenv('QUEUE_GROUP', 'workers')
+    QUEUE_CLAIM_IDLE_MS = int(os.getenv('QUEUE_CLAIM_IDLE_MS', 300000))  # Pendiente sin ACK -> se reasigna
+    QUEUE_MAX_DELIVERIES = int(os.getenv('QUEUE_MAX_DELIVERIES', 3))
+
+    # Worker - Concurrencia adaptativa (AIMD sobre latencia/errores de los hilos de I/O)
+    CONCURRENCY_ADAPTIVE = os.getenv('CONCURRENCY_ADAPTIVE', '1') == '1'
+    CONCURRENCY_MIN = int(os.getenv('CONCURRENCY_MIN', 1))
+    CONCURRENCY_MAX = int(os.getenv('CONCURRENCY_MAX', 32))
+    CONCURRENCY_TARGET_MS = float(os.getenv('CONCURRENCY_TARGET_MS', 8000))  # p90 objetivo por trabajo de I/O
+    CONCURRENCY_INTERVAL_S = float(os.getenv('CONCURRENCY_INTERVAL_S', 15))  # Ventana de evaluación
+    CONCURRENCY_DECREASE = float(os.getenv('CONCURRENCY_DECREASE', 0.7))  # Factor ante errores/latencia
+
+    # NLP - Inferencia por lotes
+    NLP_BATCH_SIZE = int(os.getenv('NLP_BATCH_SIZE', 16))
+    NLP_MAX_WAIT_MS = int(os.getenv('NLP_MAX_WAIT_MS', 50))
+    NLP_QUEUE_SIZE = int(os.getenv('NLP_QUEUE_SIZE', 64))
+
+    # NLP - Backend del modelo: torch (fp32), int8 (cuantizado) u onnx
+    NLP_BACKEND = os.getenv('NLP_BACKEND', 'torch')
+    NLP_ONNX_DIR = os.getenv('NLP_ONNX_DIR', 'models/onnx')
+    NLP_THREADS = int(os.getenv('NLP_THREADS', 0))  # 0 = valor por defecto de la librería
+
+    # NLP - Arranque: modelo desde directorio local (sin hub) y warm-up
+    NLP_MODEL_DIR = os.getenv('NLP_MODEL_DIR', '')
+    NLP_WARMUP = os.getenv('NLP_WARMUP', '1') == '1'
+    WORKER_READY_FILE = os.getenv('WORKER_READY_FILE', '/tmp/worker-ready')
+
+    # NLP - Caché por contenido (0 desactiva)
+    NLP_CACHE_SIZE = int(os.getenv('NLP_CACHE_SIZE', 4096))
+    NLP_CACHE_TTL = int(os.getenv('NLP_CACHE_TTL', 7 * 24 * 3600))
+
+    # NLP - Casi duplicados (MinHash-LSH): reutilizar el análisis de una nota ya vista
+    NEAR_DUP_ENABLED = os.getenv('NEAR_DUP_ENABLED', '1') == '1'
+    NEAR_DUP_THRESHOLD = float(os.getenv('NEAR_DUP_THRESHOLD', 0.8))  # Jaccard estimado mínimo
 
     # Datos
     COLCAP_DATA_PATH = os.getenv('COLCAP_DATA_PATH', 'data/colcap_historico.csv')
+    # Valores de colcap_news_counter reservados por proceso con un solo INCRBY
+    COLCAP_COUNTER_BLOCK = int(os.getenv('COLCAP_COUNTER_BLOCK', 100))
 
     # Producer (delays de Common Crawl)
     DELAY_BETWEEN_INDEXES = int(os.getenv('DELAY_BETWEEN_INDEXES', 15))
@@ -24,7 +71,39 @@ class Config:
 
     # Common Crawl
     CC_INDEX_BASE_URL = "https://index.commoncrawl.org"
-    CC_DATA_URL = "https://data.commoncrawl.org/"
+    CC_DATA_URL = os.getenv('CC_DATA_URL', "https://data.commoncrawl.org/")
+
+    # Common Crawl - Presupuesto global de peticiones (token bucket en Redis, AIMD)
+    CC_RATE_LIMIT = float(os.getenv('CC_RATE_LIMIT', 1.0))  # req/s para todo el cluster
+    CC_RATE_BURST = float(os.getenv('CC_RATE_BURST', 2))
+    CC_RATE_MIN = float(os.getenv('CC_RATE_MIN', 0.1))
+    CC_RATE_DECREASE = float(os.getenv('CC_RATE_DECREASE', 0.5))  # Factor ante 403/429/503
+    CC_RATE_INCREASE = float(os.getenv('CC_RATE_INCREASE', 0.01))  # req/s por respuesta exitosa
+    CC_RATE_COOLDOWN_MS = int(os.getenv('CC_RATE_COOLDOWN_MS', 5000))
+    CC_REQUEST_DELAY = float(os.getenv('CC_REQUEST_DELAY', 5.0))  # Pausa fija sin limitador
+
+    # Common Crawl - Coalescencia de rangos del mismo WARC
+    FETCH_PLAN_WINDOW = int(os.getenv('FETCH_PLAN_WINDOW', 16))  # Tareas leídas por ronda
+    FETCH_COALESCE_GAP = int(os.getenv('FETCH_COALESCE_GAP', 32 * 1024))  # Bytes máximos entre rangos
+    FETCH_COALESCE_MAX_BYTES = int(os.getenv('FETCH_COALESCE_MAX_BYTES', 4 * 1024 * 1024))
+
+    # Bytes del payload HTML que se leen por registro (el texto se recorta a 2000 caracteres)
+    WARC_MAX_PAYLOAD_BYTES = int(os.getenv('WARC_MAX_PAYLOAD_BYTES', 512 * 1024))
+
+    # Extractor de HTML: lxml (perfiles por dominio) o bs4 (html.parser)
+    HTML_EXTRACTOR = os.getenv('HTML_EXTRACTOR', 'lxml')
+
+    # Caché en disco de segmentos WARC (vacío = desactivada); compartida por los procesos del nodo
+    SEGMENT_CACHE_DIR = os.getenv('SEGMENT_CACHE_DIR', '')
+    SEGMENT_CACHE_MAX_BYTES = int(os.getenv('SEGMENT_CACHE_MAX_BYTES', 2 * 1024 ** 3))
+
+    # Modo replay: leer los WARC de un directorio local en vez de Common Crawl (vacío = HTTP)
+    WARC_LOCAL_DIR = os.getenv('WARC_LOCAL_DIR', '')
+
+    # Motor de descarga: threads (requests bloqueante) o async (asyncio + aiohttp)
+    FETCH_ENGINE = os.getenv('FETCH_ENGINE', 'threads')
+    FETCH_MAX_INFLIGHT = int(os.getenv('FETCH_MAX_INFLIGHT', 200))  # Peticiones simultáneas (async)
+    FETCH_OUTPUT_QUEUE = int(os.getenv('FETCH_OUTPUT_QUEUE', 64))  # Payloads esperando extracción
 
     # Dashboard
     DASHBOARD_MAX_RESULTS = int(os.getenv('DASHBOARD_MAX_RESULTS', 500))
@@ -0,0 +1,81 @@
+"""
+Histogramas de latencia con buckets logarítmicos.
+
+El bucket i cubre (GROWTH^(i-1), GROWTH^i] ms con GROWTH = 2^(1/8), así que
+cualquier percentil tiene un error relativo menor al 9% con ~150 buckets
+entre 1ms y 10 minutos. Los conteos son enteros por bucket: los
+histogramas de todos los workers se suman en Redis con HINCRBY sin perder
+precisión, y el dashboard calcula p50/p95/p99 sobre la suma.
+
+Claves en Redis:
+    latency_hist:<etapa>:<minuto epoch>     hash bucket -> conteo (cluster, 2h)
+    latency_hist_worker:<worker>:<etapa>    hash bucket -> conteo (por worker)
+"""
+import math
+
+GROWTH = 2 ** (1 / 8)
+BUCKETS_PER_DOUBLING = 8
+
+# Etapas de processing_times (campo '<etapa>_ms' de cada resultado)
+STAGES = ('download', 'extraction', 'nlp', 'total')
+
+CLUSTER_KEY = 'latency_hist:{stage}:{minute}'
+WORKER_KEY = 'latency_hist_worker:{worker_id}:{stage}'
+CLUSTER_TTL = 2 * 3600
+
+
+def bucket_for(ms):
+    """Índice del bucket de una latencia en ms (0 = hasta 1ms)"""
+    if ms <= 1:
+        return 0
+    return math.ceil(math.log2(ms) * BUCKETS_PER_DOUBLING - 1e-9)
+
+
+def bucket_upper(bucket):
+    """Límite superior (ms) del bucket"""
+    return GROWTH ** bucket
+
+
+class LatencyHistogram:
+
+    def __init__(self, counts=None):
+        self.counts = {}  # bucket -> conteo
+        if counts:
+            self.merge(counts)
+
+    @classmethod
+    def from_redis(cls, mapping):
+        """Desde un HGETALL (claves y valores pueden venir en bytes)"""
+        return cls({int(bucket): int(count) for bucket, count in mapping.items()})
+
+    def record(self, ms, count=1):
+        bucket = bucket_for(ms)
+        self.counts[bucket] = self.counts.get(bucket, 0) + count
+
+    def merge(self, other):
+        counts = other.counts if isinstance(other, LatencyHistogram) else other
+        for bucket, count in counts.items():
+            self.counts[bucket] = self.counts.get(bucket, 0) + count
+
+    @property
+    def total(self):
+        return sum(self.counts.values())
+
+    def percentile(self, p):
+        """Latencia (ms, límite superior del bucket) bajo la que cae el p% de las muestras"""
+        total = self.total
+        if not total:
+            return None
+        threshold = total * p / 100
+        seen = 0
+        for bucket in sorted(self.counts):
+            seen += self.counts[bucket]
+            if seen >= threshold:
+                return bucket_upper(bucket)
+        return bucket_upper(max(self.counts))
+
+    def percentiles(self, ps=(50, 95, 99)):
+        return {f'p{p}': self.percentile(p) for p in ps}
+
+    def clear(self):
+        self.counts = {}
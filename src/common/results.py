@@ -0,0 +1,133 @@
+"""
+Persistencia de resultados: una sola escritura por artículo.
+
+Cada resultado se serializa una vez con msgpack y se guarda en la lista
+'resultados_dashboard'. El historial de correlaciones, que era una copia
+JSON casi idéntica ('correlaciones_history') y nadie leía, ya no se escribe.
+
+Las entradas JSON escritas por versiones anteriores se siguen leyendo: un
+objeto JSON empieza con '{' y un mapa msgpack nunca empieza con ese byte.
+
+Además los workers mantienen agregados por fecha y por dominio (un hash
+pequeño por clave: conteos con HINCRBY, suma de polaridad y de cuadrados
+con HINCRBYFLOAT) e índices con los nombres existentes, para que el
+dashboard lea O(días) claves en vez de todos los resultados.
+rebuild_aggregates los recalcula desde la lista de resultados (resultados
+anteriores a los agregados): `python main.py rebuild-aggregates`.
+"""
+import json
+
+import msgpack
+
+RESULTS_KEY = 'resultados_dashboard'
+
+DAILY_KEY = 'sentiment_daily:{name}'
+DAILY_INDEX = 'sentiment_days'
+DOMAIN_KEY = 'sentiment_domain:{name}'
+DOMAIN_INDEX = 'sentiment_domains'
+FLOAT_FIELDS = ('polarity_sum', 'polarity_sq')
+CLASSIFICATION_FIELDS = {'positivo': 'pos', 'negativo': 'neg'}  # Resto: 'neu'
+UNKNOWN_DOMAIN = 'Desconocido'
+
+
+def _default(obj):
+    if hasattr(obj, 'isoformat'):
+        return obj.isoformat()
+    raise TypeError(f"Type {type(obj)} not serializable")
+
+
+def pack_result(result):
+    return msgpack.packb(result, default=_default, use_bin_type=True)
+
+
+def unpack_result(payload):
+    if payload[:1] in (b'{', '{'):
+        return json.loads(payload)
+    return msgpack.unpackb(payload, raw=False)
+
+
+def read_results(redis_client, limit=None):
+    """Resultados más recientes primero (el cliente Redis no debe decodificar respuestas)"""
+    payloads = redis_client.lrange(RESULTS_KEY, 0, (limit or 0) - 1)
+    return [unpack_result(payload) for payload in payloads if payload]
+
+
+def aggregate_fields(result):
+    """Incrementos de un resultado en su hash de fecha y de dominio"""
+    sentiment = result.get('sentiment') or {}
+    polarity = float(sentiment.get('polarity') or 0)
+    classification = CLASSIFICATION_FIELDS.get(sentiment.get('classification'), 'neu')
+    return {'count': 1, classification: 1, 'polarity_sum': polarity, 'polarity_sq': polarity * polarity}
+
+
+def aggregate_names(result):
+    """(fecha o None, dominio) de los hashes a los que suma un resultado"""
+    fecha = result.get('fecha')
+    return (str(fecha) if fecha else None), result.get('domain') or UNKNOWN_DOMAIN
+
+
+def _text(value):
+    return value.decode('utf-8') if isinstance(value, bytes) else value
+
+
+def read_aggregates(redis_client, index_key, key_format):
+    """{nombre: {campo: valor}} de todos los hashes del índice (un pipeline)"""
+    names = sorted(_text(name) for name in redis_client.smembers(index_key))
+    pipe = redis_client.pipeline(transaction=False)
+    for name in names:
+        pipe.hgetall(key_format.format(name=name))
+
+    aggregates = {}
+    for name, raw in zip(names, pipe.execute()):
+        fields = {'pos': 0, 'neg': 0, 'neu': 0, 'count': 0, 'polarity_sum': 0.0, 'polarity_sq': 0.0}
+        for field, value in raw.items():
+            field = _text(field)
+            fields[field] = float(value) if field in FLOAT_FIELDS else int(value)
+        if fields['count']:
+            aggregates[name] = fields
+    return aggregates
+
+
+
+def rebuild_aggregates(redis_client, batch=5000):
+    """
+    Recalcula los agregados por fecha y dominio desde 'resultados_dashboard'
+    (la lista no se recorta: tiene todos los resultados). Los hashes nuevos
+    reemplazan a los anteriores en una transacción; correr con los workers
+    detenidos, o sus incrementos de ese intervalo se pierden.
+    Retorna (resultados, fechas, dominios).
+    """
+    daily, domains = {}, {}
+    total = 0
+    start = 0
+    while True:
+        payloads = redis_client.lrange(RESULTS_KEY, start, start + batch - 1)
+        for payload in payloads:
+            if not payload:
+                continue
+            result = unpack_result(payload)
+            fecha, domain = aggregate_names(result)
+            increments = aggregate_fields(result)
+            targets = [domains.setdefault(domain, {})]
+            if fecha:
+                targets.append(daily.setdefault(fecha, {}))
+            for fields in targets:
+                for field, amount in increments.items():
+                    fields[field] = fields.get(field, 0) + amount
+            total += 1
+        if len(payloads) < batch:
+            break
+        start += batch
+
+    old_keys = [DAILY_KEY.format(name=_text(name)) for name in redis_client.smembers(DAILY_INDEX)]
+    old_keys += [DOMAIN_KEY.format(name=_text(name)) for name in redis_client.smembers(DOMAIN_INDEX)]
+
+    pipe = redis_client.pipeline(transaction=True)
+    pipe.delete(DAILY_INDEX, DOMAIN_INDEX, *old_keys)
+    for index_key, key_format, aggregates in ((DAILY_INDEX, DAILY_KEY, daily), (DOMAIN_INDEX, DOMAIN_KEY, domains)):
+        for name, fields in aggregates.items():
+            pipe.hset(key_format.format(name=name), mapping=fields)
+        if aggregates:
+            pipe.sadd(index_key, *aggregates)
+    pipe.execute()
+    return total, len(daily), len(domains)
@@ -0,0 +1,208 @@
+"""
+Cola de tareas del cluster (producers -> workers).
+
+Dos backends con la misma interfaz, elegidos con QUEUE_BACKEND:
+
+- list: 'warc_queue' como lista (LPUSH / LPOP). Una tarea que un pod ya
+  leyó se pierde si el pod muere antes de terminarla.
+- stream: Redis Streams con grupo de consumidores. XADD por lotes,
+  XREADGROUP COUNT n (muchas tareas por ida y vuelta), XACK + XDEL cuando
+  el resultado ya está en Redis (o la página no tenía texto) y XAUTOCLAIM
+  para recuperar las tareas pendientes más de QUEUE_CLAIM_IDLE_MS: las de un
+  consumidor muerto y las que no se confirmaron porque su descarga falló.
+  Una tarea entregada más de QUEUE_MAX_DELIVERIES veces se descarta (no
+  bloquea la cola para siempre).
+
+Como las tareas terminadas se borran del stream, size() (XLEN) es lo
+pendiente más lo no leído, igual que LLEN en la lista.
+"""
+import time
+
+from redis.exceptions import ResponseError
+
+from .config import Config
+
+
+def _text(value):
+    return value.decode('utf-8') if isinstance(value, bytes) else value
+
+
+class ListTaskQueue:
+    backend = 'list'
+
+    def __init__(self, redis_client, name='warc_queue'):
+        self.redis_client = redis_client
+        self.name = name
+
+    def push(self, payloads):
+        """Encola tareas (JSON) en una sola llamada"""
+        if payloads:
+            self.redis_client.lpush(self.name, *payloads)
+        return len(payloads)
+
+    def pop(self, count, block_seconds=0):
+        """Hasta `count` tareas; con block_seconds espera la primera si la cola está vacía"""
+        result = self.redis_client.lpop(self.name, count)
+        if result:
+            return [_text(item) for item in result]
+        if block_seconds:
+            result = self.redis_client.blpop(self.name, timeout=block_seconds)
+            if result:
+                return [_text(result[1])]
+        return []
+
+    def ack(self, payloads):
+        """Sin confirmación: LPOP ya sacó la tarea"""
+
+    def size(self):
+        return self.redis_client.llen(self.name)
+
+    def stats(self):
+        return {'size': self.size()}
+
+
+class StreamTaskQueue:
+    backend = 'stream'
+
+    CLAIM_INTERVAL = 30  # Segundos entre barridos de XAUTOCLAIM por consumidor
+    CONSUMER_IDLE_MS = 3600 * 1000  # Consumidores sin pendientes e inactivos se eliminan del grupo
+
+    def __init__(self, redis_client, consumer=None, stream=None, group=None,
+                 claim_idle_ms=None, max_deliveries=None):
+        self.redis_client = redis_client
+        self.consumer = consumer or Config.WORKER_ID
+        self.stream = stream or Config.QUEUE_STREAM
+        self.group = group or Config.QUEUE_GROUP
+        self.claim_idle_ms = claim_idle_ms or Config.QUEUE_CLAIM_IDLE_MS
+        self.max_deliveries = max_deliveries or Config.QUEUE_MAX_DELIVERIES
+        self._ids = {}  # payload -> [ids entregados sin confirmar]
+        self._last_claim = 0
+        self._group_ready = False
+        self.reclaimed = 0
+        self.dropped = 0
+
+    def _ensure_group(self):
+        if self._group_ready:
+            return
+        try:
+            self.redis_client.xgroup_create(self.stream, self.group, id='0', mkstream=True)
+        except ResponseError as e:
+            if 'BUSYGROUP' not in str(e):
+                raise
+        self._group_ready = True
+
+    def push(self, payloads):
+        """XADD de todas las tareas en un pipeline"""
+        if not payloads:
+            return 0
+        pipe = self.redis_client.pipeline(transaction=False)
+        for payload in payloads:
+            pipe.xadd(self.stream, {'task': payload})
+        pipe.execute()
+        return len(payloads)
+
+    def _remember(self, entries):
+        payloads = []
+        for entry_id, fields in entries:
+            payload = _text(fields.get(b'task', fields.get('task')))
+            if payload is None:
+                continue  # Entrada borrada mientras estaba pendiente
+            ids = self._ids.setdefault(payload, [])
+            if _text(entry_id) not in ids:  # Reclamada por el mismo consumidor
+                ids.append(_text(entry_id))
+            payloads.append(payload)
+        return payloads
+
+    def _reclaim(self, count):
+        """Tareas pendientes sin confirmar (idle > claim_idle_ms): consumidores caídos o descargas fallidas"""
+        now = time.time()
+        if now - self._last_claim < self.CLAIM_INTERVAL:
+            return []
+        self._last_claim = now
+
+        _, entries, _ = self.redis_client.xautoclaim(
+            self.stream, self.group, self.consumer,
+            min_idle_time=self.claim_idle_ms, start_id='0-0', count=count)
+        entries = [entry for entry in entries if entry[1]]
+        if not entries:
+            self._forget_consumers()
+            return []
+
+        # Descartar las que ya fallaron demasiadas veces
+        pipe = self.redis_client.pipeline(transaction=False)
+        for entry_id, _ in entries:
+            pipe.xpending_range(self.stream, self.group, min=entry_id, max=entry_id, count=1)
+        deliveries = [info[0]['times_delivered'] if info else 0 for info in pipe.execute()]
+        poisoned = [entry_id for (entry_id, _), times in zip(entries, deliveries) if times > self.max_deliveries]
+        if poisoned:
+            self._delete(poisoned)
+            self.dropped += len(poisoned)
+            print(f"[Queue] {len(poisoned)} tareas descartadas tras {self.max_deliveries} entregas")
+
+        entries = [entry for entry, times in zip(entries, deliveries) if times <= self.max_deliveries]
+        self.reclaimed += len(entries)
+        if entries:
+            print(f"[Queue] {len(entries)} tareas pendientes recuperadas")
+        return self._remember(entries)
+
+    def _forget_consumers(self):
+        """Elimina del grupo consumidores sin pendientes que ya no existen"""
+        for info in self.redis_client.xinfo_consumers(self.stream, self.group):
+            name = _text(info['name'])
+            if name != self.consumer and not info['pending'] and info['idle'] > self.CONSUMER_IDLE_MS:
+                self.redis_client.xgroup_delconsumer(self.stream, self.group, name)
+
+    def pop(self, count, block_seconds=0):
+        """Reclamadas primero; luego XREADGROUP COUNT n (con BLOCK si se pide)"""
+        self._ensure_group()
+        payloads = self._reclaim(count)
+        if payloads:
+            return payloads
+
+        reply = self.redis_client.xreadgroup(
+            self.group, self.consumer, {self.stream: '>'}, count=count,
+            block=int(block_seconds * 1000) if block_seconds else None)
+        if not reply:
+            return []
+        return self._remember(reply[0][1])
+
+    def _delete(self, ids):
+        pipe = self.redis_client.pipeline(transaction=False)
+        pipe.xack(self.stream, self.group, *ids)
+        pipe.xdel(self.stream, *ids)
+        pipe.execute()
+
+    def ack(self, payloads):
+        """XACK + XDEL de las tareas terminadas (resultado ya guardado o descargada sin texto)"""
+        ids = []
+        for payload in payloads:
+            pending = self._ids.get(payload)
+            if pending:
+                ids.append(pending.pop(0))
+                if not pending:
+                    del self._ids[payload]
+        if ids:
+            self._delete(ids)
+
+    def size(self):
+        return self.redis_client.xlen(self.stream)
+
+    def stats(self):
+        """Tamaño, lag (entradas sin entregar al grupo) y pendientes sin confirmar"""
+        stats = {'size': self.size(), 'lag': 0, 'pending': 0}
+        try:
+            for info in self.redis_client.xinfo_groups(self.stream):
+                if _text(info['name']) == self.group:
+                    stats['lag'] = info.get('lag') or 0
+                    stats['pending'] = info['pending']
+        except ResponseError:
+            pass  # El stream aún no existe
+        return stats
+
+
+def create_task_queue(redis_client, consumer=None, backend=None):
+    """Cola según QUEUE_BACKEND ('list' por defecto o 'stream')"""
+    backend = backend or Config.QUEUE_BACKEND
+    if backend == 'stream':
+        return StreamTaskQueue(redis_client, consumer=consumer)
+    return ListTaskQueue(redis_client)
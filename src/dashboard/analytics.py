@@ -0,0 +1,135 @@
+"""
+Analítica incremental Sentimiento vs COLCAP.
+
+Parte de los agregados diarios que mantienen los workers en Redis (conteo
+y suma de polaridad por fecha): nunca recorre los resultados. Con NumPy,
+sobre la polaridad promedio por día hábil y el retorno diario del COLCAP
+(cierre / cierre anterior - 1):
+
+- Pearson y Spearman de toda la muestra y en ventana móvil de
+  ROLLING_WINDOW días (días con noticias y sesión).
+- Correlación cruzada con rezagos -MAX_LAG..+MAX_LAG días hábiles: rezago k
+  compara la polaridad del día t con el retorno del día t+k (k > 0: el
+  sentimiento anticipa al índice).
+
+El cálculo queda en caché y se repite solo cuando aparecen días nuevos, o
+cuando cambiaron los promedios de días existentes y pasaron REFRESH_SECONDS.
+"""
+import threading
+import time
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+def _pearson_rows(a, b):
+    """Pearson fila a fila (último eje); NaN si alguna serie es constante"""
+    a = a - a.mean(axis=-1, keepdims=True)
+    b = b - b.mean(axis=-1, keepdims=True)
+    numerator = (a * b).sum(axis=-1)
+    denominator = np.sqrt((a * a).sum(axis=-1) * (b * b).sum(axis=-1))
+    return np.divide(numerator, denominator, out=np.full(numerator.shape, np.nan), where=denominator > 0)
+
+
+def _ranks(a):
+    """Rangos ordinales por fila (polaridades y retornos son continuos: empates raros)"""
+    return a.argsort(axis=-1).argsort(axis=-1).astype(np.float64)
+
+
+def _value(x):
+    return None if np.isnan(x) else round(float(x), 4)
+
+
+class SentimentAnalytics:
+
+    ROLLING_WINDOW = 20
+    MAX_LAG = 5
+    MIN_PAIRS = 3  # Pares (polaridad, retorno) mínimos para reportar un coeficiente
+    REFRESH_SECONDS = 30
+
+    def __init__(self, colcap_dates, colcap_closes):
+        order = sorted(range(len(colcap_dates)), key=lambda i: colcap_dates[i])
+        self.trading_days = [colcap_dates[i] for i in order]
+        closes = np.array([colcap_closes[i] for i in order], dtype=np.float64)
+        self.returns = np.full(len(closes), np.nan)
+        if len(closes) > 1:
+            self.returns[1:] = closes[1:] / closes[:-1] - 1
+        self._day_index = {day: i for i, day in enumerate(self.trading_days)}
+
+        self._lock = threading.Lock()
+        self._count = np.zeros(len(self.trading_days))
+        self._polarity_sum = np.zeros(len(self.trading_days))
+        self._days = 0  # Días hábiles con noticias
+        self._changed = False
+        self._cache = None
+        self._cache_days = 0
+        self._computed_at = 0.0
+
+    def update(self, daily):
+        """Agregados diarios de los workers ({fecha: {'count', 'polarity_sum', ...}})"""
+        count = np.zeros(len(self.trading_days))
+        polarity_sum = np.zeros(len(self.trading_days))
+        for day, agg in daily.items():
+            index = self._day_index.get(day)
+            if index is not None:
+                count[index] = agg['count']
+                polarity_sum[index] = agg['polarity_sum']
+
+        with self._lock:
+            if not np.array_equal(count, self._count):
+                self._changed = True
+            self._count = count
+            self._polarity_sum = polarity_sum
+            self._days = int(np.count_nonzero(count))
+
+    def correlations(self):
+        """Coeficientes en caché; se recalculan con días nuevos o agregados viejos"""
+        with self._lock:
+            new_days = self._days != self._cache_days
+            stale = self._changed and time.monotonic() - self._computed_at >= self.REFRESH_SECONDS
+            if self._cache is None or new_days or stale:
+                self._cache = self._compute()
+                self._cache_days = self._days
+                self._computed_at = time.monotonic()
+                self._changed = False
+            return self._cache
+
+    def _compute(self):
+        count = self._count
+        sentiment = np.divide(self._polarity_sum, count, out=np.full(len(count), np.nan), where=count > 0)
+        paired = ~np.isnan(sentiment) & ~np.isnan(self.returns)
+        x = sentiment[paired]
+        y = self.returns[paired]
+
+        stats = {'pairs': int(paired.sum()), 'pearson': None, 'spearman': None,
+                 'rolling': {'dates': [], 'pearson': [], 'spearman': []},
+                 'lags': {'lag': [], 'corr': [], 'pairs': []}}
+        if len(x) >= self.MIN_PAIRS:
+            stats['pearson'] = _value(_pearson_rows(x, y))
+            stats['spearman'] = _value(_pearson_rows(_ranks(x), _ranks(y)))
+
+        window = self.ROLLING_WINDOW
+        if len(x) >= window:
+            x_windows = sliding_window_view(x, window)
+            y_windows = sliding_window_view(y, window)
+            days = [day for day, ok in zip(self.trading_days, paired) if ok]
+            stats['rolling'] = {
+                'dates': days[window - 1:],
+                'pearson': [_value(v) for v in _pearson_rows(x_windows, y_windows)],
+                'spearman': [_value(v) for v in _pearson_rows(_ranks(x_windows), _ranks(y_windows))]
+            }
+
+        n = len(sentiment)
+        for lag in range(-self.MAX_LAG, self.MAX_LAG + 1):
+            if abs(lag) >= n:
+                continue
+            if lag >= 0:
+                a, b = sentiment[:n - lag], self.returns[lag:]
+            else:
+                a, b = sentiment[-lag:], self.returns[:n + lag]
+            both = ~np.isnan(a) & ~np.isnan(b)
+            pairs = int(both.sum())
+            stats['lags']['lag'].append(lag)
+            stats['lags']['pairs'].append(pairs)
+            stats['lags']['corr'].append(_value(_pearson_rows(a[both], b[both])) if pairs >= self.MIN_PAIRS else None)
+        return stats
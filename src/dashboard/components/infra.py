@@ -7,7 +7,7 @@ import dash_bootstrap_components as dbc
 import plotly.graph_objects as go
 from datetime import datetime
 
-from ..data import get_metrics, get_workers, get_throughput_history, record_throughput_snapshot, get_scalability_metrics, get_producer_logs, clear_scalability_history
+from ..data import get_metrics, get_workers, get_throughput_history, record_throughput_snapshot, get_scalability_metrics, get_producer_logs, clear_scalability_history, get_stage_latencies, get_concurrency_history
 from ..styles import COLORS, TABLE_HEADER_STYLE, TABLE_CELL_STYLE, GRAPH_CONFIG
 
 
@@ -16,7 +16,8 @@ def _build_infra_cards(metrics, workers, throughput):
     return dbc.Row([
         dbc.Col(html.Div([
             html.H2(metrics['queue'], style={'color': COLORS['primary']}),
-            html.P("Tareas Pendientes")
+            html.P("Tareas Pendientes" if metrics.get('queue_lag') is None else
+                   f"Tareas Pendientes (lag {metrics['queue_lag']} | sin ACK {metrics['queue_pending']})")
         ], className="metric-card"), lg=3, md=6, className="mb-3"),
         dbc.Col(html.Div([
             html.H2(metrics['processed'], style={'color': COLORS['success']}),
@@ -169,7 +170,12 @@ def _build_workers_table(workers):
             'Worker': w.get('worker_id', '-').split('-')[-1],
             'Procesados': int(w.get('processed', 0)),
             'Errores': int(w.get('errors', 0)),
-            'Tasa': f"{float(w.get('rate', 0)):.1f}/min"
+            'Tasa': f"{float(w.get('rate', 0)):.1f}/min",
+            'Cola I/O': int(w.get('queue_fetch', 0)),
+            'Cola NLP': int(w.get('queue_inference', 0)),
+            'Slots I/O': f"{int(w.get('slots_busy', 0))}/{int(w.get('slots_total', 0))}" if 'slots_total' in w else '-',
+            'Ocupación': f"{float(w['slot_occupancy']):.0%}" if 'slot_occupancy' in w else '-',
+            'Límite': int(w['concurrency_limit']) if 'concurrency_limit' in w else '-'
         }
         for w in workers
     ]
@@ -280,6 +286,118 @@ def _build_scalability_chart(current_workers=None):
 
 
 
+STAGE_LABELS = {
+    'download': 'Descarga',
+    'extraction': 'Extracción',
+    'nlp': 'NLP',
+    'total': 'Total'
+}
+
+
+def _build_latency_chart(latencies):
+    """Percentiles p50/p95/p99 por etapa (escala logarítmica)"""
+    fig = go.Figure()
+
+    if not latencies:
+        fig.add_annotation(text="Sin latencias en los últimos 5 minutos", showarrow=False,
+                          font=dict(size=14, color=COLORS['gray']))
+        fig.update_layout(template='plotly_white', height=280)
+        return fig
+
+    stages = [s for s in STAGE_LABELS if s in latencies]
+    labels = [STAGE_LABELS[s] for s in stages]
+    for percentile, color in (('p50', COLORS['success']), ('p95', COLORS['primary']), ('p99', COLORS['danger'])):
+        values = [latencies[s][percentile] for s in stages]
+        fig.add_trace(go.Bar(
+            x=labels,
+            y=values,
+            name=percentile,
+            marker_color=color,
+            text=[f"{v:.0f}" for v in values],
+            textposition='outside'
+        ))
+
+    fig.update_layout(
+        template='plotly_white',
+        height=280,
+        margin=dict(l=60, r=25, t=30, b=40),
+        barmode='group',
+        xaxis=dict(title='Etapa', title_font_size=11),
+        yaxis=dict(title='Latencia (ms, log)', type='log', gridcolor='#eee', title_font_size=11),
+        legend=dict(orientation='h', y=1.15, x=0.5, xanchor='center', font=dict(size=10))
+    )
+    return fig
+
+
+def _build_latency_table(latencies):
+    """Tabla de percentiles por etapa"""
+    if not latencies:
+        return dbc.Alert("Sin datos de latencia", color="secondary")
+
+    data = [
+        {
+            'Etapa': STAGE_LABELS[stage],
+            'Muestras': latencies[stage]['count'],
+            'p50 (ms)': round(latencies[stage]['p50']),
+            'p95 (ms)': round(latencies[stage]['p95']),
+            'p99 (ms)': round(latencies[stage]['p99'])
+        }
+        for stage in STAGE_LABELS if stage in latencies
+    ]
+
+    return dash_table.DataTable(
+        data=data,
+        columns=[{'name': c, 'id': c} for c in data[0].keys()],
+        style_header=TABLE_HEADER_STYLE,
+        style_cell=TABLE_CELL_STYLE,
+        style_data_conditional=[{'if': {'row_index': 'odd'}, 'backgroundColor': '#f8f9fa'}],
+    )
+
+
+def _build_concurrency_chart(history, workers):
+    """Límite de concurrencia de cada worker en el tiempo (escalones en cada cambio)"""
+    fig = go.Figure()
+
+    if not history:
+        fig.add_annotation(text="Sin control adaptativo activo (CONCURRENCY_ADAPTIVE=1, motor threads)",
+                          showarrow=False, font=dict(size=14, color=COLORS['gray']))
+        fig.update_layout(template='plotly_white', height=280)
+        return fig
+
+    active = {w.get('worker_id'): w for w in workers}
+    now = datetime.now()
+    for worker, changes in sorted(history.items()):
+        times = [datetime.fromtimestamp(c['ts']) for c in changes]
+        limits = [c['limit'] for c in changes]
+        reasons = [c.get('reason', '') for c in changes]
+        # Extender el último escalón hasta ahora si el worker sigue activo
+        if worker in active:
+            times.append(now)
+            limits.append(limits[-1])
+            reasons.append('actual')
+        fig.add_trace(go.Scatter(
+            x=times,
+            y=limits,
+            name=worker.split('-')[-1],
+            mode='lines+markers',
+            line=dict(shape='hv', width=2),
+            marker=dict(size=5),
+            text=reasons,
+            hovertemplate='%{y} slots (%{text})<extra></extra>'
+        ))
+
+    fig.update_layout(
+        template='plotly_white',
+        height=280,
+        margin=dict(l=60, r=25, t=30, b=40),
+        xaxis=dict(title='Hora', title_font_size=11, gridcolor='#eee'),
+        yaxis=dict(title='Slots de I/O', gridcolor='#eee', title_font_size=11, rangemode='tozero'),
+        legend=dict(orientation='h', y=1.15, x=0.5, xanchor='center', font=dict(size=10)),
+        hovermode='x unified'
+    )
+    return fig
+
+
 def _build_producer_logs():
     """Logs del producer"""
     logs = get_producer_logs(limit=30)
@@ -358,6 +476,10 @@ def build_infra():
     fig_throughput = _build_throughput_chart()
     fig_scalability = _build_scalability_chart(current_workers=current_workers)
     wtbl = _build_workers_table(workers)
+    latencies = get_stage_latencies(minutes=5)
+    fig_latency = _build_latency_chart(latencies)
+    latency_tbl = _build_latency_table(latencies)
+    fig_concurrency = _build_concurrency_chart(get_concurrency_history(), workers)
     producer_logs = _build_producer_logs()
 
     return html.Div([
@@ -395,6 +517,27 @@ def build_infra():
             ], style={'minHeight': '300px'})
         ], className="card-section", style={'padding': '20px', 'marginBottom': '20px'}),
 
+        # Latencias por etapa
+        html.Div([
+            html.H5("Latencia por Etapa", className="section-title"),
+            html.P("Percentiles p50/p95/p99 de todos los workers (ventana: 5 min). "
+                   "Indica si el cluster está limitado por red, extracción o inferencia",
+                  style={'color': COLORS['gray'], 'fontSize': '0.8rem', 'marginBottom': '20px'}),
+            dbc.Row([
+                dbc.Col(dcc.Graph(figure=fig_latency, config=GRAPH_CONFIG), lg=7, className="mb-3"),
+                dbc.Col(html.Div(latency_tbl, style={'paddingTop': '20px'}), lg=5, className="mb-3"),
+            ])
+        ], className="card-section", style={'padding': '20px', 'marginBottom': '20px'}),
+
+        # Concurrencia adaptativa
+        html.Div([
+            html.H5("Concurrencia Adaptativa", className="section-title"),
+            html.P("Slots de I/O por worker (AIMD): suben con saturación y throughput creciente, "
+                   "bajan ante 403/429, errores o p90 sobre el objetivo",
+                  style={'color': COLORS['gray'], 'fontSize': '0.8rem', 'marginBottom': '20px'}),
+            dcc.Graph(figure=fig_concurrency, config=GRAPH_CONFIG)
+        ], className="card-section", style={'padding': '20px', 'marginBottom': '20px'}),
+
         # Logs del Producer
         html.Div([
             html.H5("Logs del Producer", className="section-title"),
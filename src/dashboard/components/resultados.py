@@ -5,21 +5,23 @@ Visualización de noticias analizadas y correlación con COLCAP.
 from dash import dcc, html, dash_table
 import dash_bootstrap_components as dbc
 import plotly.graph_objects as go
-import pandas as pd
 import numpy as np
 
-from ..data import get_results, load_colcap
+from src.common.config import Config
+from ..data import (
+    get_daily_aggregates, get_domain_aggregates, get_results, get_sentiment_analytics, load_colcap
+)
 from ..styles import (
     COLORS, TABLE_HEADER_STYLE, TABLE_CELL_STYLE,
     TABLE_CONDITIONAL_STYLES, GRAPH_CONFIG
 )
 
 
-def _build_metric_cards(results, pos, neg, neu):
+def _build_metric_cards(total, pos, neg, neu):
     """Tarjetas de métricas"""
     return dbc.Row([
         dbc.Col(html.Div([
-            html.H2(len(results), style={'color': COLORS['primary']}),
+            html.H2(total, style={'color': COLORS['primary']}),
             html.P("Noticias Analizadas")
         ], className="metric-card"), lg=3, md=6, className="mb-3"),
         dbc.Col(html.Div([
@@ -37,31 +39,6 @@ def _build_metric_cards(results, pos, neg, neu):
     ], className="mb-4")
 
 
-def _process_news_by_date(results):
-    """Agrupa noticias por fecha"""
-    news_by_date = {}
-    for r in results:
-        fecha = r.get('fecha')
-        if fecha:
-            try:
-                fecha_dt = pd.to_datetime(fecha).date()
-                if fecha_dt not in news_by_date:
-                    news_by_date[fecha_dt] = {'pos': 0, 'neg': 0, 'neu': 0, 'polarities': [], 'titles': []}
-                sent = r.get('sentiment', {}).get('classification', 'neutral')
-                polarity = r.get('sentiment', {}).get('polarity', 0)
-                news_by_date[fecha_dt]['polarities'].append(polarity)
-                news_by_date[fecha_dt]['titles'].append(r.get('title', '')[:30])
-                if sent == 'positivo':
-                    news_by_date[fecha_dt]['pos'] += 1
-                elif sent == 'negativo':
-                    news_by_date[fecha_dt]['neg'] += 1
-                else:
-                    news_by_date[fecha_dt]['neu'] += 1
-            except:
-                pass
-    return news_by_date
-
-
 def _get_colcap_variations():
     """Obtiene valor COLCAP por fecha"""
     colcap_var = {}
@@ -80,14 +57,16 @@ def _build_correlation_chart(news_by_date, colcap_var):
 
     for fecha, data in news_by_date.items():
         if fecha in colcap_var:
-            avg_polarity = sum(data['polarities']) / len(data['polarities']) if data['polarities'] else 0
+            total_news = data['count']
+            avg_polarity = data['polarity_sum'] / total_news if total_news else 0
+            std_polarity = max(data['polarity_sq'] / total_news - avg_polarity ** 2, 0) ** 0.5 if total_news else 0
             valor = colcap_var[fecha]['valor']
-            total_news = data['pos'] + data['neg'] + data['neu']
 
             scatter_data['x'].append(avg_polarity)
             scatter_data['y'].append(valor)
             scatter_data['size'].append(max(10, min(30, total_news * 5)))
-            scatter_data['text'].append(f"{fecha}<br>{total_news} noticias<br>Polaridad: {avg_polarity:.2f}<br>COLCAP: {valor:,.0f}")
+            scatter_data['text'].append(f"{fecha}<br>{total_news} noticias<br>Polaridad: {avg_polarity:.2f} "
+                                        f"(σ {std_polarity:.2f})<br>COLCAP: {valor:,.0f}")
 
             if avg_polarity > 0.1:
                 scatter_data['color'].append(COLORS['success'])
@@ -134,6 +113,80 @@ def _build_correlation_chart(news_by_date, colcap_var):
     return fig
 
 
+def _format_coefficient(value):
+    return f"{value:+.2f}" if value is not None else '-'
+
+
+def _build_correlation_stats(stats):
+    """Coeficientes de toda la muestra (polaridad diaria vs retorno COLCAP)"""
+    best = None
+    for lag, corr in zip(stats['lags']['lag'], stats['lags']['corr']):
+        if corr is not None and (best is None or abs(corr) > abs(best[1])):
+            best = (lag, corr)
+
+    items = [
+        ("Pearson", _format_coefficient(stats['pearson'])),
+        ("Spearman", _format_coefficient(stats['spearman'])),
+        ("Mayor |corr| por rezago", f"{_format_coefficient(best[1])} ({best[0]:+d} d)" if best else '-'),
+        ("Días con noticias", stats['pairs']),
+    ]
+    return dbc.Row([
+        dbc.Col(html.Div([
+            html.H4(value, style={'color': COLORS['primary']}),
+            html.P(label)
+        ], className="metric-card"), lg=3, md=6, className="mb-3")
+        for label, value in items
+    ])
+
+
+def _build_rolling_chart(stats):
+    """Correlación móvil Pearson/Spearman"""
+    fig = go.Figure()
+    rolling = stats['rolling']
+    if rolling['dates']:
+        fig.add_trace(go.Scatter(x=rolling['dates'], y=rolling['pearson'], name='Pearson',
+                                 mode='lines', line=dict(color=COLORS['primary'], width=2)))
+        fig.add_trace(go.Scatter(x=rolling['dates'], y=rolling['spearman'], name='Spearman',
+                                 mode='lines', line=dict(color=COLORS['warning'], width=2, dash='dash')))
+        fig.add_hline(y=0, line_dash="dot", line_color="#aaa", line_width=1)
+    else:
+        fig.add_annotation(text="Esperando suficientes días con noticias...", showarrow=False,
+                          font=dict(size=14, color=COLORS['gray']))
+
+    fig.update_layout(
+        template='plotly_white',
+        height=260,
+        margin=dict(l=45, r=25, t=20, b=45),
+        xaxis=dict(gridcolor='#eee', tickfont_size=9),
+        yaxis=dict(title='Correlación', gridcolor='#eee', title_font_size=11, range=[-1, 1]),
+        legend=dict(orientation='h', y=1.12, x=0.5, xanchor='center', font=dict(size=9)),
+        hovermode='x unified'
+    )
+    return fig
+
+
+def _build_lag_chart(stats):
+    """Correlación cruzada por rezago (días hábiles)"""
+    lags = stats['lags']
+    corr = [c if c is not None else 0 for c in lags['corr']]
+    fig = go.Figure(go.Bar(
+        x=lags['lag'], y=corr,
+        marker_color=[COLORS['success'] if c >= 0 else COLORS['danger'] for c in corr],
+        text=[f"{c:+.2f}" if c is not None else '' for c in lags['corr']],
+        textposition='outside',
+        customdata=lags['pairs'],
+        hovertemplate='Rezago %{x} d<br>Corr: %{y:.3f}<br>Pares: %{customdata}<extra></extra>'
+    ))
+    fig.update_layout(
+        template='plotly_white',
+        height=260,
+        margin=dict(l=45, r=25, t=20, b=45),
+        xaxis=dict(title='Rezago (días; + = sentimiento antes del retorno)', dtick=1, title_font_size=10),
+        yaxis=dict(title='Correlación', gridcolor='#eee', title_font_size=11, range=[-1, 1])
+    )
+    return fig
+
+
 def _build_timeline_chart(news_by_date, colcap_var):
     """Gráfico de timeline  últimos 6 meses"""
     fig = go.Figure()
@@ -241,14 +294,9 @@ def _build_sentiment_pie(pos, neg, neu):
     return fig
 
 
-def _build_domain_bar(results):
-    """Gráfico de barras por dominio"""
-    domains = {}
-    for r in results:
-        d = r.get('domain', 'Desconocido')
-        domains[d] = domains.get(d, 0) + 1
-
-    sorted_domains = sorted(domains.items(), key=lambda x: x[1], reverse=True)
+def _build_domain_bar(domains):
+    """Gráfico de barras por dominio (agregados de los workers)"""
+    sorted_domains = sorted(((d, agg['count']) for d, agg in domains.items()), key=lambda x: x[1], reverse=True)
     fig = go.Figure(go.Bar(
         x=[d[0] for d in sorted_domains],
         y=[d[1] for d in sorted_domains],
@@ -301,22 +349,28 @@ def _build_results_table(results):
 
 def build_resultados():
     """Vista completa de resultados"""
-    results = get_results()
-
-    pos = sum(1 for r in results if r.get('sentiment', {}).get('classification') == 'positivo')
-    neg = sum(1 for r in results if r.get('sentiment', {}).get('classification') == 'negativo')
-    neu = len(results) - pos - neg
-
-    # Procesar datos
-    news_by_date = _process_news_by_date(results)
+    results = get_results(limit=Config.DASHBOARD_MAX_RESULTS)
+
+    # Agregados por dominio y por fecha (O(dominios + días), no O(resultados))
+    domains = get_domain_aggregates()
+    total = sum(agg['count'] for agg in domains.values())
+    pos = sum(agg['pos'] for agg in domains.values())
+    neg = sum(agg['neg'] for agg in domains.values())
+    neu = total - pos - neg
+
+    news_by_date = get_daily_aggregates()
+    analytics = get_sentiment_analytics(news_by_date)
+    correlation_stats = analytics.correlations()
     colcap_var = _get_colcap_variations()
 
     # Construir componentes
-    cards = _build_metric_cards(results, pos, neg, neu)
+    cards = _build_metric_cards(total, pos, neg, neu)
     fig_correlation = _build_correlation_chart(news_by_date, colcap_var)
+    fig_rolling = _build_rolling_chart(correlation_stats)
+    fig_lags = _build_lag_chart(correlation_stats)
     fig_timeline = _build_timeline_chart(news_by_date, colcap_var)
     fig_pie = _build_sentiment_pie(pos, neg, neu)
-    fig_domains = _build_domain_bar(results)
+    fig_domains = _build_domain_bar(domains)
     table = _build_results_table(results)
 
     return html.Div([
@@ -346,6 +400,19 @@ def build_resultados():
             ], width=12, className="mb-3"),
         ]),
 
+        # Coeficientes: polaridad promedio diaria vs retorno diario COLCAP
+        html.Div([
+            html.H5("Correlación con Retornos COLCAP", className="section-title"),
+            html.P(f"Polaridad promedio diaria vs retorno diario. Ventana móvil de "
+                   f"{analytics.ROLLING_WINDOW} días; rezagos ±{analytics.MAX_LAG} días hábiles",
+                  style={'color': COLORS['gray'], 'fontSize': '0.75rem', 'marginBottom': '8px'}),
+            _build_correlation_stats(correlation_stats),
+            dbc.Row([
+                dbc.Col(dcc.Graph(figure=fig_rolling, config=GRAPH_CONFIG), lg=7, md=12),
+                dbc.Col(dcc.Graph(figure=fig_lags, config=GRAPH_CONFIG), lg=5, md=12),
+            ])
+        ], className="card-section mb-3"),
+
         # Gráficos secundarios
         dbc.Row([
             dbc.Col([
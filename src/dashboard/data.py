@@ -4,21 +4,30 @@ Conexión a Redis y funciones de obtención de datos.
 """
 import redis
 import json
+import threading
+from datetime import date
+
 import pandas as pd
 
 from src.common.config import Config
+from src.common.histogram import CLUSTER_KEY, STAGES, LatencyHistogram
+from src.common.results import DAILY_INDEX, DAILY_KEY, DOMAIN_INDEX, DOMAIN_KEY, read_aggregates, read_results
+from src.common.task_queue import create_task_queue
+from .analytics import SentimentAnalytics
 
 # Configuración
 REDIS_HOST = Config.REDIS_HOST
 REDIS_PORT = Config.REDIS_PORT
 COLCAP_PATH = Config.COLCAP_DATA_PATH
 _colcap_data = None
+_analytics = None
+_analytics_lock = threading.Lock()
 
 
-def get_redis():
-    """Conexión a Redis"""
+def get_redis(decode=True):
+    """Conexión a Redis (decode=False para payloads binarios, p. ej. resultados en msgpack)"""
     try:
-        r = redis.Redis(host=REDIS_HOST, port=REDIS_PORT, db=0, decode_responses=True)
+        r = redis.Redis(host=REDIS_HOST, port=REDIS_PORT, db=0, decode_responses=decode)
         r.ping()
         return r
     except:
@@ -38,18 +47,59 @@ def load_colcap():
     return _colcap_data
 
 
-def get_results():
-    """Resultados del dashboard"""
-    r = get_redis()
+def get_results(limit=None):
+    """Resultados del dashboard (los `limit` más recientes)"""
+    r = get_redis(decode=False)
     if not r:
         return []
     try:
-        data = r.lrange('resultados_dashboard', 0, -1)
-        return [json.loads(x) for x in data if x]
+        return read_results(r, limit)
     except:
         return []
 
 
+def get_daily_aggregates():
+    """Agregados de sentimiento por fecha mantenidos por los workers ({date: campos})"""
+    r = get_redis()
+    if not r:
+        return {}
+    try:
+        daily = {}
+        for name, fields in read_aggregates(r, DAILY_INDEX, DAILY_KEY).items():
+            try:
+                daily[date.fromisoformat(name[:10])] = fields
+            except ValueError:
+                pass
+        return daily
+    except:
+        return {}
+
+
+def get_domain_aggregates():
+    """Agregados de sentimiento por dominio mantenidos por los workers"""
+    r = get_redis()
+    if not r:
+        return {}
+    try:
+        return read_aggregates(r, DOMAIN_INDEX, DOMAIN_KEY)
+    except:
+        return {}
+
+
+def get_sentiment_analytics(daily):
+    """Correlaciones Sentimiento vs COLCAP a partir de los agregados diarios"""
+    global _analytics
+    with _analytics_lock:
+        if _analytics is None:
+            colcap = load_colcap()
+            if colcap.empty:
+                _analytics = SentimentAnalytics([], [])
+            else:
+                _analytics = SentimentAnalytics(colcap['Fecha'].dt.date.tolist(), colcap['Ultimo'].astype(float).tolist())
+    _analytics.update(daily)
+    return _analytics
+
+
 def get_workers():
     """Información de workers activos"""
     r = get_redis()
@@ -74,11 +124,15 @@ def get_metrics():
     if not r:
         return {'processed': 0, 'errors': 0, 'queue': 0, 'skipped': 0}
     try:
+        # Con QUEUE_BACKEND=stream: lag (sin entregar) y pendientes sin ACK del grupo
+        queue_stats = create_task_queue(r).stats()
         return {
             'processed': int(r.get('total_processed') or 0),
             'errors': int(r.get('total_errors') or 0),
             'skipped': int(r.get('total_skipped') or 0),
-            'queue': r.llen('warc_queue')
+            'queue': queue_stats['size'],
+            'queue_lag': queue_stats.get('lag'),
+            'queue_pending': queue_stats.get('pending')
         }
     except:
         return {'processed': 0, 'errors': 0, 'queue': 0, 'skipped': 0}
@@ -176,6 +230,52 @@ def get_throughput_history(seconds=60):
         return []
 
 
+def get_stage_latencies(minutes=5):
+    """
+    Percentiles por etapa en los últimos `minutes` minutos.
+    Suma los histogramas por minuto de todos los workers.
+    """
+    import time
+    r = get_redis()
+    if not r:
+        return {}
+
+    try:
+        current = int(time.time() // 60)
+        minutes_range = range(current - minutes + 1, current + 1)
+        pipe = r.pipeline(transaction=False)
+        for stage in STAGES:
+            for minute in minutes_range:
+                pipe.hgetall(CLUSTER_KEY.format(stage=stage, minute=minute))
+        replies = iter(pipe.execute())
+
+        latencies = {}
+        for stage in STAGES:
+            histogram = LatencyHistogram()
+            for _ in minutes_range:
+                histogram.merge(LatencyHistogram.from_redis(next(replies)))
+            if histogram.total:
+                latencies[stage] = dict(histogram.percentiles(), count=histogram.total)
+        return latencies
+    except:
+        return {}
+
+
+def get_concurrency_history(limit=200):
+    """Cambios del límite de concurrencia por worker: {worker: [cambios en orden cronológico]}"""
+    r = get_redis()
+    if not r:
+        return {}
+    try:
+        history = {}
+        for key in r.keys('concurrency_history:*'):
+            changes = [json.loads(item) for item in r.lrange(key, 0, limit - 1)]
+            history[key.split(':')[-1]] = sorted(changes, key=lambda c: c['ts'])
+        return history
+    except:
+        return {}
+
+
 def get_producer_logs(limit=50):
     """Ultimos logs del producer"""
     r = get_redis()
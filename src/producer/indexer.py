@@ -6,13 +6,14 @@ import json
 import time
 
 from src.common.config import Config
+from src.common.task_queue import create_task_queue
 from src.common.utils import is_valid_news_url
 
 
 class CommonCrawlIndexer:
     def __init__(self, redis_client):
         self.redis_client = redis_client
-        self.queue_name = 'warc_queue'
+        self.task_queue = create_task_queue(redis_client)
         self.processed_urls_key = 'processed_urls'
         self.position_key = 'producer_position'
 
@@ -57,6 +58,7 @@ class CommonCrawlIndexer:
             if response.status_code == 200 and response.text.strip():
                 count = 0
                 duplicates = 0
+                pending = []  # Se encolan en lote al terminar la respuesta
 
                 for line in response.text.splitlines():
                     try:
@@ -81,13 +83,14 @@ class CommonCrawlIndexer:
                             'domain': domain
                         })
 
-                        self.redis_client.lpush(self.queue_name, task_data)
+                        pending.append(task_data)
                         self.redis_client.sadd(self.processed_urls_key, url_original)
                         count += 1
 
                     except json.JSONDecodeError:
                         continue
 
+                self.task_queue.push(pending)
                 return count, duplicates
 
             elif response.status_code == 404:
@@ -104,7 +107,7 @@ class CommonCrawlIndexer:
             return 0, 0
 
     def get_queue_size(self):
-        return self.redis_client.llen(self.queue_name)
+        return self.task_queue.size()
 
     def get_processed_count(self):
         return self.redis_client.scard(self.processed_urls_key)
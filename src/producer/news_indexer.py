@@ -9,6 +9,7 @@ import re
 from datetime import datetime
 
 from src.common.config import Config
+from src.common.task_queue import create_task_queue
 
 
 class NewsPortalIndexer:
@@ -18,7 +19,7 @@ class NewsPortalIndexer:
 
     def __init__(self, redis_client):
         self.redis_client = redis_client
-        self.queue_name = 'warc_queue'
+        self.task_queue = create_task_queue(redis_client)
         self.processed_urls_key = 'processed_urls'
         self.session = self._create_session()
 
@@ -147,6 +148,7 @@ class NewsPortalIndexer:
                         break  # No más artículos
 
                     page_new = 0
+                    pending = []  # Se encolan en lote al terminar la página
                     for article_url in article_urls:
                         # Verificar si ya fue procesada
                         if self.redis_client.sismember(self.processed_urls_key, article_url):
@@ -163,11 +165,13 @@ class NewsPortalIndexer:
                             'domain': domain
                         })
 
-                        self.redis_client.lpush(self.queue_name, task_data)
+                        pending.append(task_data)
                         self.redis_client.sadd(self.processed_urls_key, article_url)
                         total_new += 1
                         page_new += 1
 
+                    self.task_queue.push(pending)
+
                     # Si no hay nuevas en esta página, no seguir paginando
                     if page_new == 0:
                         break
@@ -207,7 +211,7 @@ class NewsPortalIndexer:
         return total
 
     def get_queue_size(self):
-        return self.redis_client.llen(self.queue_name)
+        return self.task_queue.size()
 
     def get_processed_count(self):
         return self.redis_client.scard(self.processed_urls_key)
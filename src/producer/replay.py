@@ -0,0 +1,95 @@
+"""
+Generador de tareas para el modo replay.
+
+Recorre los .warc.gz de un directorio local y encola (lista o stream, según
+QUEUE_BACKEND) una tarea por registro 'response' HTML, con el mismo formato que el indexador
+de Common Crawl (filename relativo al directorio, offset y length del
+miembro gzip). Los workers con WARC_LOCAL_DIR apuntando al mismo
+directorio procesan esas tareas sin tocar la red.
+"""
+import json
+import os
+import re
+from urllib.parse import urlparse
+
+from warcio.archiveiterator import ArchiveIterator
+
+from src.common.config import Config
+from src.common.task_queue import create_task_queue
+
+
+class ReplayTaskGenerator:
+
+    PUSH_CHUNK = 500
+
+    def __init__(self, redis_client, directory):
+        self.redis_client = redis_client
+        self.directory = directory
+        self.task_queue = create_task_queue(redis_client)
+
+    def warc_files(self):
+        """Rutas relativas de los .warc.gz bajo el directorio"""
+        paths = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith('.warc.gz'):
+                    paths.append(os.path.relpath(os.path.join(root, name), self.directory))
+        return sorted(paths)
+
+    @staticmethod
+    def _domain(url):
+        host = urlparse(url).netloc.lower()
+        for domain in Config.TARGET_DOMAINS:
+            domain = domain.strip()
+            if domain and (host == domain or host.endswith('.' + domain)):
+                return domain
+        return host
+
+    def scan(self, filename):
+        """Tareas de los registros 'response' HTML de un archivo"""
+        tasks = []
+        with open(os.path.join(self.directory, filename), 'rb') as stream:
+            iterator = ArchiveIterator(stream)
+            for record in iterator:
+                if record.rec_type != 'response':
+                    continue
+                content_type = record.http_headers.get_header('Content-Type', '') if record.http_headers else ''
+                url = record.rec_headers.get_header('WARC-Target-URI')
+                warc_date = record.rec_headers.get_header('WARC-Date') or ''
+
+                # Offset y longitud del miembro gzip (se conocen al terminar de leer el registro)
+                offset = iterator.get_record_offset()
+                iterator.read_to_end(record)
+                length = iterator.get_record_length()
+
+                if not url or 'html' not in content_type:
+                    continue
+                tasks.append({
+                    'filename': filename,
+                    'offset': offset,
+                    'length': length,
+                    'url': url,
+                    'timestamp': re.sub(r'\D', '', warc_date)[:14],
+                    'domain': self._domain(url)
+                })
+        return tasks
+
+    def enqueue(self, limit=None, repeat=1):
+        """Encola las tareas (repeat > 1 repite el corpus para pruebas largas). Retorna el total"""
+        tasks = []
+        for filename in self.warc_files():
+            file_tasks = self.scan(filename)
+            print(f"[Replay] {filename}: {len(file_tasks)} registros")
+            tasks.extend(file_tasks)
+            if limit and len(tasks) >= limit:
+                tasks = tasks[:limit]
+                break
+
+        total = 0
+        payloads = [json.dumps(task) for task in tasks]
+        for _ in range(repeat):
+            for start in range(0, len(payloads), self.PUSH_CHUNK):
+                total += self.task_queue.push(payloads[start:start + self.PUSH_CHUNK])
+
+        print(f"[Replay] {total} tareas encoladas ({self.task_queue.backend})")
+        return total
@@ -0,0 +1,101 @@
+"""
+Motor de descarga asíncrono (asyncio + aiohttp).
+
+Con hilos bloqueantes, las peticiones en vuelo están limitadas por el número
+de hilos del pool. Aquí un event loop en un hilo dedicado mantiene cientos
+de peticiones Range abiertas sin costo de hilos, y entrega los payloads
+completos a la etapa de extracción (CPU) por una cola acotada:
+
+    submit(group) --> [event loop: N descargas] --> output_queue --> extracción
+
+Backpressure: submit() bloquea cuando hay `max_inflight` descargas sin
+entregar, y cada descarga terminada espera hasta que haya espacio en la
+cola de salida. Si la extracción se atrasa, se deja de leer 'warc_queue'.
+"""
+import asyncio
+import threading
+import time
+
+from src.common.config import Config
+
+
+class AsyncFetcher:
+
+    def __init__(self, output_queue, base_url=None, max_inflight=None, rate_limiter=None, timeout=30):
+        self.output_queue = output_queue
+        self.base_url = base_url or Config.CC_DATA_URL
+        self.max_inflight = max_inflight or Config.FETCH_MAX_INFLIGHT
+        self.rate_limiter = rate_limiter
+        self.timeout = timeout
+        self.inflight = 0
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.max_inflight)
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name='async-fetcher', daemon=True)
+        self._session = None
+
+    def start(self):
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(self._open_session(), self._loop).result()
+        return self
+
+    def stop(self, timeout=10):
+        """Espera las descargas en vuelo y cierra la sesión"""
+        deadline = time.monotonic() + timeout
+        while self.inflight and time.monotonic() < deadline:
+            time.sleep(0.1)
+        asyncio.run_coroutine_threadsafe(self._session.close(), self._loop).result(timeout=timeout)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=timeout)
+
+    async def _open_session(self):
+        import aiohttp
+
+        self._session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=self.max_inflight),
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+            headers={'User-Agent': 'Mozilla/5.0 (compatible; ColcapResearchBot/1.0; Academic Research)'}
+        )
+
+    def submit(self, group):
+        """Programa la descarga de un FetchGroup (bloquea si hay max_inflight en vuelo)"""
+        self._slots.acquire()
+        with self._lock:
+            self.inflight += 1
+        asyncio.run_coroutine_threadsafe(self._fetch(group), self._loop)
+
+    async def _fetch(self, group):
+        loop = asyncio.get_running_loop()
+        payload = None
+        error = None
+        download_start = time.time()
+        try:
+            # El token bucket usa Redis (bloqueante): fuera del event loop
+            if self.rate_limiter:
+                wait_ms = await loop.run_in_executor(None, self.rate_limiter.reserve)
+                if wait_ms > 0:
+                    await asyncio.sleep(wait_ms / 1000)
+
+            download_start = time.time()
+            headers = {'Range': f"bytes={group.start}-{group.end}"}
+            async with self._session.get(self.base_url + group.filename, headers=headers) as response:
+                status = response.status
+                if status < 400:
+                    payload = await response.read()
+
+            if self.rate_limiter:
+                await loop.run_in_executor(None, self.rate_limiter.on_response, status)
+            if status >= 400:
+                error = f"HTTP {status}"
+        except Exception as e:
+            error = str(e) or type(e).__name__
+
+        download_time = time.time() - download_start
+        try:
+            # Cola acotada: espera (fuera del loop) si la extracción va atrasada
+            await loop.run_in_executor(None, self.output_queue.put,
+                                       ('group', group, payload, download_time, error))
+        finally:
+            with self._lock:
+                self.inflight -= 1
+            self._slots.release()
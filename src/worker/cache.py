@@ -0,0 +1,133 @@
+"""
+Caché del análisis NLP por hash de contenido.
+
+Dos niveles:
+1. LRU en memoria del proceso (acotado por número de entradas)
+2. Hash compartido en Redis por texto, con expiración (TTL)
+
+La clave combina el texto limpio y la versión del modelo, de modo que un
+cambio de modelo o de palabras clave invalida las entradas anteriores.
+"""
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+from src.common.config import Config
+
+
+class SentimentCache:
+
+    def __init__(self, redis_client=None, version='', max_items=None, ttl=None, prefix='nlp_cache'):
+        self.redis_client = redis_client
+        self.version = version
+        self.max_items = max_items or Config.NLP_CACHE_SIZE
+        self.ttl = ttl or Config.NLP_CACHE_TTL
+        self.prefix = prefix
+        self._local = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'hits_local': 0, 'hits_redis': 0, 'misses': 0}
+
+    def key_for(self, text):
+        digest = hashlib.sha1(f"{self.version}\0{text}".encode('utf-8')).hexdigest()
+        return f"{self.prefix}:{digest}"
+
+    def _local_get(self, key):
+        with self._lock:
+            entry = self._local.get(key)
+            if entry is not None:
+                self._local.move_to_end(key)
+            return entry
+
+    def _local_update(self, key, values):
+        with self._lock:
+            entry = self._local.setdefault(key, {})
+            entry.update(values)
+            self._local.move_to_end(key)
+            while len(self._local) > self.max_items:
+                self._local.popitem(last=False)
+
+    def _count(self, stat, amount=1):
+        with self._lock:
+            self.stats[stat] += amount
+
+    def get_many(self, texts, field, local_only=False):
+        """
+        Busca `field` para cada texto. Retorna lista con el valor o None.
+        Los fallos locales se resuelven en Redis con un solo pipeline.
+        Las consultas `local_only` no cuentan en las estadísticas de aciertos.
+        """
+        keys = [self.key_for(text) for text in texts]
+        values = [None] * len(texts)
+        pending = []
+
+        for i, key in enumerate(keys):
+            entry = self._local_get(key)
+            if entry and field in entry:
+                values[i] = entry[field]
+                if not local_only:
+                    self._count('hits_local')
+            else:
+                pending.append(i)
+
+        if local_only:
+            return values
+
+        if pending and self.redis_client is not None:
+            try:
+                pipe = self.redis_client.pipeline(transaction=False)
+                for i in pending:
+                    pipe.hgetall(keys[i])
+                remote = pipe.execute()
+            except Exception as e:
+                print(f"[NLP-Cache] Error leyendo Redis: {e}")
+                remote = [{}] * len(pending)
+
+            still_pending = []
+            for i, stored in zip(pending, remote):
+                decoded = {
+                    (k.decode() if isinstance(k, bytes) else k): json.loads(v)
+                    for k, v in (stored or {}).items()
+                }
+                if decoded:
+                    # Traer la entrada completa al LRU (sirve también para el otro campo)
+                    self._local_update(keys[i], decoded)
+                if field in decoded:
+                    values[i] = decoded[field]
+                    self._count('hits_redis')
+                else:
+                    still_pending.append(i)
+            pending = still_pending
+
+        self._count('misses', len(pending))
+        return values
+
+    def get(self, text, field, local_only=False):
+        return self.get_many([text], field, local_only)[0]
+
+    def set_many(self, texts, field, values):
+        """Guarda `field` en ambos niveles"""
+        keys = [self.key_for(text) for text in texts]
+        for key, value in zip(keys, values):
+            self._local_update(key, {field: value})
+
+        if self.redis_client is None or not keys:
+            return
+
+        try:
+            pipe = self.redis_client.pipeline(transaction=False)
+            for key, value in zip(keys, values):
+                pipe.hset(key, field, json.dumps(value))
+                pipe.expire(key, self.ttl)
+            pipe.execute()
+        except Exception as e:
+            print(f"[NLP-Cache] Error escribiendo Redis: {e}")
+
+    def set(self, text, field, value):
+        self.set_many([text], field, [value])
+
+    def snapshot(self):
+        with self._lock:
+            stats = dict(self.stats)
+            stats['local_size'] = len(self._local)
+        return stats
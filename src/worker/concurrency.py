@@ -0,0 +1,154 @@
+"""
+Control adaptativo de concurrencia por worker (AIMD).
+
+Ajusta el número de trabajos de I/O en vuelo (slots de SlidingWindow) según
+lo que observa el propio pod, en ventanas de CONCURRENCY_INTERVAL_S:
+
+- Reducción multiplicativa (x CONCURRENCY_DECREASE) ante 403/429/503,
+  tasa de errores alta o p90 de latencia por encima del objetivo.
+- Aumento aditivo (+1) si los slots estuvieron saturados.
+- Un aumento de L a L+1 se conserva solo si el throughput subió al menos
+  la mitad de lo ideal (1/L); si no, pasado el punto de saturación del pod,
+  se deshace y se mantiene el límite unas ventanas antes de volver a probar.
+
+Cada cambio queda en `changes` para publicarse en Redis
+(concurrency_history:<worker>) y verse en el dashboard.
+"""
+import threading
+import time
+
+from src.common.config import Config
+
+
+class AdaptiveConcurrency:
+
+    THROTTLE_STATUS = (403, 429, 503)
+    MAX_ERROR_RATE = 0.2
+    MIN_SAMPLES = 5
+    SATURATION = 0.8  # Ocupación de slots a partir de la cual más concurrencia puede ayudar
+    MIN_GAIN = 0.5  # Fracción de la mejora ideal (1/L) que debe aportar un aumento
+    HOLD_WINDOWS = 4
+
+    def __init__(self, initial=None, minimum=None, maximum=None, target_ms=None, interval=None, decrease=None):
+        self.minimum = minimum or Config.CONCURRENCY_MIN
+        self.maximum = maximum or Config.CONCURRENCY_MAX
+        self.target_ms = target_ms or Config.CONCURRENCY_TARGET_MS
+        self.interval = interval or Config.CONCURRENCY_INTERVAL_S
+        self.decrease = decrease or Config.CONCURRENCY_DECREASE
+        self.limit = self._clamp(initial or Config.WORKER_THREADS)
+
+        self._lock = threading.Lock()
+        self._previous_throughput = None
+        self._previous_limit = self.limit
+        self._last_action = None
+        self._hold = 0
+        self._last_stats = {'throughput': 0.0, 'p90_ms': None}
+        # Cambios pendientes de publicar (el primero marca el límite inicial)
+        self.changes = [{'ts': time.time(), 'limit': self.limit, 'reason': 'inicio', 'throughput': 0.0, 'p90_ms': 0.0}]
+        self._reset_window(time.monotonic())
+
+    def _clamp(self, limit):
+        return max(self.minimum, min(self.maximum, int(limit)))
+
+    def _reset_window(self, now):
+        self._window_start = now
+        self._latencies = []
+        self._job_errors = 0
+        self._responses = 0
+        self._response_errors = 0
+        self._throttled = 0
+
+    def on_response(self, status_code):
+        """Código HTTP de cada petición a Common Crawl (listener del limitador de tasa)"""
+        with self._lock:
+            self._responses += 1
+            if status_code in self.THROTTLE_STATUS:
+                self._throttled += 1
+            elif status_code >= 500:
+                self._response_errors += 1
+
+    def record(self, seconds, ok=True):
+        """Trabajo de I/O terminado: duración y si terminó sin fallos de descarga"""
+        with self._lock:
+            self._latencies.append(seconds * 1000)
+            if not ok:
+                self._job_errors += 1
+
+    def _decide(self, throughput, p90_ms, error_rate, throttled, samples, occupancy):
+        """(nuevo límite, motivo) o (límite actual, None)"""
+        if throttled:
+            return self._clamp(self.limit * self.decrease), f'throttle ({throttled})'
+        if samples >= self.MIN_SAMPLES and error_rate > self.MAX_ERROR_RATE:
+            return self._clamp(self.limit * self.decrease), f'errores ({error_rate:.0%})'
+        if samples >= self.MIN_SAMPLES and p90_ms > self.target_ms:
+            return self._clamp(self.limit * self.decrease), f'latencia (p90 {p90_ms:.0f}ms)'
+
+        previous = self._previous_throughput
+        expected = previous * (1 + self.MIN_GAIN / self._previous_limit) if previous else 0
+        if self._last_action == 'increase' and throughput < expected:
+            self._hold = self.HOLD_WINDOWS
+            return self._clamp(self.limit - 1), 'sin mejora'
+        if self._hold:
+            self._hold -= 1
+            return self.limit, None
+        if samples >= self.MIN_SAMPLES and occupancy >= self.SATURATION:
+            return self._clamp(self.limit + 1), 'saturado'
+        return self.limit, None
+
+    def update(self, occupancy):
+        """
+        Evalúa la ventana si ya pasó el intervalo (occupancy: 0-1 de los slots).
+        Retorna el nuevo límite si cambió, si no None.
+        """
+        now = time.monotonic()
+        elapsed = now - self._window_start
+        if elapsed < self.interval:
+            return None
+
+        with self._lock:
+            latencies = sorted(self._latencies)
+            failures = self._job_errors + self._response_errors
+            attempts = max(len(latencies), self._responses)
+            throttled = self._throttled
+            self._reset_window(now)
+
+        samples = len(latencies)
+        throughput = samples / elapsed
+        p90_ms = latencies[int(0.9 * (samples - 1))] if latencies else 0.0
+        error_rate = failures / attempts if attempts else 0.0
+        self._last_stats = {'throughput': throughput, 'p90_ms': p90_ms if latencies else None}
+
+        limit, reason = self._decide(throughput, p90_ms, error_rate, throttled, samples, occupancy)
+        action = None
+        if limit > self.limit:
+            action = 'increase'
+        elif limit < self.limit:
+            action = 'decrease'
+
+        # Comparar siempre contra la ventana anterior al último cambio
+        if action or self._last_action is None:
+            self._previous_throughput = throughput
+            self._previous_limit = self.limit
+        self._last_action = action or 'hold'
+
+        if not action:
+            return None
+
+        print(f"[Concurrency] {self.limit} -> {limit} ({reason}) | "
+              f"{throughput:.2f} trabajos/s | p90 {p90_ms:.0f}ms")
+        self.limit = limit
+        self.changes.append({
+            'ts': time.time(),
+            'limit': limit,
+            'reason': reason,
+            'throughput': round(throughput, 3),
+            'p90_ms': round(p90_ms, 1)
+        })
+        return limit
+
+    def drain_changes(self):
+        changes, self.changes = self.changes, []
+        return changes
+
+    def snapshot(self):
+        return dict(self._last_stats, limit=self.limit)
@@ -1,6 +1,21 @@
 """
 Correlación con datos COLCAP.
+
+El CSV se lee con pandas una sola vez y se convierte a estructuras planas:
+una lista indexada por ordinal de día (fecha -> cierre en O(1), None si no
+hubo sesión) y dos arrays ordenados (ordinales y cierres de días hábiles)
+para buscar el día hábil anterior con searchsorted (fines de semana y
+festivos). El DataFrame no se conserva en el worker.
+
+El contador global de noticias (colcap_news_counter) se reserva por bloques:
+cada proceso toma COLCAP_COUNTER_BLOCK valores con un INCRBY y los reparte
+localmente. Todos los valores se siguen usando una sola vez, así que la
+distribución por mes y día de correlate no cambia.
 """
+import datetime
+import threading
+
+import numpy as np
 import pandas as pd
 import redis
 
@@ -8,33 +23,54 @@ from src.common.config import Config
 
 
 class COLCAPCorrelator:
-    def __init__(self, data_path=None, redis_client=None):
+    def __init__(self, data_path=None, redis_client=None, counter_block=None):
         self.data_path = data_path or Config.COLCAP_DATA_PATH
-        self.df = None
+        self.counter_block = counter_block or Config.COLCAP_COUNTER_BLOCK
+        self.first_ordinal = 0
+        self.values = []  # Cierre por día desde first_ordinal (None sin sesión)
+        self.trading_ordinals = np.empty(0, dtype=np.int64)
+        self.trading_values = np.empty(0, dtype=np.float64)
         self.months_dates = []  # Lista de listas: fechas agrupadas por mes
         self.NEWS_PER_MONTH = 100  # Noticias por mes antes de pasar al siguiente
         self.redis_client = redis_client
+        self.reset_counter()
         self._load_data()
 
     def _load_data(self):
         """Datos históricos del COLCAP"""
         try:
-            self.df = pd.read_csv(self.data_path)
-            self.df['Fecha'] = pd.to_datetime(self.df['Fecha'])
-            self.df.set_index('Fecha', inplace=True)
+            df = pd.read_csv(self.data_path)
+            df['Fecha'] = pd.to_datetime(df['Fecha'])
+            self._build_lookup(df['Fecha'].dt.date.tolist(), df['Ultimo'].astype(float).tolist())
 
             # Agrupar fechas por mes (últimos 8 meses)
-            all_dates = sorted(self.df.index.tolist())
+            all_dates = sorted(set(df['Fecha'].dt.date))
             self.months_dates = self._group_by_month(all_dates, num_months=8)
 
-            print(f"[COLCAP] Datos cargados: {len(self.df)} registros")
+            print(f"[COLCAP] Datos cargados: {len(df)} registros")
             print(f"[COLCAP] Meses disponibles: {len(self.months_dates)}")
         except FileNotFoundError:
             print(f"[COLCAP] ADVERTENCIA: No se encontró {self.data_path}")
-            self.df = pd.DataFrame()
         except Exception as e:
             print(f"[COLCAP] Error cargando CSV: {e}")
-            self.df = pd.DataFrame()
+
+    def _build_lookup(self, dates, closes):
+        """Lista por ordinal de día y arrays ordenados de días hábiles"""
+        by_ordinal = {}
+        for d, close in zip(dates, closes):
+            by_ordinal[d.toordinal()] = close  # Fecha repetida: gana la última fila
+
+        ordinals = sorted(by_ordinal)
+        if not ordinals:
+            return
+
+        self.first_ordinal = ordinals[0]
+        self.values = [None] * (ordinals[-1] - ordinals[0] + 1)
+        for ordinal in ordinals:
+            self.values[ordinal - self.first_ordinal] = by_ordinal[ordinal]
+
+        self.trading_ordinals = np.array(ordinals, dtype=np.int64)
+        self.trading_values = np.array([by_ordinal[o] for o in ordinals], dtype=np.float64)
 
     def _group_by_month(self, dates, num_months=12):
         """Agrupa fechas por mes"""
@@ -55,30 +91,72 @@ class COLCAPCorrelator:
         # Retornar lista de fechas por mes
         return [months[k] for k in sorted_keys]
 
-    def get_value(self, date):
+    def _ordinal(self, date):
+        """Ordinal de día para date, datetime, Timestamp o texto"""
+        try:
+            if not hasattr(date, 'toordinal'):
+                date = pd.Timestamp(date)
+            return date.toordinal()
+        except:
+            return None  # Texto inválido o NaT
+
+    def get_value(self, date, previous=False):
         """
         Valor COLCAP para una fecha.
+
+        Sin sesión ese día retorna None, o con previous=True el cierre del
+        día hábil anterior más cercano.
         """
-        if self.df.empty:
+        ordinal = self._ordinal(date)
+        if ordinal is None:
             return None
 
-        try:
-            fecha_lookup = pd.Timestamp(date)
-            if fecha_lookup in self.df.index:
-                return float(self.df.loc[fecha_lookup]['Ultimo'])
-            return None
-        except:
+        index = ordinal - self.first_ordinal
+        if 0 <= index < len(self.values):
+            value = self.values[index]
+            if value is not None or not previous:
+                return value
+        elif not previous:
             return None
 
+        position = self._previous_position(ordinal)
+        return float(self.trading_values[position]) if position >= 0 else None
+
+    def _previous_position(self, ordinal):
+        """Índice del último día hábil <= ordinal (-1 si no hay)"""
+        return int(np.searchsorted(self.trading_ordinals, ordinal, side='right')) - 1
+
+    def get_previous(self, date):
+        """(fecha, cierre) del último día hábil <= date, o (None, None)"""
+        ordinal = self._ordinal(date)
+        position = self._previous_position(ordinal) if ordinal is not None else -1
+        if position < 0:
+            return (None, None)
+        trading_day = datetime.date.fromordinal(int(self.trading_ordinals[position]))
+        return (trading_day, float(self.trading_values[position]))
+
+    def reset_counter(self):
+        """Descarta el bloque reservado (llamar en cada proceso hijo tras fork)"""
+        self._counter_lock = threading.Lock()
+        self._next_count = 0
+        self._block_end = 0
+
     def _get_global_counter(self):
-        """Obtiene contador atómico desde Redis"""
-        if self.redis_client:
-            try:
-                count = self.redis_client.incr('colcap_news_counter')
-                return count - 1  # Devolver valor antes del incremento
-            except:
-                pass
-        return 0
+        """Siguiente valor del contador global, de un bloque reservado con INCRBY"""
+        with self._counter_lock:
+            if self._next_count >= self._block_end:
+                if not self.redis_client:
+                    return 0
+                try:
+                    block_end = self.redis_client.incrby('colcap_news_counter', self.counter_block)
+                except:
+                    return 0
+                self._next_count = block_end - self.counter_block
+                self._block_end = block_end
+
+            count = self._next_count
+            self._next_count += 1
+            return count
 
     def correlate(self, warc_date):
         """
@@ -107,11 +185,11 @@ class COLCAPCorrelator:
             day_index = news_in_month % len(month_dates)
             fecha_asignada = month_dates[day_index]
 
-            valor_colcap = self.get_value(fecha_asignada.date())
-            return (str(fecha_asignada.date()), valor_colcap)
+            valor_colcap = self.get_value(fecha_asignada)
+            return (str(fecha_asignada), valor_colcap)
         except:
             return (None, None)
 
     def is_empty(self):
         """Verifica si hay datos cargados"""
-        return self.df.empty
+        return not self.values
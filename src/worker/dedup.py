@@ -0,0 +1,163 @@
+"""
+Detección de artículos casi duplicados con MinHash-LSH en Redis.
+
+La misma nota sindicada o rastreada bajo varias URL (AMP, parámetros,
+http/https) produce textos casi idénticos. Antes de la inferencia se
+calcula una firma MinHash (64 permutaciones) de los trigramas de palabras
+del texto limpio y se busca en un índice compartido; si un artículo ya
+analizado tiene similitud de Jaccard estimada >= threshold se reutilizan su
+sentimiento y sus palabras clave en lugar de ejecutar el modelo.
+
+Índice LSH: la firma se parte en 16 bandas de 4 filas. Dos textos con
+Jaccard alto coinciden en alguna banda con probabilidad casi 1 (0.8 ->
+99.9%), y textos distintos casi nunca, así que solo se comparan firmas
+de los candidatos:
+
+    neardup:<versión>:b<i>:<hash de banda>   set de ids de documento
+    neardup:<versión>:doc:<id>               hash {sig, result}
+"""
+import hashlib
+import json
+import threading
+
+import numpy as np
+
+from src.common.config import Config
+
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SHINGLE_SIZE = 3
+_PRIME = (1 << 31) - 1
+
+# Permutaciones fijas (a*x + b mod p): todas las réplicas generan las mismas firmas
+_rng = np.random.RandomState(20240301)
+_A = _rng.randint(1, _PRIME, size=(NUM_PERM, 1)).astype(np.uint64)
+_B = _rng.randint(0, _PRIME, size=(NUM_PERM, 1)).astype(np.uint64)
+
+
+def minhash(text):
+    """Firma MinHash (NUM_PERM x uint32) de los trigramas de palabras del texto"""
+    words = text.lower().split()
+    if len(words) < SHINGLE_SIZE:
+        shingles = {' '.join(words)}
+    else:
+        shingles = {' '.join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+
+    digests = b''.join(hashlib.blake2b(s.encode('utf-8'), digest_size=4).digest() for s in shingles)
+    hashes = np.frombuffer(digests, dtype=np.uint32).astype(np.uint64)
+    # a < 2^31 y x < 2^32: el producto cabe en uint64
+    return ((_A * hashes + _B) % _PRIME).min(axis=1).astype(np.uint32)
+
+
+def similarity(sig_a, sig_b):
+    """Jaccard estimado: fracción de permutaciones con el mismo mínimo"""
+    return float(np.mean(sig_a == sig_b))
+
+
+class NearDuplicateIndex:
+
+    def __init__(self, redis_client=None, version='', threshold=None, ttl=None, prefix='neardup'):
+        self.redis_client = redis_client
+        self.threshold = threshold or Config.NEAR_DUP_THRESHOLD
+        self.ttl = ttl or Config.NLP_CACHE_TTL
+        # Resultados ligados a la versión del modelo (igual que SentimentCache)
+        self.prefix = f"{prefix}:{hashlib.sha1(version.encode('utf-8')).hexdigest()[:8]}"
+        self._lock = threading.Lock()
+        self.stats = {'checked': 0, 'duplicates': 0}
+
+    @staticmethod
+    def signature(text):
+        return minhash(text)
+
+    def is_near(self, sig_a, sig_b):
+        return similarity(sig_a, sig_b) >= self.threshold
+
+    @staticmethod
+    def _doc_id(signature):
+        return hashlib.sha1(signature.tobytes()).hexdigest()[:16]
+
+    def _band_keys(self, signature):
+        return [
+            f"{self.prefix}:b{i}:{hashlib.sha1(signature[i * ROWS:(i + 1) * ROWS].tobytes()).hexdigest()[:12]}"
+            for i in range(BANDS)
+        ]
+
+    def _doc_key(self, doc_id):
+        return f"{self.prefix}:doc:{doc_id}"
+
+    def _count(self, checked, duplicates):
+        with self._lock:
+            self.stats['checked'] += checked
+            self.stats['duplicates'] += duplicates
+
+    def lookup_many(self, signatures):
+        """Resultado guardado del documento más parecido de cada firma, o None"""
+        if self.redis_client is None or not signatures:
+            return [None] * len(signatures)
+
+        try:
+            # 1) Candidatos: documentos que comparten alguna banda
+            pipe = self.redis_client.pipeline(transaction=False)
+            for signature in signatures:
+                for key in self._band_keys(signature):
+                    pipe.smembers(key)
+            replies = pipe.execute()
+            candidates = []
+            for n in range(len(signatures)):
+                members = set()
+                for reply in replies[n * BANDS:(n + 1) * BANDS]:
+                    members.update(m.decode() if isinstance(m, bytes) else m for m in reply)
+                candidates.append(sorted(members))
+
+            # 2) Firmas y resultados de los candidatos en un solo pipeline
+            pipe = self.redis_client.pipeline(transaction=False)
+            for members in candidates:
+                for doc_id in members:
+                    pipe.hmget(self._doc_key(doc_id), 'sig', 'result')
+            docs = iter(pipe.execute())
+
+            results = []
+            for signature, members in zip(signatures, candidates):
+                best = None
+                for _ in members:
+                    sig, result = next(docs)
+                    if sig is None or result is None:
+                        continue  # Expirado
+                    score = similarity(signature, np.frombuffer(sig, dtype=np.uint32))
+                    if score >= self.threshold and (best is None or score > best[0]):
+                        best = (score, result)
+                results.append(json.loads(best[1]) if best else None)
+        except Exception as e:
+            print(f"[NearDup] Error consultando índice: {e}")
+            results = [None] * len(signatures)
+
+        self._count(len(signatures), sum(r is not None for r in results))
+        return results
+
+    def add_many(self, signatures, results):
+        """Registra firmas con su resultado {sentiment, economic_analysis}"""
+        if self.redis_client is None or not signatures:
+            return
+
+        try:
+            pipe = self.redis_client.pipeline(transaction=False)
+            for signature, result in zip(signatures, results):
+                doc_id = self._doc_id(signature)
+                doc_key = self._doc_key(doc_id)
+                pipe.hset(doc_key, mapping={'sig': signature.tobytes(), 'result': json.dumps(result)})
+                pipe.expire(doc_key, self.ttl)
+                for band_key in self._band_keys(signature):
+                    pipe.sadd(band_key, doc_id)
+                    pipe.expire(band_key, self.ttl)
+            pipe.execute()
+        except Exception as e:
+            print(f"[NearDup] Error registrando firmas: {e}")
+
+    def record_duplicates(self, count):
+        """Casi duplicados resueltos sin consultar Redis (dentro del mismo lote)"""
+        self._count(0, count)
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.stats)
@@ -0,0 +1,156 @@
+"""
+Extractores de título y cuerpo de artículos HTML.
+
+- bs4:  BeautifulSoup con html.parser (Python puro, implementación original)
+- lxml: parser en C de lxml + XPath precompilados
+
+Ambos prueban los mismos selectores genéricos en el mismo orden (con
+<p> de toda la página como último recurso) y retornan (título, texto sin
+limpiar); la limpieza y el recorte los hace WARCProcessor. No hay
+selectores por portal: solo se agregarían verificados contra páginas reales.
+"""
+import re
+import threading
+
+REMOVED_TAGS = ['script', 'style', 'nav', 'footer', 'header', 'aside', 'iframe', 'noscript', 'form']
+
+# Selectores del cuerpo (en orden); si ninguno tiene <p>, todos los párrafos
+GENERIC_SELECTORS = [
+    'article', '.article-content', '.article-body', '.entry-content',
+    '.post-content', '.news-content', '.contenido', '[itemprop="articleBody"]'
+]
+
+_ATTR_RE = re.compile(r'^\[([\w-]+)="([^"]*)"\]$')
+
+
+def _selector_xpath(selector):
+    """Traduce los selectores usados aquí (tag, .clase, [attr="v"]) a XPath"""
+    if selector.startswith('.'):
+        return f"//*[contains(concat(' ', normalize-space(@class), ' '), ' {selector[1:]} ')]"
+    match = _ATTR_RE.match(selector)
+    if match:
+        return f'//*[@{match.group(1)}="{match.group(2)}"]'
+    return f'//{selector}'
+
+
+class SoupExtractor:
+    name = 'bs4'
+
+    def extract(self, html_content):
+        from bs4 import BeautifulSoup
+
+        soup = BeautifulSoup(html_content, 'html.parser')
+
+        # Remover scripts, styles, nav, footer, etc.
+        for tag in soup(REMOVED_TAGS):
+            tag.decompose()
+
+        # Extraer título
+        title = "Sin título"
+        og_title = soup.find('meta', property='og:title')
+        if og_title and og_title.get('content'):
+            title = og_title['content'].strip()
+        elif soup.find('h1'):
+            title = soup.find('h1').get_text(strip=True)
+        elif soup.find('title'):
+            title = soup.find('title').get_text(strip=True).split('|')[0].strip()
+
+        # Extraer contenido principal
+        content_text = ""
+        for selector in GENERIC_SELECTORS:
+            element = soup.select_one(selector)
+            if element:
+                paragraphs = element.find_all('p')
+                if paragraphs:
+                    content_text = ' '.join(p.get_text(strip=True) for p in paragraphs)
+                    break
+
+        # Fallback: todos los párrafos
+        if not content_text:
+            paragraphs = soup.find_all('p')
+            content_text = ' '.join(p.get_text(strip=True) for p in paragraphs[:20])
+
+        return title, content_text
+
+
+class LxmlExtractor:
+    name = 'lxml'
+
+    def __init__(self):
+        from lxml import etree
+
+        self._etree = etree
+        self._local = threading.local()  # Un parser por hilo
+        self._title_xpaths = [
+            (etree.XPath('//meta[@property="og:title"]/@content'), False),
+            (etree.XPath('//h1'), False),
+            (etree.XPath('//title'), True),
+        ]
+        self._paragraphs = etree.XPath('.//p')
+        self._all_paragraphs = etree.XPath('//p')
+        self._generic = [etree.XPath(_selector_xpath(s)) for s in GENERIC_SELECTORS]
+
+    def _parser(self):
+        parser = getattr(self._local, 'parser', None)
+        if parser is None:
+            from lxml import html
+            parser = html.HTMLParser(encoding='utf-8', remove_comments=True, remove_pis=True)
+            self._local.parser = parser
+        return parser
+
+    @staticmethod
+    def _text(element):
+        return ' '.join(element.text_content().split())
+
+    def _title(self, tree):
+        for xpath, is_title_tag in self._title_xpaths:
+            found = xpath(tree)
+            if not found:
+                continue
+            value = found[0] if isinstance(found[0], str) else self._text(found[0])
+            if is_title_tag:
+                value = value.split('|')[0]
+            value = value.strip()
+            if value:
+                return value
+        return "Sin título"
+
+    def extract(self, html_content):
+        if isinstance(html_content, str):
+            html_content = html_content.encode('utf-8')
+        try:
+            tree = self._etree.fromstring(html_content, self._parser())
+        except (self._etree.LxmlError, ValueError):
+            tree = None
+        if tree is None:
+            return "Sin título", ""
+
+        # Remover scripts, styles, nav, footer, etc. (en C, sin recorrer desde Python)
+        self._etree.strip_elements(tree, *REMOVED_TAGS, with_tail=False)
+
+        title = self._title(tree)
+
+        content_text = ""
+        for xpath in self._generic:
+            found = xpath(tree)
+            if found:
+                paragraphs = self._paragraphs(found[0])
+                if paragraphs:
+                    content_text = ' '.join(self._text(p) for p in paragraphs)
+                    break
+
+        # Fallback: todos los párrafos
+        if not content_text:
+            content_text = ' '.join(self._text(p) for p in self._all_paragraphs(tree)[:20])
+
+        return title, content_text
+
+
+def create_extractor(name):
+    """Construye el extractor configurado; si lxml no está disponible usa bs4"""
+    if name == 'lxml':
+        try:
+            return LxmlExtractor()
+        except ImportError as e:
+            print(f"[Extractor] lxml no disponible ({e}), usando bs4")
+    return SoupExtractor()
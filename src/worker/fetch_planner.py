@@ -0,0 +1,88 @@
+"""
+Planificador de descargas: coalescencia de rangos de bytes.
+
+Muchos registros CDX de un mismo crawl apuntan al mismo archivo WARC en
+offsets cercanos. El planificador agrupa las tareas por `filename`, une
+los rangos adyacentes o separados por menos de `max_gap` bytes y produce
+un único rango por grupo. Cada registro del índice es un miembro gzip
+independiente, así que el payload del grupo se vuelve a partir por
+(offset, length) para ArchiveIterator.
+
+Las tareas que ya están en la caché de segmentos no se agrupan: van por el
+camino individual, que las lee del disco sin tocar la red.
+"""
+import json
+
+from src.common.config import Config
+
+
+class FetchGroup:
+    """Un rango [start, end] de un archivo WARC y las tareas que contiene"""
+
+    def __init__(self, filename, start, end, items):
+        self.filename = filename
+        self.start = start
+        self.end = end
+        self.items = items  # Lista de (task_data, task)
+
+    @property
+    def length(self):
+        return self.end - self.start + 1
+
+    def split(self, payload):
+        """Parte el payload del grupo en el miembro gzip de cada tarea"""
+        members = []
+        for _, task in self.items:
+            offset = int(task['offset']) - self.start
+            members.append(payload[offset:offset + int(task['length'])])
+        return members
+
+
+class FetchPlanner:
+
+    def __init__(self, max_gap=None, max_bytes=None, segment_cache=None):
+        self.max_gap = Config.FETCH_COALESCE_GAP if max_gap is None else max_gap
+        self.max_bytes = max_bytes or Config.FETCH_COALESCE_MAX_BYTES
+        self.segment_cache = segment_cache
+
+    @staticmethod
+    def _parse(task_data):
+        try:
+            task = json.loads(task_data)
+            return task, int(task.get('offset') or 0), int(task.get('length') or 0)
+        except (json.JSONDecodeError, TypeError, ValueError):
+            return None, 0, 0
+
+    def plan(self, task_datas):
+        """
+        Agrupa tareas. Retorna una lista de FetchGroup (tareas con rango) y
+        una lista de task_data que no se agrupan (sin filename/rango o en caché).
+        """
+        by_file = {}
+        single = []
+        for task_data in task_datas:
+            task, offset, length = self._parse(task_data)
+            if not task or not task.get('filename') or not length:
+                single.append(task_data)
+                continue
+            if self.segment_cache is not None and self.segment_cache.contains(task['filename'], offset, length):
+                single.append(task_data)
+                continue
+            by_file.setdefault(task['filename'], []).append((offset, length, task_data, task))
+
+        groups = []
+        for filename, records in by_file.items():
+            records.sort(key=lambda r: r[0])
+            current = None
+            for offset, length, task_data, task in records:
+                end = offset + length - 1
+                if (current is not None
+                        and offset - current.end - 1 <= self.max_gap
+                        and max(end, current.end) - current.start + 1 <= self.max_bytes):
+                    current.end = max(current.end, end)
+                    current.items.append((task_data, task))
+                else:
+                    current = FetchGroup(filename, offset, end, [(task_data, task)])
+                    groups.append(current)
+
+        return groups, single
@@ -0,0 +1,49 @@
+"""
+Detección de palabras clave en una sola pasada.
+
+Las palabras clave se compilan una vez en una expresión regular con forma
+de trie (prefijos compartidos) y con límites de palabra, de modo que
+'oro' no coincide dentro de 'Oropeza' ni 'tasa' dentro de 'tasación'.
+El costo por texto es O(longitud del texto) aunque la lista crezca.
+"""
+import re
+from collections import Counter
+
+
+def _trie_pattern(words):
+    """Alternación en forma de trie: 'dolar|dolares' -> 'dolar(?:es)?'"""
+    trie = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[''] = {}
+
+    def build(node):
+        is_end = '' in node
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ''
+        if len(branches) == 1 and not is_end:
+            return branches[0]
+        group = '(?:' + '|'.join(branches) + ')'
+        return group + '?' if is_end else group
+
+    return build(trie)
+
+
+class KeywordMatcher:
+
+    def __init__(self, keywords):
+        # Sin duplicados, conservando el orden de configuración
+        self.keywords = list(dict.fromkeys(k.lower() for k in keywords if k))
+        self._order = {k: i for i, k in enumerate(self.keywords)}
+        self._pattern = re.compile(r'(?<!\w)(?:' + _trie_pattern(self.keywords) + r')(?!\w)')
+
+    def count(self, text):
+        """{keyword: ocurrencias} en el orden de la lista de palabras clave"""
+        counts = Counter(self._pattern.findall(text.lower()))
+        return {k: counts[k] for k in sorted(counts, key=self._order.__getitem__)}
+
+    def count_batch(self, texts):
+        return [self.count(text) for text in texts]
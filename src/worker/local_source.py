@@ -0,0 +1,49 @@
+"""
+Fuente de datos local para el modo replay.
+
+Resuelve el `filename` de cada tarea (ruta de Common Crawl, p. ej.
+'crawl-data/CC-MAIN-2024-10/segments/.../warc/X.warc.gz') contra un
+directorio local y lee el rango de bytes con os.pread: sin red, sin
+limitador de tasa y seguro entre hilos (pread no mueve el offset del
+descriptor, que se comparte).
+"""
+import os
+import threading
+
+
+class LocalWarcSource:
+    name = 'local'
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._fds = {}
+        self._lock = threading.Lock()
+
+    def resolve(self, filename):
+        """Ruta completa bajo el directorio, o solo el nombre del archivo"""
+        for candidate in (os.path.join(self.directory, filename),
+                          os.path.join(self.directory, os.path.basename(filename))):
+            if os.path.isfile(candidate):
+                return candidate
+        raise FileNotFoundError(f"{filename} no está en {self.directory}")
+
+    def _fd(self, filename):
+        with self._lock:
+            fd = self._fds.get(filename)
+            if fd is None:
+                fd = os.open(self.resolve(filename), os.O_RDONLY)
+                self._fds[filename] = fd
+            return fd
+
+    def read_range(self, filename, start=None, end=None):
+        """Bytes [start, end] (inclusivo); sin rango, el archivo completo"""
+        fd = self._fd(filename)
+        if start is None or end is None:
+            start, end = 0, os.fstat(fd).st_size - 1
+        return os.pread(fd, end - start + 1, start)
+
+    def close(self):
+        with self._lock:
+            for fd in self._fds.values():
+                os.close(fd)
+            self._fds.clear()
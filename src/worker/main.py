@@ -1,38 +1,132 @@
 """
 Worker - Procesamiento Paralelo con ThreadPool
+
+Etapas: hilos de I/O (descarga + extracción) -> cola -> inferencia en micro-batches
+Con FETCH_ENGINE=async: event loop (descargas) -> hilos de extracción -> inferencia
+Con FETCH_ENGINE=threads los hilos de I/O trabajan en ventana deslizante: un slot
+libre se rellena desde la cola en cuanto termina su tarea, sin esperar al lote.
+
+Una tarea se confirma en la cola (XACK con QUEUE_BACKEND=stream) cuando su
+resultado ya se envió a Redis en un flush de métricas, o cuando se descargó
+y no tenía texto que analizar. Si la descarga falló queda pendiente y se
+reintenta. SIGTERM detiene el loop y vacía las etapas antes de salir.
 """
 import time
+_import_start = time.perf_counter()
+
+import queue
+import signal
 import redis
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor
 
 from src.common.config import Config
 from src.common.connections import RedisConnection, S3Connection
+from src.common.task_queue import create_task_queue
 from .processor import WARCProcessor
 from .nlp import SentimentAnalyzer
 from .correlation import COLCAPCorrelator
 from .metrics import WorkerMetrics
+from .pipeline import InferenceStage, ExtractionStage, SlidingWindow, settle_outcomes, task_outcome
+from .rate_limiter import RedisTokenBucket
+from .fetch_planner import FetchPlanner
+from .segment_cache import SegmentCache
+from .local_source import LocalWarcSource
+from .concurrency import AdaptiveConcurrency
+
+# Tiempo de importación (torch, pysentimiento, etc.)
+IMPORT_SECONDS = time.perf_counter() - _import_start
 
-# Configuración de paralelismo
-BATCH_SIZE = 4  # Tareas a procesar en paralelo por worker
-MAX_THREADS = 4  # Hilos por worker
+# Configuración de paralelismo (con CONCURRENCY_ADAPTIVE los slots de I/O se ajustan en caliente)
+BATCH_SIZE = Config.WORKER_BATCH_SIZE  # Tareas leídas por ronda como mínimo
+MAX_THREADS = Config.WORKER_THREADS  # Hilos de I/O iniciales
+POOL_THREADS = max(MAX_THREADS, Config.CONCURRENCY_MAX) if Config.CONCURRENCY_ADAPTIVE else MAX_THREADS
+PLAN_WINDOW = max(BATCH_SIZE, Config.FETCH_PLAN_WINDOW)  # Tareas leídas por ronda para agrupar descargas
+
+
+def _submit_extracted(extracted_items, task_datas, inference):
+    """Encola los textos extraídos (con su tarea) en la etapa de inferencia. Retorna task_outcome por tarea"""
+    outcomes = []
+    for extracted, task_data in zip(extracted_items, task_datas):
+        if extracted:
+            inference.submit(extracted, task_data)
+        outcomes.append(task_outcome(extracted))
+    return outcomes
 
 
 def process_single_task(args):
-    """Procesa una tarea individual (para ThreadPool)"""
-    task_data, warc_processor, nlp_analyzer, correlator, worker_id = args
+    """Descarga y extrae una tarea (ThreadPool); el texto pasa a la etapa de inferencia"""
+    task_data, warc_processor, correlator, inference, worker_id = args
     try:
-        return warc_processor.process_record(task_data, nlp_analyzer, correlator, worker_id)
+        extracted = warc_processor.extract_record(task_data, correlator, worker_id)
     except Exception as e:
         print(f"[{worker_id}] Error en hilo: {e}")
-        return None
+        return [None]
+
+    return _submit_extracted([extracted], [task_data], inference)
+
+
+def process_task_group(args):
+    """Descarga agrupada (una petición Range) y extracción de varias tareas del mismo WARC"""
+    group, warc_processor, correlator, inference, worker_id = args
+    try:
+        extracted_items = warc_processor.extract_group(group, correlator, worker_id)
+    except Exception as e:
+        print(f"[{worker_id}] Error en hilo: {e}")
+        return [None] * len(group.items)
+
+    return _submit_extracted(extracted_items, [task_data for task_data, _ in group.items], inference)
 
 
-def main():
+def save_results(results, metrics):
+    """
+    Guarda (resultado, task_data) de la etapa de inferencia. Retorna (correlaciones, errores).
+    La tarea se confirma cuando el flush de métricas envía su resultado; si la
+    inferencia falló queda pendiente y se reintenta (stream).
+    """
+    found = 0
+    errors = 0
+    for correlation_result, task_data in results:
+        if correlation_result is None:
+            errors += 1
+            metrics.increment_global_counter('total_errors')
+            continue
+
+        found += 1
+        metrics.record_latencies(correlation_result.get('processing_times', {}))
+
+        metrics.save_result(correlation_result, ack=task_data)
+
+    return found, errors
+
+
+def load_components(redis_client, procs=1):
+    """Modelo NLP y datos COLCAP (en modo multiproceso se cargan una vez en el supervisor)"""
+    correlator = COLCAPCorrelator(redis_client=redis_client)
+    # Con procs > 1 la sesión ONNX (y su pool de hilos) se abre en cada hijo, no antes del fork
+    nlp_analyzer = SentimentAnalyzer(redis_client=redis_client, defer_session=procs > 1)
+    return correlator, nlp_analyzer
+
+
+def bind_redis(redis_client, correlator, nlp_analyzer):
+    """Asigna un cliente Redis propio a componentes heredados del supervisor"""
+    correlator.redis_client = redis_client
+    correlator.reset_counter()
+    if nlp_analyzer.cache is not None:
+        nlp_analyzer.cache.redis_client = redis_client
+    if nlp_analyzer.near_duplicates is not None:
+        nlp_analyzer.near_duplicates.redis_client = redis_client
+
+
+def main(procs=None):
     worker_id = Config.WORKER_ID
+    procs = procs or Config.WORKER_PROCS
 
     print("=" * 60)
     print(f"    WORKER {worker_id} (Optimizado)")
-    print(f"    Batch: {BATCH_SIZE} | Threads: {MAX_THREADS}")
+    print(f"    Procesos: {procs} | Batch: {BATCH_SIZE} | Threads: {MAX_THREADS}"
+          + (f" (adaptativo {Config.CONCURRENCY_MIN}-{Config.CONCURRENCY_MAX})" if Config.CONCURRENCY_ADAPTIVE else ''))
+    print(f"    NLP batch: {Config.NLP_BATCH_SIZE} | Espera máx: {Config.NLP_MAX_WAIT_MS}ms")
+    print(f"    Descargas: {'replay ' + Config.WARC_LOCAL_DIR if Config.WARC_LOCAL_DIR else Config.FETCH_ENGINE}")
     print("=" * 60)
 
     # Conectar a Redis primero
@@ -43,9 +137,69 @@ def main():
         return
 
     # Inicializar componentes
-    correlator = COLCAPCorrelator(redis_client=redis_client)
-    nlp_analyzer = SentimentAnalyzer()
-    warc_processor = WARCProcessor()
+    load_start = time.perf_counter()
+    correlator, nlp_analyzer = load_components(redis_client, procs)
+    startup = {'import': IMPORT_SECONDS, 'model_load': time.perf_counter() - load_start}
+
+    if procs > 1:
+        from .supervisor import WorkerSupervisor
+        WorkerSupervisor(procs, worker_id, correlator, nlp_analyzer, startup).run()
+        return
+
+    run_worker(worker_id, redis_conn, redis_client, correlator, nlp_analyzer, startup)
+
+
+def warmup(worker_id, nlp_analyzer):
+    """Warm-up del modelo antes de consumir tareas. Retorna segundos"""
+    if not Config.NLP_WARMUP:
+        return 0.0
+
+    start = time.perf_counter()
+    try:
+        nlp_analyzer.warmup()
+    except Exception as e:
+        print(f"[{worker_id}] Error en warm-up: {e}")
+    elapsed = time.perf_counter() - start
+    print(f"[{worker_id}] Warm-up del modelo: {elapsed:.2f}s")
+    return elapsed
+
+
+def mark_ready(worker_id):
+    """Archivo de readiness para Kubernetes"""
+    try:
+        with open(Config.WORKER_READY_FILE, 'w') as f:
+            f.write(worker_id)
+    except OSError as e:
+        print(f"[{worker_id}] No se pudo escribir {Config.WORKER_READY_FILE}: {e}")
+
+
+def run_worker(worker_id, redis_conn, redis_client, correlator, nlp_analyzer, startup=None):
+    """Loop principal de un proceso worker"""
+    # SIGTERM (kubectl delete / rolling update) -> KeyboardInterrupt: el loop termina y vacía las etapas
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+
+    rate_limiter = RedisTokenBucket(redis_client)
+    # Modo replay: sin red, la caché de segmentos no aporta
+    source = LocalWarcSource(Config.WARC_LOCAL_DIR) if Config.WARC_LOCAL_DIR else None
+    segment_cache = SegmentCache() if Config.SEGMENT_CACHE_DIR and source is None else None
+    warc_processor = WARCProcessor(rate_limiter=rate_limiter, segment_cache=segment_cache, source=source,
+                                   pool_size=POOL_THREADS)
+
+    # Cola de tareas (lista o stream con grupo de consumidores, ver QUEUE_BACKEND)
+    task_queue = create_task_queue(redis_client, consumer=worker_id)
+
+    # Etapa de inferencia (consumidor único)
+    inference = InferenceStage(warc_processor, nlp_analyzer, worker_id).start()
+
+    # Motor asíncrono: las descargas no ocupan hilos; la extracción tiene sus propios hilos
+    fetcher = None
+    extraction = None
+    if Config.FETCH_ENGINE == 'async' and source is None:
+        from .async_fetcher import AsyncFetcher
+        fetch_queue = queue.Queue(maxsize=Config.FETCH_OUTPUT_QUEUE)
+        extraction = ExtractionStage(fetch_queue, warc_processor, correlator, inference,
+                                     worker_id, threads=MAX_THREADS).start()
+        fetcher = AsyncFetcher(fetch_queue, rate_limiter=rate_limiter).start()
 
     # Conectar a S3
     s3_conn = S3Connection()
@@ -54,6 +208,8 @@ def main():
     # Inicializar métricas
     metrics = WorkerMetrics(redis_client, worker_id)
     metrics.init_global_metrics()
+    # Confirmar en la cola las tareas cuyo resultado ya llegó a Redis
+    metrics.flush_listeners.append(task_queue.ack)
 
     # Contadores
     tasks_processed = 0
@@ -61,71 +217,168 @@ def main():
     errors_count = 0
     start_time = time.time()
 
+    # Warm-up y señal de ready (fases de arranque en worker_startup:<id>)
+    startup = dict(startup or {})
+    startup['warmup'] = warmup(worker_id, nlp_analyzer)
+    metrics.publish_startup(startup)
+    mark_ready(worker_id)
+    ready_time = time.time()
+    first_task_marked = False
+    print(f"[{worker_id}] Ready | " + ' | '.join(f"{k}: {v:.2f}s" for k, v in startup.items()))
+
     # Registrar worker al iniciar
     metrics.update_worker_stats(0, 0, 0)
 
-    print(f"[{worker_id}] Esperando tareas en la cola 'warc_queue'...")
+    planner = FetchPlanner(segment_cache=segment_cache)
+
+    window = None
+
+    def stage_depths():
+        depths = inference.depths()
+        if fetcher is not None:
+            depths['fetch'] = fetcher.inflight
+            depths.update(extraction.depths())
+        else:
+            depths['fetch'] = window.in_flight if window is not None else 0
+        return depths
+
+    def record_outcomes(outcomes):
+        """Contabiliza tareas que terminaron la etapa de I/O (task_outcome de cada una)"""
+        nonlocal tasks_processed, errors_count, first_task_marked
+        tasks_processed += len(outcomes)
+        metrics.increment_global_counter('total_processed', len(outcomes))
+        skipped = outcomes.count(False)
+        if skipped:
+            metrics.increment_global_counter('total_skipped', skipped)
+        failed = outcomes.count(None)
+        if failed:
+            errors_count += failed
+            metrics.increment_global_counter('total_errors', failed)
+
+        # Heartbeat en cada descarga para mantener worker visible
+        elapsed_time = time.time() - start_time
+        tasks_per_minute = (tasks_processed / elapsed_time * 60) if elapsed_time > 0 else 0
+        metrics.update_worker_stats(tasks_per_minute, errors_count, tasks_processed,
+                                    stage_depths=stage_depths())
+
+        if not first_task_marked:
+            metrics.mark_first_task(time.time() - ready_time)
+            first_task_marked = True
+
+    print(f"[{worker_id}] Esperando tareas en la cola ({task_queue.backend})...")
+
+    # Concurrencia adaptativa de los hilos de I/O (el motor async se acota con FETCH_MAX_INFLIGHT)
+    controller = None
+    if Config.CONCURRENCY_ADAPTIVE and fetcher is None:
+        controller = AdaptiveConcurrency(initial=MAX_THREADS)
+        rate_limiter.listeners.append(controller.on_response)
+
+    def publish_slots():
+        """Ocupación de slots y, con control adaptativo, el límite y sus cambios"""
+        slot_stats = window.snapshot()
+        if controller is not None:
+            limit = controller.update(slot_stats['occupancy'])
+            if limit is not None:
+                window.resize(limit)
+            metrics.update_concurrency(controller.snapshot(), controller.drain_changes())
+        metrics.update_slot_stats(slot_stats)
+
+    def heartbeat():
+        """Mantiene visible al worker mientras no termina ninguna tarea"""
+        elapsed_time = time.time() - start_time
+        tasks_per_minute = (tasks_processed / elapsed_time * 60) if elapsed_time > 0 else 0
+        metrics.update_worker_stats(tasks_per_minute, errors_count, tasks_processed,
+                                    stage_depths=stage_depths())
+        if window is not None:
+            publish_slots()
+        metrics.flush()
+
+    def collect(finished):
+        """Contabiliza los trabajos terminados de la ventana deslizante"""
+        for future, task_datas, seconds in finished:
+            try:
+                outcomes = future.result()
+            except Exception as e:
+                outcomes = [None] * len(task_datas)
+                print(f"[{worker_id}] Error procesando resultado: {e}")
+
+            # Las descargas fallidas cuentan como error del trabajo para el control adaptativo
+            settle_outcomes(task_queue, task_datas, outcomes, seconds, controller)
+            record_outcomes(outcomes)
+        metrics.flush()
+
+    # ThreadPool para descarga y extracción
+    with ThreadPoolExecutor(max_workers=POOL_THREADS) as executor:
+        if fetcher is None:
+            window = SlidingWindow(executor, controller.limit if controller else MAX_THREADS)
 
-    # ThreadPool para procesamiento paralelo
-    with ThreadPoolExecutor(max_workers=MAX_THREADS) as executor:
         while True:
             try:
-                # Obtener batch de tareas
-                tasks = []
-                for _ in range(BATCH_SIZE):
-                    result = redis_client.lpop('warc_queue')
-                    if result:
-                        tasks.append(result.decode('utf-8') if isinstance(result, bytes) else result)
+                # Resultados de inferencia listos
+                found, failed = save_results(inference.drain_results(), metrics)
+                correlations_found += found
+                errors_count += failed
+
+                # Tareas extraídas por el motor asíncrono
+                if extraction is not None:
+                    outcomes = extraction.drain_outcomes()
+                    if outcomes:
+                        settle_outcomes(task_queue, [task_data for task_data, _ in outcomes],
+                                        [outcome for _, outcome in outcomes])
+                        record_outcomes([outcome for _, outcome in outcomes])
+
+                # Con todos los slots ocupados no se leen más tareas: esperar a que se libere uno
+                if window is not None and not window.has_room():
+                    finished = window.wait(timeout=2)
+                    if finished:
+                        collect(finished)
                     else:
-                        break
+                        heartbeat()
+                    continue
 
-                if not tasks:
-                    # Cola vacía, esperar con blpop 
-                    result = redis_client.blpop('warc_queue', timeout=2)  # 2 segundos para heartbeat rápido
-                    if result:
-                        _, task_data = result
-                        tasks = [task_data.decode('utf-8') if isinstance(task_data, bytes) else task_data]
+                # Obtener batch de tareas (ventana amplia para agrupar descargas)
+                tasks = task_queue.pop(PLAN_WINDOW)
+
+                if not tasks and window is not None and not window.idle():
+                    # Cola vacía pero hay descargas en vuelo: atenderlas y volver a consultar
+                    finished = window.wait(timeout=0.5)
+                    if finished:
+                        collect(finished)
                     else:
+                        heartbeat()
+                    continue
+
+                if not tasks:
+                    # Cola vacía, esperar bloqueando (2 segundos para heartbeat rápido)
+                    tasks = task_queue.pop(PLAN_WINDOW, block_seconds=2)
+                    if not tasks:
                         # Timeout 
-                        elapsed_time = time.time() - start_time
-                        tasks_per_minute = (tasks_processed / elapsed_time * 60) if elapsed_time > 0 else 0
-                        metrics.update_worker_stats(tasks_per_minute, errors_count, tasks_processed)
+                        heartbeat()
                         continue
 
-                # Procesar batch en paralelo
-                futures = []
-                for task_data in tasks:
-                    args = (task_data, warc_processor, nlp_analyzer, correlator, worker_id)
-                    futures.append(executor.submit(process_single_task, args))
-
-                # Recolectar resultados 
-                for future in as_completed(futures):
-                    tasks_processed += 1
-                    metrics.increment_global_counter('total_processed')
-
-                    # Heartbeat en cada tarea para mantener worker visible
-                    elapsed_time = time.time() - start_time
-                    tasks_per_minute = (tasks_processed / elapsed_time * 60) if elapsed_time > 0 else 0
-                    metrics.update_worker_stats(tasks_per_minute, errors_count, tasks_processed)
-
-                    try:
-                        correlation_result = future.result()
-
-                        if correlation_result:
-                            correlations_found += 1
-
-                            if metrics.save_correlation(correlation_result):
-                                pass  # Guardado exitoso
-
-                            if metrics.save_to_dashboard(correlation_result.copy()):
-                                pass  # Enviado a dashboard
-                        else:
-                            metrics.increment_global_counter('total_skipped')
-
-                    except Exception as e:
-                        errors_count += 1
-                        metrics.increment_global_counter('total_errors')
-                        print(f"[{worker_id}] Error procesando resultado: {e}")
+                # Agrupar tareas del mismo WARC en una sola petición Range
+                groups, singles = planner.plan(tasks)
+
+                if fetcher is not None:
+                    # Sin barrera: submit() bloquea solo si hay FETCH_MAX_INFLIGHT en vuelo;
+                    # los resultados se contabilizan al inicio de cada vuelta
+                    for group in groups:
+                        fetcher.submit(group)
+                    for task_data in singles:
+                        extraction.submit(task_data)
+                else:
+                    # Ventana deslizante: lo que no cabe espera en el backlog y entra
+                    # en cuanto se libera un slot
+                    for group in groups:
+                        args = (group, warc_processor, correlator, inference, worker_id)
+                        window.add(process_task_group, args, len(group.items),
+                                   tag=[task_data for task_data, _ in group.items])
+                    for task_data in singles:
+                        args = (task_data, warc_processor, correlator, inference, worker_id)
+                        window.add(process_single_task, args, tag=[task_data])
+
+                    # Recolectar lo terminado sin bloquear (la inferencia avanza en paralelo)
+                    collect(window.wait(timeout=0))
 
                 # Actualizar stats después de cada batch
                 elapsed_time = time.time() - start_time
@@ -133,18 +386,33 @@ def main():
                 tasks_per_minute = tasks_per_second * 60
 
                 # Actualizar worker_stats en cada batch para mantener visibilidad
-                metrics.update_worker_stats(tasks_per_minute, errors_count, tasks_processed)
+                metrics.update_worker_stats(tasks_per_minute, errors_count, tasks_processed,
+                                            stage_depths=stage_depths())
+                if nlp_analyzer.cache is not None:
+                    metrics.update_cache_stats(nlp_analyzer.cache.snapshot())
+                if segment_cache is not None:
+                    metrics.update_segment_cache_stats(segment_cache.snapshot())
+                if nlp_analyzer.near_duplicates is not None:
+                    metrics.update_dedup_stats(nlp_analyzer.near_duplicates.snapshot())
+                if window is not None:
+                    publish_slots()
+                metrics.flush()
 
                 # Progreso cada 10 tareas
                 if tasks_processed % 10 == 0:
-                    queue_size = redis_client.llen('warc_queue')
+                    queue_stats = task_queue.stats()
+                    queue_size = queue_stats['size']
+                    depths = stage_depths()
 
-                    print(f"[{worker_id}] {tasks_processed} proc | {correlations_found} corr | {queue_size} pend | {tasks_per_second:.2f} t/s")
+                    print(f"[{worker_id}] {tasks_processed} proc | {correlations_found} corr | {queue_size} pend | "
+                          f"NLP cola: {depths['inference']} | {tasks_per_second:.2f} t/s")
 
                     metrics.save_metrics({
                         'tasks_processed': tasks_processed,
                         'correlations_found': correlations_found,
                         'queue_size': queue_size,
+                        'queue_lag': queue_stats.get('lag'),
+                        'stage_depths': depths,
                         'elapsed_seconds': elapsed_time,
                         'tasks_per_second': tasks_per_second
                     })
@@ -154,6 +422,7 @@ def main():
                 redis_client = redis_conn.connect()
                 if not redis_client:
                     break
+                task_queue.redis_client = redis_client
 
             except KeyboardInterrupt:
                 print(f"\n[{worker_id}] Detenido por el usuario")
@@ -165,6 +434,24 @@ def main():
                 metrics.increment_global_counter('total_errors')
                 time.sleep(2)
 
+        # Terminar las tareas ya leídas de la cola
+        if window is not None:
+            while not window.idle():
+                collect(window.wait())
+
+    # Vaciar las etapas antes de salir
+    if fetcher is not None:
+        fetcher.stop()
+        extraction.stop()
+        outcomes = extraction.drain_outcomes()
+        if outcomes:
+            task_queue.ack([task_data for task_data, ok in outcomes if not ok])
+            record_outcomes([ok for _, ok in outcomes])
+    inference.stop()
+    found, failed = save_results(inference.drain_results(), metrics)
+    correlations_found += found
+    errors_count += failed
+
     # Métricas finales
     elapsed_time = time.time() - start_time
     metrics.save_metrics({
@@ -173,6 +460,7 @@ def main():
         'correlations_found': correlations_found,
         'total_seconds': elapsed_time
     })
+    metrics.flush(force=True)
 
     print(f"[{worker_id}] Finalizado. Total: {tasks_processed}, Correlaciones: {correlations_found}")
 
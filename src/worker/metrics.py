@@ -1,15 +1,206 @@
 """
 Módulo de métricas y estadísticas del worker.
+
+Las escrituras no van a Redis una por una: contadores, campos de hash y
+listas se acumulan en memoria y flush() los envía en un solo pipeline cada
+METRICS_FLUSH_MS o cuando hay METRICS_FLUSH_TASKS resultados pendientes.
+Los contadores se suman localmente (un INCRBY por contador y flush) y de
+cada campo de hash solo se envía el último valor. Los agregados de
+sentimiento por fecha y dominio también se suman localmente: un
+HINCRBY/HINCRBYFLOAT por campo y flush.
+
+Las tareas de la cola cuyo resultado va en el buffer (save_result con ack)
+se pasan a flush_listeners solo después de que el pipeline se ejecutó.
 """
 from datetime import datetime
 import json
+import threading
+import time
 
+from src.common.config import Config
+from src.common.histogram import CLUSTER_KEY, CLUSTER_TTL, STAGES, WORKER_KEY, LatencyHistogram
+from src.common.results import (
+    DAILY_INDEX, DAILY_KEY, DOMAIN_INDEX, DOMAIN_KEY, RESULTS_KEY, aggregate_fields, aggregate_names, pack_result
+)
 from src.common.utils import json_serial
 
 class WorkerMetrics:
-    def __init__(self, redis_client, worker_id):
+
+    LATENCY_FLUSH_SECONDS = 5  # Cada cuánto se suman los histogramas locales en Redis
+    WORKER_STATS_TTL = 15
+
+    def __init__(self, redis_client, worker_id, flush_ms=None, flush_tasks=None):
         self.redis_client = redis_client
         self.worker_id = worker_id
+        self.flush_seconds = (flush_ms if flush_ms is not None else Config.METRICS_FLUSH_MS) / 1000
+        self.flush_tasks = flush_tasks or Config.METRICS_FLUSH_TASKS
+        self._published = {}  # Último valor publicado de cada contador global (para INCRBY por delta)
+        # Histogramas por etapa acumulados desde la última publicación
+        self._latencies = {stage: LatencyHistogram() for stage in STAGES}
+        self._latencies_flushed = time.time()
+
+        # Escrituras pendientes
+        self._lock = threading.Lock()
+        self._counters = {}  # clave -> incremento
+        self._hashes = {}  # clave -> {campo: valor}
+        self._expires = {}  # clave -> segundos
+        self._values = {}  # clave -> valor (SET)
+        self._lists = {}  # clave -> [items en orden de llegada]
+        self._trims = {}  # clave -> largo máximo
+        self._hash_counters = {}  # clave -> {campo: incremento} (HINCRBY / HINCRBYFLOAT)
+        self._members = {}  # clave -> {miembros} (SADD)
+        self._acks = []  # task_data de resultados en el buffer
+        self._pending_tasks = 0
+        self.flush_listeners = []  # fn(task_datas) tras cada flush con resultados enviados
+        self._flushed = time.time()
+
+    def _incr(self, key, amount=1):
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def _hset(self, key, mapping, expire=None):
+        with self._lock:
+            self._hashes.setdefault(key, {}).update(mapping)
+            if expire:
+                self._expires[key] = expire
+
+    def _push(self, key, item, trim=None):
+        with self._lock:
+            self._lists.setdefault(key, []).append(item)
+            if trim:
+                self._trims[key] = trim
+
+    def _set(self, key, value):
+        with self._lock:
+            self._values[key] = value
+
+    def _hincr(self, key, increments):
+        with self._lock:
+            fields = self._hash_counters.setdefault(key, {})
+            for field, amount in increments.items():
+                fields[field] = fields.get(field, 0) + amount
+
+    def _sadd(self, key, member):
+        with self._lock:
+            self._members.setdefault(key, set()).add(member)
+
+    def _task_done(self):
+        """Un resultado más en el buffer; al llegar a flush_tasks se envía"""
+        with self._lock:
+            self._pending_tasks += 1
+            full = self._pending_tasks >= self.flush_tasks
+        if full:
+            self.flush(force=True)
+
+    def _take_buffers(self):
+        with self._lock:
+            buffers = (self._counters, self._hashes, self._expires, self._values, self._lists, self._trims,
+                       self._hash_counters, self._members, self._acks)
+            self._counters, self._hashes, self._expires = {}, {}, {}
+            self._values, self._lists, self._trims = {}, {}, {}
+            self._hash_counters, self._members, self._acks = {}, {}, []
+            self._pending_tasks = 0
+        return buffers
+
+    def _restore_buffers(self, buffers):
+        """Tras un error: devolver lo no enviado (lo más nuevo gana en hashes y valores)"""
+        counters, hashes, expires, values, lists, trims, hash_counters, members, acks = buffers
+        with self._lock:
+            self._acks = acks + self._acks
+            for key, amount in counters.items():
+                self._counters[key] = self._counters.get(key, 0) + amount
+            for key, increments in hash_counters.items():
+                fields = self._hash_counters.setdefault(key, {})
+                for field, amount in increments.items():
+                    fields[field] = fields.get(field, 0) + amount
+            for key, names in members.items():
+                self._members.setdefault(key, set()).update(names)
+            for key, mapping in hashes.items():
+                self._hashes[key] = dict(mapping, **self._hashes.get(key, {}))
+            for key, value in values.items():
+                self._values.setdefault(key, value)
+            for key, items in lists.items():
+                merged = items + self._lists.get(key, [])
+                limit = trims.get(key)
+                self._lists[key] = merged[-limit:] if limit else merged
+            self._expires = dict(expires, **self._expires)
+            self._trims = dict(trims, **self._trims)
+
+    def _queue_latencies(self, pipe):
+        """Suma los histogramas locales (cluster por minuto y por worker)"""
+        minute = int(time.time() // 60)
+        queued = False
+        for stage, histogram in self._latencies.items():
+            if not histogram.counts:
+                continue
+            cluster_key = CLUSTER_KEY.format(stage=stage, minute=minute)
+            worker_key = WORKER_KEY.format(worker_id=self.worker_id, stage=stage)
+            for bucket, count in histogram.counts.items():
+                pipe.hincrby(cluster_key, bucket, count)
+                pipe.hincrby(worker_key, bucket, count)
+            pipe.expire(cluster_key, CLUSTER_TTL)
+            pipe.expire(worker_key, CLUSTER_TTL)
+            queued = True
+        return queued
+
+    def flush(self, force=False):
+        """Envía todo lo pendiente en un pipeline (si pasó flush_ms o con force)"""
+        if self.redis_client is None:
+            return
+
+        now = time.time()
+        if not force and now - self._flushed < self.flush_seconds:
+            return
+        self._flushed = now
+
+        latencies_due = force or now - self._latencies_flushed >= self.LATENCY_FLUSH_SECONDS
+        counters, hashes, expires, values, lists, trims, hash_counters, members, acks = buffers = self._take_buffers()
+
+        try:
+            pipe = self.redis_client.pipeline(transaction=False)
+            for key, mapping in hashes.items():
+                pipe.hset(key, mapping=mapping)
+            for key, amount in counters.items():
+                pipe.incrby(key, amount)
+            for key, increments in hash_counters.items():
+                for field, amount in increments.items():
+                    if isinstance(amount, float):
+                        pipe.hincrbyfloat(key, field, amount)
+                    else:
+                        pipe.hincrby(key, field, amount)
+            for key, names in members.items():
+                pipe.sadd(key, *names)
+            for key, value in values.items():
+                pipe.set(key, value)
+            for key, items in lists.items():
+                pipe.lpush(key, *items)
+                if key in trims:
+                    pipe.ltrim(key, 0, trims[key] - 1)
+            # Al final: las claves ya existen
+            for key, seconds in expires.items():
+                pipe.expire(key, seconds)
+            latencies_queued = latencies_due and self._queue_latencies(pipe)
+
+            if len(pipe):
+                pipe.execute()
+
+            if latencies_queued:
+                for histogram in self._latencies.values():
+                    histogram.clear()
+            if latencies_due:
+                self._latencies_flushed = now
+        except Exception as e:
+            print(f"[{self.worker_id}] Error publicando métricas: {e}")
+            self._restore_buffers(buffers)
+            return
+
+        # Resultados ya en Redis: confirmar sus tareas (si falla, la cola las reentrega)
+        if acks:
+            for listener in self.flush_listeners:
+                try:
+                    listener(acks)
+                except Exception as e:
+                    print(f"[{self.worker_id}] Error confirmando {len(acks)} tareas: {e}")
 
     def init_global_metrics(self):
         """Métricas globales"""
@@ -17,29 +208,22 @@ class WorkerMetrics:
             return
 
         try:
-            if not self.redis_client.exists('processing_start_time'):
-                self.redis_client.set('processing_start_time', datetime.utcnow().isoformat())
-            if not self.redis_client.exists('total_processed'):
-                self.redis_client.set('total_processed', 0)
-            if not self.redis_client.exists('total_errors'):
-                self.redis_client.set('total_errors', 0)
-            if not self.redis_client.exists('total_skipped'):
-                self.redis_client.set('total_skipped', 0)
+            pipe = self.redis_client.pipeline(transaction=False)
+            pipe.set('processing_start_time', datetime.utcnow().isoformat(), nx=True)
+            for counter in ('total_processed', 'total_errors', 'total_skipped'):
+                pipe.set(counter, 0, nx=True)
+            pipe.execute()
         except:
             pass
 
     def increment_global_counter(self, counter_name, amount=1):
-        """Contador global"""
+        """Contador global (se acumula hasta el siguiente flush)"""
         if self.redis_client is None:
             return
+        self._incr(counter_name, amount)
 
-        try:
-            self.redis_client.incrby(counter_name, amount)
-        except:
-            pass
-
-    def update_worker_stats(self, tasks_per_minute, errors=0, tasks_processed=0):
-        """Estadísticas de worker"""
+    def update_worker_stats(self, tasks_per_minute, errors=0, tasks_processed=0, stage_depths=None):
+        """Estadísticas de worker (stage_depths: profundidad de cola por etapa)"""
         if self.redis_client is None:
             return
 
@@ -52,49 +236,156 @@ class WorkerMetrics:
                 history_key = f'worker_history:{self.worker_id}'
                 processed = int(self.redis_client.get(history_key) or 0)
 
-            self.redis_client.hset(key, 'rate', round(tasks_per_minute, 2))
-            self.redis_client.hset(key, 'last_active', datetime.utcnow().isoformat())
-            self.redis_client.hset(key, 'errors', errors)
-            self.redis_client.hset(key, 'processed', processed)
-            self.redis_client.expire(key, 15)
-
-            self.redis_client.set('last_processed_time', datetime.utcnow().isoformat())
+            mapping = {
+                'rate': round(tasks_per_minute, 2),
+                'last_active': datetime.utcnow().isoformat(),
+                'errors': errors,
+                'processed': processed
+            }
+            if stage_depths:
+                mapping.update({f'queue_{stage}': depth for stage, depth in stage_depths.items()})
+            self._hset(key, mapping, expire=self.WORKER_STATS_TTL)
+            self._set('last_processed_time', datetime.utcnow().isoformat())
         except Exception as e:
             print(f"[{self.worker_id}] Error actualizando stats: {e}")
 
-    def save_to_dashboard(self, result_data):
-        """Resultado para visualización en dashboard"""
+    def publish_startup(self, phases):
+        """Marca de ready y tiempos de arranque por fase (segundos)"""
         if self.redis_client is None:
-            return False
+            return
 
-        try:
-            result_data['processed_at'] = datetime.utcnow().isoformat()
-            result_data['worker_id'] = self.worker_id
-            self.redis_client.lpush('resultados_dashboard', json.dumps(result_data, default=json_serial))
-            history_key = f'worker_history:{self.worker_id}'
-            self.redis_client.incr(history_key)
+        key = f'worker_startup:{self.worker_id}'
+        mapping = {f'{phase}_s': round(seconds, 3) for phase, seconds in phases.items()}
+        mapping['total_s'] = round(sum(phases.values()), 3)
+        mapping['ready'] = datetime.utcnow().isoformat()
+        self._hset(key, mapping, expire=24 * 3600)
+        self.flush(force=True)
 
-            return True
-        except Exception as e:
-            print(f"[{self.worker_id}] Error enviando a dashboard: {e}")
-            return False
+    def mark_first_task(self, seconds_since_ready):
+        """Tiempo desde ready hasta la primera tarea completada"""
+        if self.redis_client is None:
+            return
+
+        self._hset(f'worker_startup:{self.worker_id}', {
+            'first_task': datetime.utcnow().isoformat(),
+            'first_task_after_ready_s': round(seconds_since_ready, 3)
+        })
+
+    def update_cache_stats(self, cache_stats):
+        """Aciertos y fallos de la caché NLP (por worker y contador global)"""
+        if self.redis_client is None or not cache_stats:
+            return
+
+        hits = cache_stats['hits_local'] + cache_stats['hits_redis']
+        misses = cache_stats['misses']
+        self._hset(f'worker_stats:{self.worker_id}', {
+            'cache_hits': hits,
+            'cache_hits_redis': cache_stats['hits_redis'],
+            'cache_misses': misses
+        })
+        self._increment_deltas({'nlp_cache_hits': hits, 'nlp_cache_misses': misses})
+
+    def update_segment_cache_stats(self, cache_stats):
+        """Aciertos, fallos y bytes ahorrados de la caché de segmentos WARC"""
+        if self.redis_client is None or not cache_stats:
+            return
+
+        self._hset(f'worker_stats:{self.worker_id}', {
+            'segment_hits': cache_stats['hits'],
+            'segment_misses': cache_stats['misses'],
+            'segment_bytes_saved': cache_stats['bytes_saved'],
+            'segment_cache_bytes': cache_stats['size_bytes']
+        })
+        self._increment_deltas({
+            'segment_cache_hits': cache_stats['hits'],
+            'segment_cache_misses': cache_stats['misses'],
+            'segment_cache_bytes_saved': cache_stats['bytes_saved']
+        })
+
+    def update_dedup_stats(self, dedup_stats):
+        """Inferencias evitadas por casi duplicados (por worker y contador global)"""
+        if self.redis_client is None or not dedup_stats:
+            return
+
+        self._hset(f'worker_stats:{self.worker_id}', {
+            'dedup_checked': dedup_stats['checked'],
+            'nlp_skipped': dedup_stats['duplicates']
+        })
+        self._increment_deltas({'nlp_skipped_duplicates': dedup_stats['duplicates']})
+
+    def update_slot_stats(self, slot_stats):
+        """Ocupación de los slots de I/O (ventana deslizante del motor de hilos)"""
+        if self.redis_client is None or not slot_stats:
+            return
+
+        self._hset(f'worker_stats:{self.worker_id}', {
+            'slots_busy': slot_stats['busy'],
+            'slots_total': slot_stats['total'],
+            'slot_occupancy': slot_stats['occupancy']
+        })
+
+    def update_concurrency(self, concurrency_stats, changes=()):
+        """Límite de concurrencia actual e historial de cambios (concurrency_history:<worker>)"""
+        if self.redis_client is None:
+            return
+
+        mapping = {'concurrency_limit': concurrency_stats['limit'],
+                   'io_throughput': round(concurrency_stats['throughput'], 3)}
+        if concurrency_stats['p90_ms'] is not None:
+            mapping['io_p90_ms'] = round(concurrency_stats['p90_ms'], 1)
+        self._hset(f'worker_stats:{self.worker_id}', mapping)
+
+        history_key = f'concurrency_history:{self.worker_id}'
+        for change in changes:
+            self._push(history_key, json.dumps(change), trim=200)
+        if changes:
+            with self._lock:
+                self._expires[history_key] = 6 * 3600
+
+    def _increment_deltas(self, totals):
+        """Globales: solo el incremento desde la última publicación"""
+        for counter, total in totals.items():
+            delta = total - self._published.get(counter, 0)
+            if delta:
+                self._incr(counter, delta)
+            self._published[counter] = total
+
+    def record_latencies(self, processing_times):
+        """Registra los '<etapa>_ms' de un resultado en los histogramas locales"""
+        for stage in STAGES:
+            ms = processing_times.get(f'{stage}_ms')
+            if ms is not None:
+                self._latencies[stage].record(ms)
 
-    def save_correlation(self, correlation_data):
-        """Correlación en Redis"""
+    def save_result(self, result_data, ack=None):
+        """
+        Resultado serializado una sola vez (msgpack) en la lista que lee el
+        dashboard. Suma el resultado a los agregados de su fecha y dominio.
+        ack: tarea de la cola que se confirma cuando el resultado llega a Redis.
+        """
         if self.redis_client is None:
             return False
 
         try:
-            correlation_data['worker_id'] = self.worker_id
-            correlation_data['timestamp_procesado'] = datetime.utcnow().isoformat()
+            result = dict(result_data, worker_id=self.worker_id, processed_at=datetime.utcnow().isoformat())
+            self._push(RESULTS_KEY, pack_result(result))
+            self._incr(f'worker_history:{self.worker_id}')
 
-            # Guardar en lista de correlaciones
-            self.redis_client.lpush('correlaciones_history', json.dumps(correlation_data, default=json_serial))
-            self.redis_client.ltrim('correlaciones_history', 0, 999)  # Mantener últimas 1000
+            increments = aggregate_fields(result)
+            fecha, domain = aggregate_names(result)
+            if fecha:
+                self._hincr(DAILY_KEY.format(name=fecha), increments)
+                self._sadd(DAILY_INDEX, fecha)
+            self._hincr(DOMAIN_KEY.format(name=domain), increments)
+            self._sadd(DOMAIN_INDEX, domain)
+            if ack is not None:
+                with self._lock:
+                    self._acks.append(ack)
+            self._task_done()
 
             return True
         except Exception as e:
-            print(f"[{self.worker_id}] Error guardando correlación: {e}")
+            print(f"[{self.worker_id}] Error guardando resultado: {e}")
             return False
 
     def save_metrics(self, metrics_data):
@@ -106,9 +397,8 @@ class WorkerMetrics:
             metrics_data['worker_id'] = self.worker_id
             metrics_data['timestamp'] = datetime.utcnow().isoformat()
 
-            # Lista de métricas
-            self.redis_client.lpush('metrics_history', json.dumps(metrics_data, default=json_serial))
-            self.redis_client.ltrim('metrics_history', 0, 499)  # Mantener últimas 500
+            # Lista de métricas (últimas 500)
+            self._push('metrics_history', json.dumps(metrics_data, default=json_serial), trim=500)
 
             return True
         except Exception as e:
@@ -2,82 +2,233 @@
 Módulo de procesamiento de lenguaje natural (NLP).
 Análisis de sentimiento usando pysentimiento (español).
 """
+import hashlib
+import os
+
 from src.common.config import Config
+
+# Caché local del modelo: nunca contactar el hub (debe definirse antes de importar transformers)
+if Config.NLP_MODEL_DIR:
+    os.environ.setdefault('HF_HUB_OFFLINE', '1')
+    os.environ.setdefault('TRANSFORMERS_OFFLINE', '1')
+
 from pysentimiento import create_analyzer
+from pysentimiento.preprocessing import preprocess_tweet
+
+from .cache import SentimentCache
+from .dedup import NearDuplicateIndex
+from .nlp_backends import configure_child, create_backend
+from .keywords import KeywordMatcher
+
+
+def save_model(target_dir):
+    """Descarga el modelo y tokenizer al directorio local usado por NLP_MODEL_DIR"""
+    analyzer = create_analyzer(task="sentiment", lang="es")
+    analyzer.model.save_pretrained(target_dir)
+    analyzer.tokenizer.save_pretrained(target_dir)
+    print(f"[NLP] Modelo guardado en {target_dir}")
 
 
 class SentimentAnalyzer:
 
-    def __init__(self):
+    # Mapear clasificación de pysentimiento al formato esperado
+    CLASSIFICATION_MAP = {
+        'POS': 'positivo',
+        'NEG': 'negativo',
+        'NEU': 'neutral'
+    }
+
+    # Entradas fijas para calentar el modelo antes de consumir tareas
+    WARMUP_TEXTS = [
+        "El COLCAP cerró al alza impulsado por las acciones del sector financiero.",
+        "La inflación volvió a subir y preocupa a los analistas del mercado.",
+        "El Banco de la República mantuvo estable la tasa de interés.",
+        "Las exportaciones de café y petróleo crecieron durante el último trimestre, "
+        "mientras el dólar se mantuvo estable frente al peso colombiano.",
+    ]
+
+    def __init__(self, batch_size=None, redis_client=None, backend=None, defer_session=False):
         self.economic_keywords = Config.ECONOMIC_KEYWORDS
-        self.analyzer = create_analyzer(task="sentiment", lang="es")
+        self.keyword_matcher = KeywordMatcher(self.economic_keywords)
+        self.batch_size = batch_size or Config.NLP_BATCH_SIZE
+        # El analyzer de pysentimiento solo se usa para cargar modelo y tokenizer;
+        # no se guarda para que int8/onnx puedan liberar los pesos fp32
+        if Config.NLP_MODEL_DIR:
+            analyzer = create_analyzer(task="sentiment", lang="es", model_name=Config.NLP_MODEL_DIR)
+        else:
+            analyzer = create_analyzer(task="sentiment", lang="es")
+        model = analyzer.model
+        self.model_name = model.name_or_path
+        self.tokenizer = analyzer.tokenizer
+        self.id2label = model.config.id2label
+        self.preprocessing_args = getattr(analyzer, 'preprocessing_args', {}) or {}
+        self.max_length = min(self.tokenizer.model_max_length, 512)
+
+        # Backend de inferencia: torch (fp32), int8 u onnx
+        onnx_dir = os.path.join(Config.NLP_ONNX_DIR, self.model_name.replace('/', '__'))
+        self.backend = create_backend(
+            backend or Config.NLP_BACKEND, model, self.tokenizer, self.max_length,
+            onnx_dir=onnx_dir, threads=Config.NLP_THREADS, defer_session=defer_session
+        )
+        print(f"[NLP] Modelo {self.model_name} | backend: {self.backend.name}")
+
+        # Caché por contenido (LRU local + Redis)
+        self.cache = None
+        if Config.NLP_CACHE_SIZE > 0:
+            self.cache = SentimentCache(redis_client, version=self.model_version)
+
+        # Índice de casi duplicados (MinHash-LSH en Redis) consultado antes de la inferencia
+        self.near_duplicates = None
+        if Config.NEAR_DUP_ENABLED:
+            self.near_duplicates = NearDuplicateIndex(redis_client, version=self.model_version)
+
+    def init_child(self, threads):
+        """Hilos de inferencia de un proceso hijo (tras fork); abre la sesión ONNX si hace falta"""
+        configure_child(self.backend, threads)
+
+    def warmup(self):
+        """
+        Pasada sobre entradas fijas (sin caché): inicializa kernels y
+        buffers para que la primera tarea real no pague ese costo.
+        """
+        texts = (self.WARMUP_TEXTS * self.batch_size)[:self.batch_size]
+        self._compute_batch(texts[:1])
+        self._compute_batch(texts)
+        self.keyword_matcher.count_batch(texts)
+
+    @property
+    def model_version(self):
+        """Identifica modelo y lista de palabras clave para las claves de caché"""
+        keywords_sig = hashlib.sha1('|'.join(self.economic_keywords).encode('utf-8')).hexdigest()[:8]
+        return f"{self.model_name}|{self.backend.name}|kw={keywords_sig}"
+
+    @staticmethod
+    def _empty_result():
+        return {
+            'polarity': 0,
+            'subjectivity': 0,
+            'classification': 'neutral',
+            'confidence': 0
+        }
+
+    def _format_result(self, probas):
+        """Convierte probabilidades {'POS', 'NEG', 'NEU'} al formato del worker"""
+        label = max(probas, key=probas.get)
+
+        # Calcular polaridad (-1 a 1)
+        polarity = probas.get('POS', 0) - probas.get('NEG', 0)
+
+        # Confianza es la probabilidad del label predicho
+        confidence = probas.get(label, 0)
+
+        return {
+            'polarity': round(polarity, 3),
+            'subjectivity': round(1 - probas.get('NEU', 0), 3),
+            'classification': self.CLASSIFICATION_MAP.get(label, 'neutral'),
+            'confidence': round(confidence, 3)
+        }
+
+    def _predict_probas(self, texts):
+        """Un único forward pass con padding para un lote de textos"""
+        prepared = [
+            preprocess_tweet(text[:512], lang="es", **self.preprocessing_args)
+            for text in texts
+        ]
+        probs = self.backend.predict(prepared)
+
+        return [
+            {self.id2label[i]: p for i, p in enumerate(row)}
+            for row in probs
+        ]
+
+    def _compute_batch(self, texts):
+        """Inferencia en lotes de `batch_size`, sin caché"""
+        results = []
+        for start in range(0, len(texts), self.batch_size):
+            chunk = texts[start:start + self.batch_size]
+            try:
+                results.extend(self._format_result(p) for p in self._predict_probas(chunk))
+            except Exception as e:
+                print(f"[NLP] Error en análisis por lote ({len(chunk)} textos): {e}")
+                results.extend(self._empty_result() for _ in chunk)
+        return results
+
+    def analyze_batch(self, texts):
+        """
+        Sentimiento de varios textos en lotes de `batch_size`.
+        Solo los textos que no están en caché pasan por el modelo.
+        Retorna una lista en el mismo orden que `texts`.
+        """
+        if self.cache is None:
+            return self._compute_batch(texts)
+
+        results = self.cache.get_many(texts, 'sentiment')
+        missing = [i for i, r in enumerate(results) if r is None]
+        if missing:
+            computed = self._compute_batch([texts[i] for i in missing])
+            for i, sentiment in zip(missing, computed):
+                results[i] = sentiment
+            # No cachear resultados vacíos de error
+            cacheable = [(texts[i], s) for i, s in zip(missing, computed) if s['confidence']]
+            if cacheable:
+                self.cache.set_many([t for t, _ in cacheable], 'sentiment', [s for _, s in cacheable])
+        return results
 
     def analyze(self, text):
         """
         Sentimiento del texto usando pysentimiento.
         Modelo entrenado en español.
         """
+        return self.analyze_batch([text])[0]
+
+    def _keywords_summary(self, counts):
+        """Formato de salida a partir de {keyword: ocurrencias}"""
+        found_keywords = [{'keyword': k, 'count': c} for k, c in counts.items()]
+
+        relevance_score = min(
+            100,
+            len(found_keywords) * 10 + sum(k['count'] for k in found_keywords) * 2
+        )
+
+        return {
+            'keywords': found_keywords[:10],
+            'total_keywords': len(found_keywords),
+            'relevance_score': relevance_score
+        }
+
+    def detect_economic_keywords_batch(self, texts):
+        """
+        Palabras clave de varios textos (una pasada por texto).
+        Retorna una lista en el mismo orden que `texts`.
+        """
+        # analyze_batch ya trajo de Redis las entradas existentes al LRU local
+        if self.cache is not None:
+            results = self.cache.get_many(texts, 'keywords', local_only=True)
+        else:
+            results = [None] * len(texts)
+
+        missing = [i for i, r in enumerate(results) if r is None]
+        if not missing:
+            return results
+
         try:
-            # Limitar texto 
-            text_truncated = text[:512] if len(text) > 512 else text
-
-            result = self.analyzer.predict(text_truncated)
-
-            # Mapear resultado de pysentimiento al formato esperado
-            label = result.output  # 'POS', 'NEG', 'NEU'
-            probas = result.probas  # {'POS': 0.8, 'NEG': 0.1, 'NEU': 0.1}
-
-            # Calcular polaridad (-1 a 1)
-            polarity = probas.get('POS', 0) - probas.get('NEG', 0)
-
-            # Mapear clasificación
-            classification_map = {
-                'POS': 'positivo',
-                'NEG': 'negativo',
-                'NEU': 'neutral'
-            }
-            classification = classification_map.get(label, 'neutral')
-
-            # Confianza es la probabilidad del label predicho
-            confidence = probas.get(label, 0)
-
-            return {
-                'polarity': round(polarity, 3),
-                'subjectivity': round(1 - probas.get('NEU', 0), 3),
-                'classification': classification,
-                'confidence': round(confidence, 3)
-            }
+            counts = self.keyword_matcher.count_batch([texts[i] for i in missing])
+            computed = [self._keywords_summary(c) for c in counts]
         except Exception as e:
-            print(f"[NLP] Error en análisis: {e}")
-            return {
-                'polarity': 0,
-                'subjectivity': 0,
-                'classification': 'neutral',
-                'confidence': 0
-            }
+            print(f"[NLP] Error detectando palabras clave: {e}")
+            for i in missing:
+                results[i] = {'keywords': [], 'total_keywords': 0, 'relevance_score': 0}
+            return results
+
+        for i, keywords in zip(missing, computed):
+            results[i] = keywords
+
+        if self.cache is not None:
+            self.cache.set_many([texts[i] for i in missing], 'keywords', computed)
+        return results
 
     def detect_economic_keywords(self, text):
         """
         Palabras claves en el texto
         """
-        try:
-            text_lower = text.lower()
-            found_keywords = []
-
-            for keyword in self.economic_keywords:
-                if keyword in text_lower:
-                    count = text_lower.count(keyword)
-                    found_keywords.append({'keyword': keyword, 'count': count})
-
-            relevance_score = min(
-                100,
-                len(found_keywords) * 10 + sum(k['count'] for k in found_keywords) * 2
-            )
-
-            return {
-                'keywords': found_keywords[:10],
-                'total_keywords': len(found_keywords),
-                'relevance_score': relevance_score
-            }
-        except:
-            return {'keywords': [], 'total_keywords': 0, 'relevance_score': 0}
+        return self.detect_economic_keywords_batch([text])[0]
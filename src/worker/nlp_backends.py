@@ -0,0 +1,140 @@
+"""
+Backends de inferencia para el modelo de sentimiento.
+
+- torch: modelo PyTorch fp32 de pysentimiento (por defecto)
+- int8:  cuantización dinámica int8 de las capas Linear (CPU)
+- onnx:  sesión de ONNX Runtime exportada desde el modelo PyTorch
+
+Todos reciben textos ya preprocesados y retornan probabilidades por clase
+en el orden de `model.config.id2label`.
+
+En modo multiproceso (defer_session) el supervisor solo exporta el modelo a
+ONNX; la sesión de ONNX Runtime, con su pool de hilos, la abre cada hijo
+después del fork (open_session) con su parte de los cores.
+"""
+import os
+
+import numpy as np
+import torch
+
+
+class TorchBackend:
+    name = 'torch'
+
+    def __init__(self, model, tokenizer, max_length):
+        self.model = model
+        self.tokenizer = tokenizer
+        self.max_length = max_length
+        self.model.eval()
+
+    def _tokenize(self, texts, tensors):
+        return self.tokenizer(
+            texts,
+            padding=True,
+            truncation=True,
+            max_length=self.max_length,
+            return_token_type_ids=False,
+            return_tensors=tensors
+        )
+
+    def predict(self, texts):
+        """Un único forward pass con padding para todo el lote"""
+        encoded = self._tokenize(texts, 'pt')
+        with torch.inference_mode():
+            logits = self.model(**encoded).logits
+        return torch.softmax(logits, dim=-1).tolist()
+
+
+class QuantizedTorchBackend(TorchBackend):
+    name = 'int8'
+
+    def __init__(self, model, tokenizer, max_length):
+        quantized = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        super().__init__(quantized, tokenizer, max_length)
+
+
+class OnnxBackend(TorchBackend):
+    name = 'onnx'
+
+    def __init__(self, model, tokenizer, max_length, model_dir, threads=0, defer_session=False):
+        import onnxruntime  # Falla aquí (y se usa torch) si no está instalado
+
+        super().__init__(model, tokenizer, max_length)
+        self.path = os.path.join(model_dir, 'model.onnx')
+        if not os.path.exists(self.path):
+            self._export(self.path)
+        # El modelo PyTorch ya no se usa: liberar memoria
+        self.model = None
+
+        self.session = None
+        if not defer_session:
+            self.open_session(threads)
+
+    def open_session(self, threads=0):
+        """Sesión de ONNX Runtime (en modo multiproceso, en cada hijo tras el fork)"""
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+            options.inter_op_num_threads = 1
+        self.session = ort.InferenceSession(self.path, options, providers=['CPUExecutionProvider'])
+
+    def _export(self, path):
+        """Exporta el modelo a ONNX con ejes dinámicos (batch y secuencia)"""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        sample = self._tokenize(["texto de ejemplo"], 'pt')
+        tmp_path = f"{path}.tmp"
+        torch.onnx.export(
+            self.model,
+            (sample['input_ids'], sample['attention_mask']),
+            tmp_path,
+            input_names=['input_ids', 'attention_mask'],
+            output_names=['logits'],
+            dynamic_axes={
+                'input_ids': {0: 'batch', 1: 'sequence'},
+                'attention_mask': {0: 'batch', 1: 'sequence'},
+                'logits': {0: 'batch'}
+            },
+            opset_version=14
+        )
+        os.replace(tmp_path, path)
+        print(f"[NLP] Modelo exportado a ONNX: {path}")
+
+    def predict(self, texts):
+        encoded = self._tokenize(texts, 'np')
+        logits = self.session.run(['logits'], {
+            'input_ids': encoded['input_ids'].astype(np.int64),
+            'attention_mask': encoded['attention_mask'].astype(np.int64)
+        })[0]
+        exp = np.exp(logits - logits.max(axis=-1, keepdims=True))
+        return (exp / exp.sum(axis=-1, keepdims=True)).tolist()
+
+
+def create_backend(name, model, tokenizer, max_length, onnx_dir=None, threads=0, defer_session=False):
+    """
+    Construye el backend configurado; si falla, vuelve al modelo torch fp32.
+    defer_session: el proceso hará fork después (la sesión ONNX se abre en cada hijo).
+    """
+    if defer_session:
+        # Exportar a ONNX con un solo hilo: el pool de OpenMP no se crea antes del fork
+        torch.set_num_threads(1)
+    elif threads:
+        torch.set_num_threads(threads)
+
+    try:
+        if name == 'int8':
+            return QuantizedTorchBackend(model, tokenizer, max_length)
+        if name == 'onnx':
+            return OnnxBackend(model, tokenizer, max_length, onnx_dir, threads, defer_session)
+    except Exception as e:
+        print(f"[NLP] Backend '{name}' no disponible ({e}), usando torch")
+
+    return TorchBackend(model, tokenizer, max_length)
+
+
+def configure_child(backend, threads):
+    """Tras fork: hilos de torch del hijo y, con ONNX, su propia sesión"""
+    torch.set_num_threads(threads)
+    if isinstance(backend, OnnxBackend) and backend.session is None:
+        backend.open_session(threads)
@@ -0,0 +1,301 @@
+"""
+Pipeline por etapas del worker.
+
+Los hilos de I/O solo descargan y extraen; los textos extraídos se encolan
+y un único consumidor de inferencia los agrupa en micro-batches. Cada texto
+viaja con su tarea de la cola (task_data) para confirmarla recién cuando su
+resultado quedó guardado.
+
+Con el motor asíncrono (async_fetcher) la descarga sale de los hilos y
+ExtractionStage consume los payloads ya descargados. Con el motor de hilos,
+SlidingWindow mantiene N trabajos en vuelo y rellena cada slot en cuanto se
+libera (sin barrera por lote).
+"""
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, wait
+
+from src.common.config import Config
+from .processor import FETCH_FAILED
+
+
+def task_outcome(extracted):
+    """Resultado de I/O de una tarea: True (texto a inferencia), False (sin texto) o None (descarga fallida)"""
+    if extracted is FETCH_FAILED:
+        return None
+    return bool(extracted)
+
+
+def settle_outcomes(task_queue, task_datas, outcomes, seconds=None, controller=None):
+    """
+    Cierra un trabajo de I/O terminado. Solo confirma las tareas descargadas
+    sin texto: las que van a inferencia se confirman al guardar su resultado y
+    las de descarga fallida quedan pendientes para que XAUTOCLAIM las
+    reintente (hasta QUEUE_MAX_DELIVERIES). Con control adaptativo registra
+    el trabajo como error si alguna descarga falló.
+    Retorna el número de descargas fallidas.
+    """
+    task_queue.ack([task_data for task_data, outcome in zip(task_datas, outcomes) if outcome is False])
+    failures = outcomes.count(None)
+    if controller is not None:
+        controller.record(seconds, ok=not failures)
+    return failures
+
+
+class InferenceStage:
+    """Consumidor único de inferencia con micro-batching"""
+
+    def __init__(self, warc_processor, nlp_analyzer, worker_id,
+                 max_batch=None, max_wait_ms=None, max_queue=None):
+        self.warc_processor = warc_processor
+        self.nlp_analyzer = nlp_analyzer
+        self.worker_id = worker_id
+        self.max_batch = max_batch or Config.NLP_BATCH_SIZE
+        self.max_wait = (max_wait_ms if max_wait_ms is not None else Config.NLP_MAX_WAIT_MS) / 1000
+        # Cola acotada: si la inferencia se atrasa, los hilos de I/O esperan
+        self.input_queue = queue.Queue(maxsize=max_queue or Config.NLP_QUEUE_SIZE)
+        self.output_queue = queue.Queue()
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='inference-stage', daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=10):
+        """Detiene el consumidor después de vaciar la cola de entrada"""
+        self._stop_event.set()
+        self._thread.join(timeout=timeout)
+
+    def submit(self, extracted, task_data=None):
+        """Encola un artículo extraído y su tarea (bloquea si la cola está llena)"""
+        self.input_queue.put((extracted, task_data))
+
+    def _next_batch(self):
+        """Espera el primer elemento y completa el batch hasta max_batch o max_wait"""
+        try:
+            first = self.input_queue.get(timeout=0.5)
+        except queue.Empty:
+            return []
+
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.input_queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while not (self._stop_event.is_set() and self.input_queue.empty()):
+            batch = self._next_batch()
+            if not batch:
+                continue
+
+            texts = [extracted for extracted, _ in batch]
+            try:
+                results = self.warc_processor.analyze_extracted(texts, self.nlp_analyzer, self.worker_id)
+            except Exception as e:
+                print(f"[{self.worker_id}] Error en etapa de inferencia ({len(batch)} textos): {e}")
+                results = [None] * len(batch)
+
+            # None = error de inferencia para ese artículo
+            for result, (_, task_data) in zip(results, batch):
+                self.output_queue.put((result, task_data))
+
+    def drain_results(self):
+        """(resultado, task_data) disponibles sin bloquear"""
+        results = []
+        while True:
+            try:
+                results.append(self.output_queue.get_nowait())
+            except queue.Empty:
+                return results
+
+    def depths(self):
+        return {
+            'inference': self.input_queue.qsize(),
+            'results': self.output_queue.qsize()
+        }
+
+
+class ExtractionStage:
+    """
+    Hilos de CPU del motor asíncrono: extraen el texto de los payloads ya
+    descargados y lo pasan a la etapa de inferencia.
+
+    Trabajos en la cola de entrada:
+        ('group', FetchGroup, payload, download_time, error)
+        ('single', task_data)  -> tarea sin rango, se descarga aquí mismo
+    """
+
+    def __init__(self, input_queue, warc_processor, correlator, inference, worker_id, threads=4):
+        self.input_queue = input_queue
+        self.warc_processor = warc_processor
+        self.correlator = correlator
+        self.inference = inference
+        self.worker_id = worker_id
+        # (task_data, resultado) por tarea (ver task_outcome)
+        self.outcomes = queue.Queue()
+        self._stop_event = threading.Event()
+        self._threads = [
+            threading.Thread(target=self._run, name=f'extraction-{i}', daemon=True)
+            for i in range(threads)
+        ]
+
+    def start(self):
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def stop(self, timeout=10):
+        """Detiene los hilos después de vaciar la cola de entrada"""
+        self._stop_event.set()
+        for thread in self._threads:
+            thread.join(timeout=timeout)
+
+    def submit(self, task_data):
+        """Tarea sin rango (no pasa por el motor de descarga)"""
+        self.input_queue.put(('single', task_data))
+
+    @staticmethod
+    def _task_datas(job):
+        if job[0] == 'single':
+            return [job[1]]
+        return [task_data for task_data, _ in job[1].items]
+
+    def _extract(self, job):
+        if job[0] == 'single':
+            return [self.warc_processor.extract_record(job[1], self.correlator, self.worker_id)]
+
+        _, group, payload, download_time, error = job
+        if error:
+            print(f"[{self.worker_id}] CC Error de red (grupo de {len(group.items)}): {error[:60]}")
+            return [FETCH_FAILED] * len(group.items)
+        return self.warc_processor.extract_group_payload(
+            group, payload, download_time, self.correlator, self.worker_id)
+
+    def _run(self):
+        while not (self._stop_event.is_set() and self.input_queue.empty()):
+            try:
+                job = self.input_queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+
+            try:
+                extracted_items = self._extract(job)
+            except Exception as e:
+                print(f"[{self.worker_id}] Error en hilo: {e}")
+                extracted_items = [FETCH_FAILED] * (len(job[1].items) if job[0] == 'group' else 1)
+
+            for task_data, extracted in zip(self._task_datas(job), extracted_items):
+                if extracted:
+                    self.inference.submit(extracted, task_data)
+                self.outcomes.put((task_data, task_outcome(extracted)))
+
+    def drain_outcomes(self):
+        """Resultados de extracción disponibles sin bloquear"""
+        outcomes = []
+        while True:
+            try:
+                outcomes.append(self.outcomes.get_nowait())
+            except queue.Empty:
+                return outcomes
+
+    def depths(self):
+        return {'extraction': self.input_queue.qsize()}
+
+
+class SlidingWindow:
+    """
+    Ventana deslizante sobre el ThreadPool de I/O: como máximo `slots`
+    trabajos en vuelo; el resto espera en un backlog local y entra en cuanto
+    termina cualquiera. Una descarga lenta ocupa un slot, no bloquea a los
+    demás hasta el final del lote.
+
+    Ocupación = slot-segundos ocupados / slot-segundos disponibles, medida
+    por ventanas de `window_seconds`. `resize` cambia el número de slots en
+    caliente (control adaptativo): al reducir, los trabajos en vuelo terminan
+    y simplemente no se rellenan.
+    """
+
+    def __init__(self, executor, slots, window_seconds=10):
+        self.executor = executor
+        self.slots = slots
+        self.window_seconds = window_seconds
+        self.backlog = deque()  # (fn, args, tareas, tag)
+        self.pending = {}  # future -> (tareas, inicio, tag)
+        now = time.monotonic()
+        self._last_change = now
+        self._window_start = now
+        self._busy_area = 0.0
+        self._capacity_area = 0.0
+        self._occupancy = 0.0
+
+    def _advance(self):
+        """Acumula slot-segundos ocupados hasta ahora"""
+        now = time.monotonic()
+        self._busy_area += len(self.pending) * (now - self._last_change)
+        self._capacity_area += self.slots * (now - self._last_change)
+        self._last_change = now
+        if now - self._window_start >= self.window_seconds:
+            self._occupancy = min(1.0, self._busy_area / self._capacity_area) if self._capacity_area else 0.0
+            self._busy_area = 0.0
+            self._capacity_area = 0.0
+            self._window_start = now
+
+    def _fill(self):
+        while self.backlog and len(self.pending) < self.slots:
+            fn, args, size, tag = self.backlog.popleft()
+            self.pending[self.executor.submit(fn, args)] = (size, time.monotonic(), tag)
+
+    def add(self, fn, args, size=1, tag=None):
+        """Encola un trabajo de `size` tareas (tag: se devuelve al terminar); arranca si hay slot libre"""
+        self._advance()
+        self.backlog.append((fn, args, size, tag))
+        self._fill()
+
+    def resize(self, slots):
+        self._advance()
+        self.slots = slots
+        self._fill()
+
+    def has_room(self):
+        """Hay slots libres y nada esperando: conviene leer más tareas"""
+        return not self.backlog and len(self.pending) < self.slots
+
+    def idle(self):
+        return not self.backlog and not self.pending
+
+    @property
+    def in_flight(self):
+        """Tareas en vuelo o esperando slot"""
+        return sum(job[0] for job in self.pending.values()) + sum(job[2] for job in self.backlog)
+
+    def wait(self, timeout=None):
+        """Espera a que termine al menos un trabajo. Retorna [(future, tag, segundos)] terminados"""
+        if not self.pending:
+            return []
+        done, _ = wait(list(self.pending), timeout=timeout, return_when=FIRST_COMPLETED)
+        self._advance()
+        now = time.monotonic()
+        finished = []
+        for future in done:
+            _, started, tag = self.pending.pop(future)
+            finished.append((future, tag, now - started))
+        self._fill()
+        return finished
+
+    def snapshot(self):
+        self._advance()
+        return {
+            'busy': len(self.pending),
+            'total': self.slots,
+            'occupancy': round(self._occupancy, 3)
+        }
@@ -9,28 +9,90 @@ Esto cumple con el requisito del proyecto:
 "fuentes abiertas (por ejemplo, Common Crawl o portales de noticias nacionales)"
 """
 import requests
+import urllib3
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 import io
-import gzip
 import re
 import time
 import json
 from warcio.archiveiterator import ArchiveIterator
 
 from src.common.config import Config
+from .extractors import create_extractor
+
+
+# Errores de descarga transitorios; también 403/429 y 5xx (ver fetch_failed)
+FETCH_ERRORS = (requests.exceptions.RequestException, urllib3.exceptions.HTTPError, OSError)
+RETRY_STATUS = (403, 429)
+
+
+class _FetchFailed:
+    """Tarea cuya descarga falló: falsa como "sin texto", pero se distingue de ella"""
+
+    def __bool__(self):
+        return False
+
+    def __repr__(self):
+        return 'FETCH_FAILED'
+
+
+FETCH_FAILED = _FetchFailed()
+
+
+def fetch_failed(error):
+    """True si la excepción es un fallo de descarga (red, timeout, 5xx, 403/429) y no un 404 u otro 4xx"""
+    if isinstance(error, requests.exceptions.HTTPError) and error.response is not None:
+        status = error.response.status_code
+        return status in RETRY_STATUS or status >= 500
+    return isinstance(error, FETCH_ERRORS)
+
+
+class _MemberReader:
+    """Lectura acotada a `length` bytes de un stream: un miembro gzip de un grupo"""
+
+    CHUNK = 64 * 1024
+
+    def __init__(self, raw, length):
+        self.raw = raw
+        self.remaining = length
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b''
+        if size is None or size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.raw.read(size)
+        if not data:
+            raise IOError('respuesta truncada')
+        self.remaining -= len(data)
+        return data
+
+    def drain(self):
+        """Descarta lo que quede del miembro (deja el stream en el siguiente)"""
+        while self.remaining > 0:
+            self.read(self.CHUNK)
 
 
 class WARCProcessor:
-    def __init__(self):
+    def __init__(self, rate_limiter=None, segment_cache=None, source=None, pool_size=None):
         self.base_url = Config.CC_DATA_URL
-        self.session = self._create_session()
+        # Conexiones reutilizables: al menos una por hilo de I/O (hasta CONCURRENCY_MAX)
+        self.session = self._create_session(pool_size or Config.WORKER_THREADS)
+        # Token bucket global (Redis); sin él se usa una pausa fija por petición
+        self.rate_limiter = rate_limiter
+        # Caché en disco de segmentos (opcional, SEGMENT_CACHE_DIR)
+        self.segment_cache = segment_cache
+        # Fuente local de WARC (modo replay, WARC_LOCAL_DIR); None = Common Crawl por HTTP
+        self.source = source
+        # Extractor de HTML (lxml o bs4)
+        self.extractor = create_extractor(Config.HTML_EXTRACTOR)
         # Regex precompilados para limpieza de texto
         self._whitespace_re = re.compile(r'\s+')
         self._special_chars_re = re.compile(r'[^\w\sáéíóúñÁÉÍÓÚÑ.,;:!?()-]')
 
-    def _create_session(self):
-        """Crea sesión HTTP con retry y connection pooling"""
+    def _create_session(self, pool_size=10):
+        """Crea sesión HTTP con retry y connection pooling (pool_size conexiones por host)"""
         session = requests.Session()
 
         session.headers.update({
@@ -39,16 +101,17 @@ class WARCProcessor:
             'Accept-Encoding': 'gzip, deflate'
         })
 
+        # 503 no se reintenta aquí: lo maneja el limitador de tasa (AIMD)
         retry_strategy = Retry(
             total=2,
             backoff_factor=0.5,
-            status_forcelist=[500, 502, 503, 504]
+            status_forcelist=[500, 502, 504]
         )
 
         adapter = HTTPAdapter(
             max_retries=retry_strategy,
             pool_connections=10,
-            pool_maxsize=10
+            pool_maxsize=max(10, pool_size)
         )
 
         session.mount("https://", adapter)
@@ -58,17 +121,49 @@ class WARCProcessor:
 
     def download_segment(self, warc_filename, offset, length):
         """Descarga un segmento WARC usando los offsets del índice"""
-        url = self.base_url + warc_filename
+        if offset and length:
+            return self.download_range(warc_filename, offset, offset + length - 1)
+        return self.download_range(warc_filename)
 
-        headers = {}
+    def open_segment(self, warc_filename, offset, length):
+        """Como download_segment pero sin leer el cuerpo: respuesta en streaming"""
         if offset and length:
-            headers['Range'] = f"bytes={offset}-{offset + length - 1}"
+            return self.download_range(warc_filename, offset, offset + length - 1, stream=True)
+        return self.download_range(warc_filename, stream=True)
+
+    def download_range(self, warc_filename, start=None, end=None, stream=False):
+        """
+        Descarga el rango [start, end] (inclusivo) de un archivo WARC.
+        Con stream=True retorna la respuesta sin leer el cuerpo (usar response.raw).
+        """
+        if self.source is not None:
+            # Modo replay: archivos locales, sin red ni limitador
+            return self.source.read_range(warc_filename, start, end)
+
+        url = self.base_url + warc_filename
 
-        time.sleep(5.0)  # Delay entre requests a Common Crawl (evitar 403)
+        headers = {}
+        if start is not None and end is not None:
+            headers['Range'] = f"bytes={start}-{end}"
 
-        response = self.session.get(url, headers=headers, timeout=30)
-        response.raise_for_status()
+        if self.rate_limiter:
+            self.rate_limiter.acquire()
+        else:
+            time.sleep(Config.CC_REQUEST_DELAY)  # Delay entre requests a Common Crawl (evitar 403)
 
+        response = self.session.get(url, headers=headers, timeout=30, stream=stream)
+        if self.rate_limiter:
+            self.rate_limiter.on_response(response.status_code)
+        try:
+            response.raise_for_status()
+        except requests.exceptions.HTTPError:
+            response.close()
+            raise
+
+        if stream:
+            # Content-Encoding del servidor (si lo hay) se resuelve al leer
+            response.raw.decode_content = True
+            return response
         return response.content
 
     def _extract_title_from_text(self, text):
@@ -87,72 +182,61 @@ class WARCProcessor:
         return text.strip()[:2000]
 
     def _extract_text_from_html(self, html_content):
-        """Extrae texto limpio de HTML usando BeautifulSoup"""
-        from bs4 import BeautifulSoup
-
-        soup = BeautifulSoup(html_content, 'html.parser')
-
-        # Remover scripts, styles, nav, footer, etc.
-        for tag in soup(['script', 'style', 'nav', 'footer', 'header',
-                        'aside', 'iframe', 'noscript', 'form']):
-            tag.decompose()
-
-        # Extraer título
-        title = "Sin título"
-        og_title = soup.find('meta', property='og:title')
-        if og_title and og_title.get('content'):
-            title = og_title['content'].strip()
-        elif soup.find('h1'):
-            title = soup.find('h1').get_text(strip=True)
-        elif soup.find('title'):
-            title = soup.find('title').get_text(strip=True).split('|')[0].strip()
-
-        # Extraer contenido principal
-        content_selectors = [
-            'article', '.article-content', '.article-body', '.entry-content',
-            '.post-content', '.news-content', '.contenido', '[itemprop="articleBody"]'
-        ]
-
-        content_text = ""
-        for selector in content_selectors:
-            element = soup.select_one(selector)
-            if element:
-                paragraphs = element.find_all('p')
-                if paragraphs:
-                    content_text = ' '.join(p.get_text(strip=True) for p in paragraphs)
-                    break
-
-        # Fallback: todos los párrafos
-        if not content_text:
-            paragraphs = soup.find_all('p')
-            content_text = ' '.join(p.get_text(strip=True) for p in paragraphs[:20])
-
+        """Extrae título y texto limpio del HTML con el extractor configurado"""
+        title, content_text = self.extractor.extract(html_content)
         return title, self._clean_text(content_text)
 
-    def _process_via_common_crawl(self, task, worker_id, nlp_analyzer, correlator):
-        """Procesa usando Common Crawl WARC"""
+    def _extract_via_common_crawl(self, task, worker_id, correlator, warc_data=None, download_time=0.0):
+        """
+        Descarga y extrae el artículo desde Common Crawl WARC (sin NLP).
+        `warc_data` permite pasar un segmento ya descargado (descarga agrupada).
+
+        La respuesta HTTP se pasa directo a ArchiveIterator (descomprime el
+        miembro gzip al vuelo) y del payload solo se leen WARC_MAX_PAYLOAD_BYTES.
+        """
         warc_filename = task.get('filename')
         offset = int(task.get('offset', 0))
         length = int(task.get('length', 0))
-        original_url = task.get('url', 'unknown')
-        domain = task.get('domain', 'unknown')
-        timestamp = task.get('timestamp', '')
 
         process_start = time.time()
 
-        # Descargar segmento WARC
-        download_start = time.time()
-        warc_data = self.download_segment(warc_filename, offset, length)
-        download_time = time.time() - download_start
+        # Modo replay: el segmento se lee del disco local
+        if warc_data is None and self.source is not None:
+            download_start = time.time()
+            warc_data = self.download_segment(warc_filename, offset, length)
+            download_time = time.time() - download_start
+
+        # Caché en disco: solo registros con rango (segmentos inmutables)
+        if warc_data is None and self.segment_cache is not None and offset and length:
+            download_start = time.time()
+            warc_data = self.segment_cache.get(warc_filename, offset, length)
+            if warc_data is None:
+                warc_data = self.download_segment(warc_filename, offset, length)
+                self.segment_cache.put(warc_filename, offset, length, warc_data)
+            download_time = time.time() - download_start
+
+        # Descargar segmento WARC (en streaming: download_ms mide hasta las cabeceras)
+        response = None
+        if warc_data is None:
+            download_start = time.time()
+            response = self.open_segment(warc_filename, offset, length)
+            download_time = time.time() - download_start
+            stream = response.raw
+        else:
+            stream = io.BytesIO(warc_data)
 
-        # Descomprimir
         try:
-            decompressed = gzip.decompress(warc_data)
-            stream = io.BytesIO(decompressed)
-        except gzip.BadGzipFile:
-            stream = io.BytesIO(warc_data)
+            return self._extract_from_stream(stream, task, correlator, process_start, download_time)
+        finally:
+            if response is not None:
+                response.close()
+
+    def _extract_from_stream(self, stream, task, correlator, process_start, download_time):
+        """Recorre los registros WARC de `stream` (gzip o sin comprimir)"""
+        original_url = task.get('url', 'unknown')
+        domain = task.get('domain', 'unknown')
+        timestamp = task.get('timestamp', '')
 
-        # Procesar el WARC
         for record in ArchiveIterator(stream):
             if record.rec_type == 'response':
                 warc_date = record.rec_headers.get_header('WARC-Date')
@@ -169,7 +253,8 @@ class WARCProcessor:
                 if valor_colcap is not None:
                     extract_start = time.time()
 
-                    content = record.content_stream().read()
+                    # Solo el inicio del payload: basta para los 2000 caracteres que se conservan
+                    content = record.content_stream().read(Config.WARC_MAX_PAYLOAD_BYTES)
                     if isinstance(content, bytes):
                         content = content.decode('utf-8', errors='ignore')
 
@@ -181,42 +266,113 @@ class WARCProcessor:
 
                     extract_time = time.time() - extract_start
 
-                    # Análisis NLP
-                    nlp_start = time.time()
-                    sentiment = nlp_analyzer.analyze(text_content)
-                    keywords_analysis = nlp_analyzer.detect_economic_keywords(text_content)
-                    nlp_time = time.time() - nlp_start
-
-                    total_time = time.time() - process_start
-
-                    print(f"[{worker_id}] CC-WARC: {domain} | {fecha_noticia} | COLCAP: {valor_colcap} | {total_time*1000:.0f}ms")
-
                     return {
                         'url': original_url,
                         'title': title,
                         'domain': domain,
                         'fecha': fecha_noticia,
                         'colcap_value': valor_colcap,
-                        'sentiment': sentiment,
-                        'economic_analysis': keywords_analysis,
-                        'text_excerpt': text_content[:500],
-                        'text_length': len(text_content),
+                        'text_content': text_content,
                         'source': 'common_crawl',
-                        'processing_times': {
-                            'download_ms': round(download_time * 1000),
-                            'extraction_ms': round(extract_time * 1000),
-                            'nlp_ms': round(nlp_time * 1000),
-                            'total_ms': round(total_time * 1000)
-                        }
+                        'process_start': process_start,
+                        'download_ms': round(download_time * 1000),
+                        'extraction_ms': round(extract_time * 1000)
                     }
                 else:
                     return None
 
         return None
 
-    def process_record(self, task_data, nlp_analyzer, correlator, worker_id):
+    def analyze_extracted(self, extracted_items, nlp_analyzer, worker_id):
         """
-        Procesa registro de Common Crawl
+        NLP por lotes sobre artículos ya extraídos.
+        Un solo forward pass del modelo para todo el lote.
+        """
+        if not extracted_items:
+            return []
+
+        texts = [item['text_content'] for item in extracted_items]
+
+        nlp_start = time.time()
+        sentiments, keywords = self._analyze_texts(texts, nlp_analyzer)
+        nlp_time = time.time() - nlp_start
+
+        # Tiempo de NLP amortizado por artículo del lote
+        nlp_ms = round(nlp_time * 1000 / len(extracted_items))
+
+        results = []
+        for item, sentiment, keywords_analysis in zip(extracted_items, sentiments, keywords):
+            text_content = item['text_content']
+            total_time = time.time() - item['process_start']
+
+            print(f"[{worker_id}] CC-WARC: {item['domain']} | {item['fecha']} | COLCAP: {item['colcap_value']} | {total_time*1000:.0f}ms")
+
+            results.append({
+                'url': item['url'],
+                'title': item['title'],
+                'domain': item['domain'],
+                'fecha': item['fecha'],
+                'colcap_value': item['colcap_value'],
+                'sentiment': sentiment,
+                'economic_analysis': keywords_analysis,
+                'text_excerpt': text_content[:500],
+                'text_length': len(text_content),
+                'source': item['source'],
+                'processing_times': {
+                    'download_ms': item['download_ms'],
+                    'extraction_ms': item['extraction_ms'],
+                    'nlp_ms': nlp_ms,
+                    'total_ms': round(total_time * 1000)
+                }
+            })
+
+        return results
+
+    def _analyze_texts(self, texts, nlp_analyzer):
+        """
+        Sentimiento y palabras clave por lote. Los casi duplicados (índice
+        MinHash o un texto anterior del mismo lote) reutilizan el análisis
+        previo y no pasan por el modelo.
+        """
+        index = nlp_analyzer.near_duplicates
+        if index is None:
+            return nlp_analyzer.analyze_batch(texts), nlp_analyzer.detect_economic_keywords_batch(texts)
+
+        signatures = [index.signature(text) for text in texts]
+        reused = index.lookup_many(signatures)
+
+        # Dentro del lote: el primero de cada grupo se analiza, el resto lo reutiliza
+        pending = []
+        owner = {}
+        for i, signature in enumerate(signatures):
+            if reused[i] is not None:
+                continue
+            match = next((j for j in pending if index.is_near(signature, signatures[j])), None)
+            if match is None:
+                pending.append(i)
+            else:
+                owner[i] = match
+        index.record_duplicates(len(owner))
+
+        computed = {}
+        if pending:
+            pending_texts = [texts[i] for i in pending]
+            sentiments = nlp_analyzer.analyze_batch(pending_texts)
+            keywords = nlp_analyzer.detect_economic_keywords_batch(pending_texts)
+            for i, sentiment, keywords_analysis in zip(pending, sentiments, keywords):
+                computed[i] = {'sentiment': sentiment, 'economic_analysis': keywords_analysis}
+
+            # No registrar resultados vacíos de error
+            valid = [i for i in pending if computed[i]['sentiment']['confidence']]
+            index.add_many([signatures[i] for i in valid], [computed[i] for i in valid])
+
+        results = [reused[i] or computed[owner.get(i, i)] for i in range(len(texts))]
+        return [r['sentiment'] for r in results], [r['economic_analysis'] for r in results]
+
+    def extract_record(self, task_data, correlator, worker_id):
+        """
+        Descarga y extracción de un registro de Common Crawl (etapa de I/O).
+        Retorna el artículo, None (sin texto) o FETCH_FAILED (falló la descarga).
         """
         try:
             task = json.loads(task_data)
@@ -224,14 +380,129 @@ class WARCProcessor:
             return None
 
         try:
-            result = self._process_via_common_crawl(task, worker_id, nlp_analyzer, correlator)
-            if result:
-                return result
+            return self._extract_via_common_crawl(task, worker_id, correlator)
         except requests.exceptions.HTTPError as e:
             print(f"[{worker_id}] CC Error HTTP: {str(e)[:60]}")
+            error = e
         except requests.exceptions.RequestException as e:
             print(f"[{worker_id}] CC Error de red: {str(e)[:60]}")
+            error = e
         except Exception as e:
             print(f"[{worker_id}] CC Error: {str(e)[:60]}")
+            error = e
+
+        return FETCH_FAILED if fetch_failed(error) else None
+
+    def extract_group(self, group, correlator, worker_id):
+        """
+        Una sola petición Range para un FetchGroup; extrae cada tarea del
+        grupo desde su miembro gzip. Retorna una lista alineada con group.items
+        (artículo, None o FETCH_FAILED por tarea).
+
+        La respuesta se lee en streaming: cada miembro pasa directo a
+        ArchiveIterator y de su payload solo se leen WARC_MAX_PAYLOAD_BYTES.
+        """
+        try:
+            download_start = time.time()
+            response = self.download_range(group.filename, group.start, group.end, stream=self.source is None)
+            download_time = time.time() - download_start
+        except (requests.exceptions.RequestException, OSError) as e:
+            print(f"[{worker_id}] CC Error de red (grupo de {len(group.items)}): {str(e)[:60]}")
+            return [FETCH_FAILED if fetch_failed(e) else None] * len(group.items)
+
+        # Modo replay: el rango ya está en memoria
+        if self.source is not None:
+            return self.extract_group_payload(group, response, download_time, correlator, worker_id)
+
+        try:
+            return self._extract_group_stream(group, response, download_time, correlator, worker_id)
+        finally:
+            response.close()
+
+    def _extract_group_stream(self, group, response, download_time, correlator, worker_id):
+        """Recorre los miembros del grupo en orden de offset sobre response.raw"""
+        if response.status_code != 206 or response.headers.get('Content-Length') != str(group.length):
+            # El servidor no respetó el rango: procesar cada tarea por separado
+            response.close()
+            return [self.extract_record(task_data, correlator, worker_id) for task_data, _ in group.items]
+
+        if len(group.items) > 1:
+            print(f"[{worker_id}] Descarga agrupada: {len(group.items)} registros en 1 petición ({group.length} bytes)")
+        if self.segment_cache is not None:
+            self.segment_cache.record_misses(len(group.items))
+
+        extracted = []
+        position = group.start
+        for task_data, task in group.items:
+            offset, length = int(task['offset']), int(task['length'])
+            if offset < position:
+                # Registro solapado con el anterior (p. ej. duplicado): petición propia
+                extracted.append(self.extract_record(task_data, correlator, worker_id))
+                continue
+
+            process_start = time.time()
+            try:
+                _MemberReader(response.raw, offset - position).drain()
+                position = offset
+                member = _MemberReader(response.raw, length)
+                stream = member
+                if self.segment_cache is not None:
+                    stream = io.BytesIO(member.read())
+                    self.segment_cache.put(task['filename'], offset, length, stream.getvalue())
+            except Exception as e:
+                # La conexión se cortó: el resto del grupo no se puede leer
+                print(f"[{worker_id}] CC Error de red (grupo de {len(group.items)}): {str(e)[:60]}")
+                return extracted + [FETCH_FAILED] * (len(group.items) - len(extracted))
+
+            try:
+                extracted.append(self._extract_from_stream(stream, task, correlator, process_start, download_time))
+            except Exception as e:
+                print(f"[{worker_id}] CC Error: {str(e)[:60]}")
+                extracted.append(FETCH_FAILED if fetch_failed(e) else None)
+
+            try:
+                member.drain()
+                position = offset + length
+            except Exception as e:
+                print(f"[{worker_id}] CC Error de red (grupo de {len(group.items)}): {str(e)[:60]}")
+                return extracted + [FETCH_FAILED] * (len(group.items) - len(extracted))
+        return extracted
+
+    def extract_group_payload(self, group, payload, download_time, correlator, worker_id):
+        """Extrae las tareas de un FetchGroup a partir del payload ya descargado (motor async, replay)"""
+        if len(payload) != group.length:
+            # El servidor no respetó el rango: procesar cada tarea por separado
+            return [self.extract_record(task_data, correlator, worker_id) for task_data, _ in group.items]
+
+        if len(group.items) > 1:
+            print(f"[{worker_id}] Descarga agrupada: {len(group.items)} registros en 1 petición ({group.length} bytes)")
+
+        members = group.split(payload)
+        if self.segment_cache is not None:
+            self.segment_cache.record_misses(len(group.items))
+            for (_, task), member in zip(group.items, members):
+                self.segment_cache.put(task['filename'], int(task['offset']), int(task['length']), member)
+
+        extracted = []
+        for (_, task), member in zip(group.items, members):
+            try:
+                extracted.append(self._extract_via_common_crawl(task, worker_id, correlator, member, download_time))
+            except Exception as e:
+                print(f"[{worker_id}] CC Error: {str(e)[:60]}")
+                extracted.append(None)
+        return extracted
+
+    def process_record(self, task_data, nlp_analyzer, correlator, worker_id):
+        """
+        Procesa registro de Common Crawl
+        """
+        extracted = self.extract_record(task_data, correlator, worker_id)
+        if not extracted:
+            return None
+
+        try:
+            return self.analyze_extracted([extracted], nlp_analyzer, worker_id)[0]
+        except Exception as e:
+            print(f"[{worker_id}] NLP Error: {str(e)[:60]}")
 
         return None
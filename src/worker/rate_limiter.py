@@ -0,0 +1,126 @@
+"""
+Limitador de peticiones a Common Crawl compartido por todo el cluster.
+
+Token bucket guardado en un hash de Redis y actualizado con scripts Lua
+atómicos, de modo que todos los hilos de todos los workers respetan un
+mismo presupuesto de peticiones por segundo.
+
+La tasa se ajusta con AIMD: ante 403/429/503 se reduce de forma
+multiplicativa (como máximo una vez por ventana de enfriamiento) y con
+cada respuesta exitosa se recupera de forma aditiva hasta CC_RATE_LIMIT,
+que nunca se supera. Cada reserva recorta la tasa guardada al límite
+configurado, así que un CC_RATE_LIMIT menor rige en cuanto los workers se
+reinician con él. Mientras la tasa esté en el límite, las respuestas
+exitosas no cuestan otra ida y vuelta a Redis.
+"""
+import time
+
+from src.common.config import Config
+
+# KEYS[1]: hash del bucket | ARGV: tasa configurada (también el máximo), capacidad (burst)
+# Reserva un token (el saldo puede quedar negativo). Retorna {espera en ms, tasa actual}
+ACQUIRE_SCRIPT = """
+local now = redis.call('TIME')
+local now_ms = tonumber(now[1]) * 1000 + math.floor(tonumber(now[2]) / 1000)
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts', 'rate')
+local limit = tonumber(ARGV[1])
+local rate = math.min(tonumber(state[3]) or limit, limit)
+local capacity = tonumber(ARGV[2])
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now_ms
+tokens = math.min(capacity, tokens + (now_ms - ts) * rate / 1000) - 1
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now_ms, 'rate', rate)
+redis.call('PEXPIRE', KEYS[1], 3600000)
+local wait_ms = 0
+if tokens < 0 then
+    wait_ms = math.ceil(-tokens * 1000 / rate)
+end
+return {wait_ms, tostring(rate)}
+"""
+
+# KEYS[1]: hash del bucket
+# ARGV: modo ('decrease'|'increase'), tasa configurada (también el máximo), mínimo,
+#       factor de reducción, incremento aditivo, enfriamiento en ms
+# Retorna la tasa resultante (como string)
+ADJUST_SCRIPT = """
+local now = redis.call('TIME')
+local now_ms = tonumber(now[1]) * 1000 + math.floor(tonumber(now[2]) / 1000)
+local state = redis.call('HMGET', KEYS[1], 'rate', 'last_decrease')
+local limit = tonumber(ARGV[2])
+local rate = math.min(tonumber(state[1]) or limit, limit)
+local last_decrease = tonumber(state[2]) or 0
+if ARGV[1] == 'decrease' then
+    if now_ms - last_decrease >= tonumber(ARGV[6]) then
+        rate = math.max(tonumber(ARGV[3]), rate * tonumber(ARGV[4]))
+        redis.call('HSET', KEYS[1], 'rate', rate, 'last_decrease', now_ms)
+    end
+else
+    rate = math.min(limit, rate + tonumber(ARGV[5]))
+    redis.call('HSET', KEYS[1], 'rate', rate)
+end
+redis.call('PEXPIRE', KEYS[1], 3600000)
+return tostring(rate)
+"""
+
+
+class RedisTokenBucket:
+
+    THROTTLE_STATUS = (403, 429, 503)
+
+    def __init__(self, redis_client, key='cc_rate_limit', rate=None, burst=None):
+        self.redis_client = redis_client
+        self.key = key
+        self.rate = rate or Config.CC_RATE_LIMIT
+        self.burst = burst or Config.CC_RATE_BURST
+        self._acquire = redis_client.register_script(ACQUIRE_SCRIPT)
+        self._adjust = redis_client.register_script(ADJUST_SCRIPT)
+        self._current_rate = self.rate  # Última tasa global vista (reserva o ajuste)
+        self.listeners = []  # Reciben cada código HTTP (p. ej. AdaptiveConcurrency.on_response)
+
+    def reserve(self):
+        """Reserva un turno en el presupuesto global. Retorna la espera en ms (sin dormir)"""
+        try:
+            wait_ms, rate = self._acquire(keys=[self.key], args=[self.rate, self.burst])
+            self._current_rate = float(rate)
+            return int(wait_ms)
+        except Exception as e:
+            # Sin Redis: respetar la tasa configurada localmente
+            print(f"[RateLimit] Error en Redis ({e}), usando espera local")
+            return int(1000 / self.rate)
+
+    def acquire(self):
+        """Reserva un turno en el presupuesto global y espera lo necesario"""
+        wait_ms = self.reserve()
+        if wait_ms > 0:
+            time.sleep(wait_ms / 1000)
+        return wait_ms
+
+    def _adjust_rate(self, mode):
+        try:
+            self._current_rate = float(self._adjust(keys=[self.key], args=[
+                mode, self.rate, Config.CC_RATE_MIN,
+                Config.CC_RATE_DECREASE, Config.CC_RATE_INCREASE, Config.CC_RATE_COOLDOWN_MS
+            ]))
+            return self._current_rate
+        except Exception as e:
+            print(f"[RateLimit] Error ajustando tasa: {e}")
+            return None
+
+    def on_response(self, status_code):
+        """Retroalimentación AIMD según el código HTTP de Common Crawl"""
+        for listener in self.listeners:
+            listener(status_code)
+        if status_code in self.THROTTLE_STATUS:
+            rate = self._adjust_rate('decrease')
+            if rate is not None:
+                print(f"[RateLimit] HTTP {status_code}: tasa global -> {rate:.2f} req/s")
+        elif status_code < 400 and self._current_rate < self.rate:
+            # Recuperación aditiva solo si hubo una reducción; en el límite no hay ida y vuelta
+            self._adjust_rate('increase')
+
+    def current_rate(self):
+        try:
+            rate = self.redis_client.hget(self.key, 'rate')
+            return float(rate) if rate is not None else self.rate
+        except Exception:
+            return None
@@ -0,0 +1,144 @@
+"""
+Caché en disco de segmentos WARC descargados.
+
+Los registros de Common Crawl son inmutables: un mismo (filename, offset,
+length) siempre devuelve los mismos bytes. Reprocesar (cambio de modelo,
+reinicio de un pod, experimentos) vuelve a leerlos del disco local en vez
+de descargarlos.
+
+- Clave: sha1 de la tripleta -> <dir>/<2 hex>/<sha1>.seg
+- Escritura atómica: archivo temporal en el mismo directorio + os.replace,
+  un lector nunca ve un segmento a medio escribir.
+- Tamaño acotado con desalojo LRU por mtime (cada acierto lo actualiza).
+  El desalojo toma un flock no bloqueante sobre <dir>/.lock: entre hilos y
+  procesos del mismo nodo (volumen emptyDir/hostPath) solo uno desaloja.
+"""
+import fcntl
+import hashlib
+import os
+import tempfile
+import threading
+
+from src.common.config import Config
+
+
+class SegmentCache:
+
+    EVICT_TARGET = 0.9  # Tras desalojar queda este porcentaje de max_bytes
+
+    def __init__(self, directory=None, max_bytes=None):
+        self.directory = directory or Config.SEGMENT_CACHE_DIR
+        self.max_bytes = max_bytes or Config.SEGMENT_CACHE_MAX_BYTES
+        os.makedirs(self.directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._lock_path = os.path.join(self.directory, '.lock')
+        self.stats = {'hits': 0, 'misses': 0, 'bytes_saved': 0, 'evicted': 0}
+        # Tamaño estimado: último escaneo + lo escrito por este proceso desde entonces
+        self._size_at_scan = self._scan()[1]
+        self._written_since_scan = 0
+
+    def _path(self, filename, offset, length):
+        digest = hashlib.sha1(f"{filename}|{offset}|{length}".encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, digest[:2], digest + '.seg')
+
+    def contains(self, filename, offset, length):
+        return os.path.exists(self._path(filename, offset, length))
+
+    def get(self, filename, offset, length):
+        """Bytes del segmento o None"""
+        path = self._path(filename, offset, length)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            os.utime(path)  # Recencia para el LRU
+        except FileNotFoundError:
+            # También cubre un desalojo concurrente entre exists() y open()
+            self.record_misses(1)
+            return None
+
+        with self._lock:
+            self.stats['hits'] += 1
+            self.stats['bytes_saved'] += len(data)
+        return data
+
+    def record_misses(self, count):
+        with self._lock:
+            self.stats['misses'] += count
+
+    def put(self, filename, offset, length, data):
+        path = self._path(filename, offset, length)
+        folder = os.path.dirname(path)
+        try:
+            os.makedirs(folder, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=folder, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp_path, path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+        except OSError as e:
+            print(f"[SegmentCache] No se pudo escribir {path}: {e}")
+            return
+
+        with self._lock:
+            self._written_since_scan += len(data)
+            # Re-escanear al superar el máximo o cada 5% escrito (otros procesos también escriben)
+            must_evict = (self._size_at_scan + self._written_since_scan > self.max_bytes
+                          or self._written_since_scan > self.max_bytes // 20)
+        if must_evict:
+            self._evict()
+
+    def _scan(self):
+        """[(mtime, tamaño, ruta)] de todos los segmentos y el total en bytes"""
+        entries = []
+        total = 0
+        for sub in os.scandir(self.directory):
+            if not sub.is_dir():
+                continue
+            for entry in os.scandir(sub.path):
+                if not entry.name.endswith('.seg'):
+                    continue
+                try:
+                    st = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, entry.path))
+                total += st.st_size
+        return entries, total
+
+    def _evict(self):
+        with open(self._lock_path, 'a') as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return  # Otro hilo/proceso ya está desalojando
+
+            try:
+                entries, total = self._scan()
+                evicted = 0
+                if total > self.max_bytes:
+                    target = self.max_bytes * self.EVICT_TARGET
+                    for _, size, path in sorted(entries):
+                        if total <= target:
+                            break
+                        try:
+                            os.unlink(path)
+                        except FileNotFoundError:
+                            pass
+                        total -= size
+                        evicted += 1
+
+                with self._lock:
+                    self._size_at_scan = total
+                    self._written_since_scan = 0
+                    self.stats['evicted'] += evicted
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def snapshot(self):
+        with self._lock:
+            stats = dict(self.stats)
+            stats['size_bytes'] = self._size_at_scan + self._written_since_scan
+        return stats
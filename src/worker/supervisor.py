@@ -0,0 +1,122 @@
+"""
+Supervisor multiproceso del worker.
+
+Carga el modelo y los datos COLCAP una sola vez y crea N procesos hijos con
+fork(). Los pesos se comparten copy-on-write: gc.freeze() mueve los objetos
+ya cargados a una generación permanente para que el recolector de basura no
+toque sus cabeceras y las páginas no se copien en cada hijo.
+
+Cada hijo consume la cola de tareas de forma independiente (con el backend
+stream, como consumidor propio del grupo); si uno termina, el supervisor lo
+reinicia.
+"""
+import gc
+import os
+import signal
+import time
+import traceback
+
+from src.common.config import Config
+from src.common.connections import RedisConnection
+
+
+class WorkerSupervisor:
+
+    RESTART_DELAY = 2  # Segundos antes de reiniciar un hijo caído
+
+    def __init__(self, procs, worker_id, correlator, nlp_analyzer, startup=None):
+        self.procs = procs
+        self.startup = startup or {}
+        self.worker_id = worker_id
+        self.correlator = correlator
+        self.nlp_analyzer = nlp_analyzer
+        self.children = {}  # pid -> índice del hijo
+        self._stopping = False
+
+    def child_id(self, index):
+        return f"{self.worker_id}.{index}"
+
+    def _child_threads(self):
+        """Hilos de inferencia (torch u ONNX Runtime) por hijo: reparte los cores del pod"""
+        return Config.NLP_THREADS or max(1, (os.cpu_count() or 1) // self.procs)
+
+    def _run_child(self, index):
+        """Cuerpo del proceso hijo (nunca retorna)"""
+        from .main import bind_redis, run_worker
+
+        exit_code = 0
+        worker_id = self.child_id(index)
+        try:
+            # SIGTERM/SIGINT -> KeyboardInterrupt: el loop del worker termina limpio
+            signal.signal(signal.SIGTERM, signal.default_int_handler)
+            signal.signal(signal.SIGINT, signal.default_int_handler)
+
+            # El supervisor no ejecuta inferencia antes del fork: el pool de
+            # hilos de torch/OpenMP no es seguro tras fork si ya se usó. La
+            # sesión ONNX Runtime también se crea aquí, con la parte de cores del hijo
+            self.nlp_analyzer.init_child(self._child_threads())
+
+            # Conexión Redis propia (no compartir sockets con el supervisor)
+            redis_conn = RedisConnection()
+            redis_client = redis_conn.connect()
+            if not redis_client:
+                print(f"[{worker_id}] Abortando: No hay conexión a Redis")
+                os._exit(1)
+
+            bind_redis(redis_client, self.correlator, self.nlp_analyzer)
+            # Warm-up dentro de cada hijo (ver nota de fork más arriba)
+            run_worker(worker_id, redis_conn, redis_client, self.correlator, self.nlp_analyzer, self.startup)
+        except BaseException:
+            traceback.print_exc()
+            exit_code = 1
+        finally:
+            os._exit(exit_code)
+
+    def _spawn(self, index):
+        pid = os.fork()
+        if pid == 0:
+            self._run_child(index)
+        self.children[pid] = index
+        print(f"[{self.worker_id}] Hijo {self.child_id(index)} iniciado (pid {pid})")
+
+    def _shutdown(self, signum, frame):
+        self._stopping = True
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def run(self):
+        # Congelar lo ya cargado (modelo, COLCAP) antes de hacer fork
+        gc.collect()
+        gc.freeze()
+
+        signal.signal(signal.SIGTERM, self._shutdown)
+        signal.signal(signal.SIGINT, self._shutdown)
+
+        print(f"[{self.worker_id}] Supervisor: {self.procs} procesos | "
+              f"{self._child_threads()} hilos de inferencia por proceso")
+
+        for index in range(self.procs):
+            self._spawn(index)
+
+        while self.children:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            except InterruptedError:
+                continue
+
+            index = self.children.pop(pid, None)
+            if index is None or self._stopping:
+                continue
+
+            code = os.waitstatus_to_exitcode(status)
+            print(f"[{self.worker_id}] Hijo {self.child_id(index)} terminó (código {code}), reiniciando...")
+            time.sleep(self.RESTART_DELAY)
+            if not self._stopping:
+                self._spawn(index)
+
+        print(f"[{self.worker_id}] Supervisor finalizado")
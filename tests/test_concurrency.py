@@ -0,0 +1,64 @@
+"""Control adaptativo de concurrencia ante fallos de descarga"""
+import json
+import socket
+import time
+
+from src.common.config import Config
+from src.common.task_queue import ListTaskQueue
+from src.worker.concurrency import AdaptiveConcurrency
+from src.worker.pipeline import settle_outcomes, task_outcome
+from src.worker.processor import FETCH_FAILED, WARCProcessor
+
+
+def closed_port():
+    """Puerto local sin servidor: la conexión se rechaza"""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class NoCorrelator:
+    def correlate(self, date):
+        return None, None
+
+
+def test_refused_connection_is_a_fetch_failure(monkeypatch):
+    monkeypatch.setattr(Config, 'CC_REQUEST_DELAY', 0)
+    processor = WARCProcessor()
+    processor.base_url = f'http://127.0.0.1:{closed_port()}/'
+
+    task_data = json.dumps({'filename': 'segment.warc.gz', 'url': 'https://www.portafolio.co/nota'})
+    extracted = processor.extract_record(task_data, NoCorrelator(), 'test')
+
+    assert extracted is FETCH_FAILED
+    assert not extracted
+    assert task_outcome(extracted) is None
+
+
+def test_download_errors_shrink_the_limit(monkeypatch):
+    monkeypatch.setattr(Config, 'CC_REQUEST_DELAY', 0)
+    processor = WARCProcessor()
+    processor.base_url = f'http://127.0.0.1:{closed_port()}/'
+    controller = AdaptiveConcurrency(initial=8, minimum=1, maximum=16, target_ms=60000, interval=0.01, decrease=0.5)
+    task_queue = ListTaskQueue(None)
+
+    for i in range(AdaptiveConcurrency.MIN_SAMPLES):
+        task_data = json.dumps({'filename': f'segment-{i}.warc.gz', 'url': 'https://www.portafolio.co/nota'})
+        start = time.monotonic()
+        outcomes = [task_outcome(processor.extract_record(task_data, NoCorrelator(), 'test'))]
+        failures = settle_outcomes(task_queue, [task_data], outcomes, time.monotonic() - start, controller)
+        assert failures == 1
+
+    time.sleep(0.02)
+    # Fallos rápidos con slots saturados: antes hacían crecer el límite
+    assert controller.update(occupancy=1.0) == 4
+    assert controller.changes[-1]['reason'].startswith('errores')
+
+
+def test_no_text_does_not_count_as_error():
+    controller = AdaptiveConcurrency(initial=8, minimum=1, maximum=16, target_ms=60000, interval=0.01)
+    for _ in range(AdaptiveConcurrency.MIN_SAMPLES):
+        assert settle_outcomes(ListTaskQueue(None), ['{}'], [task_outcome(None)], 0.01, controller) == 0
+
+    time.sleep(0.02)
+    assert controller.update(occupancy=1.0) == 9
@@ -0,0 +1,58 @@
+"""Confirmación de tareas en la cola stream (fakeredis)"""
+import time
+
+import fakeredis
+
+from src.common.task_queue import StreamTaskQueue
+from src.worker.pipeline import settle_outcomes, task_outcome
+from src.worker.processor import FETCH_FAILED
+
+
+def make_queue(redis_client, max_deliveries=3):
+    task_queue = StreamTaskQueue(redis_client, consumer='worker-1', stream='tareas', group='workers',
+                                 claim_idle_ms=1, max_deliveries=max_deliveries)
+    task_queue.CLAIM_INTERVAL = 0  # Reclamar en cada pop
+    return task_queue
+
+
+def test_only_downloaded_tasks_without_text_are_acked():
+    redis_client = fakeredis.FakeRedis()
+    task_queue = make_queue(redis_client)
+    task_queue.push(['sin-texto', 'con-texto', 'fallida'])
+    tasks = task_queue.pop(10)
+
+    outcomes = [task_outcome(None), task_outcome({'text_content': 'x'}), task_outcome(FETCH_FAILED)]
+    assert settle_outcomes(task_queue, tasks, outcomes) == 1
+
+    # La de texto espera a su resultado; la fallida queda pendiente para reintentarse
+    assert task_queue.stats() == {'size': 2, 'lag': 0, 'pending': 2}
+
+
+def test_failed_download_is_reclaimed_until_max_deliveries():
+    redis_client = fakeredis.FakeRedis()
+    task_queue = make_queue(redis_client, max_deliveries=2)
+    task_queue.push(['fallida'])
+    assert task_queue.pop(10) == ['fallida']
+    settle_outcomes(task_queue, ['fallida'], [None])
+
+    time.sleep(0.01)
+    assert task_queue.pop(10) == ['fallida']  # Segunda entrega (XAUTOCLAIM)
+    settle_outcomes(task_queue, ['fallida'], [None])
+
+    time.sleep(0.01)
+    assert task_queue.pop(10) == []  # Tercera: supera max_deliveries y se descarta
+    assert task_queue.dropped == 1
+    assert task_queue.stats()['size'] == 0
+
+
+def test_reclaimed_task_is_acked_once_it_succeeds():
+    redis_client = fakeredis.FakeRedis()
+    task_queue = make_queue(redis_client)
+    task_queue.push(['tarea'])
+    task_queue.pop(10)
+    settle_outcomes(task_queue, ['tarea'], [None])
+
+    time.sleep(0.01)
+    assert task_queue.pop(10) == ['tarea']
+    settle_outcomes(task_queue, ['tarea'], [False])
+    assert task_queue.stats() == {'size': 0, 'lag': 0, 'pending': 0}